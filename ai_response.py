@@ -0,0 +1,241 @@
+"""
+AI返回内容解析
+模型输出的JSON经常带有各种瑕疵：Markdown代码块、前后说明文字、尾随逗号、未转义的引号、
+单引号或中文引号、中文冒号、输出被截断等。这里用一次扫描修复常见问题后解析，
+失败时再按行提取字段，最后统一校验和整理 summary、keywords、slug 三个字段
+"""
+
+import re
+import json
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+SEO_FIELDS = ('summary', 'keywords', 'slug')
+
+# 字段别名（模型有时使用中文字段名）
+FIELD_ALIASES = {
+    'summary': 'summary', '摘要': 'summary', 'description': 'summary',
+    'keywords': 'keywords', 'keyword': 'keywords', '关键词': 'keywords', '关键字': 'keywords', 'tags': 'keywords',
+    'slug': 'slug', 'url': 'slug'
+}
+
+THINK_PATTERN = re.compile(r'<think>.*?(?:</think>|$)', re.DOTALL)
+CODE_FENCE_PATTERN = re.compile(r'```[a-zA-Z]*\s*\n?(.*?)(?:```|$)', re.DOTALL)
+# 按行提取字段，如 "summary": "...", 或 **摘要**：...
+FIELD_LINE_PATTERN = re.compile(
+    r'^[\s\-*#>"“\'{]*(' + '|'.join(FIELD_ALIASES) + r')[\s*"”\']*[:：]\s*(.*?)\s*$',
+    re.IGNORECASE | re.MULTILINE
+)
+KEYWORD_SEPARATOR_PATTERN = re.compile(r'[,，、;；|\n]+')
+SLUG_INVALID_PATTERN = re.compile(r'[^a-z0-9]+')
+
+# 允许字符串中出现换行等控制字符；复用同一个解码器，避免每次解析都重新创建
+_DECODER = json.JSONDecoder(strict=False)
+
+# 字符串之外可以出现在闭合引号之后的字符
+_AFTER_STRING = ',:}]'
+# 开始引号 -> 可以结束该字符串的引号
+_OPEN_QUOTES = {'"': '"', "'": "'", '“': '”"', '”': '”"', '‘': "’'"}
+_WHITESPACE = ' \t\r\n'
+# 按行提取时包住整个值的引号：开始引号 -> 结束引号
+_WRAPPER_QUOTES = {'"': '"', "'": "'", '“': '”', '‘': '’'}
+
+
+def strip_wrappers(text: str) -> str:
+    """去掉推理模型的 <think> 段落和Markdown代码块标记"""
+    if '<think>' in text:
+        text = THINK_PATTERN.sub('', text)
+    if '```' in text:
+        fence = CODE_FENCE_PATTERN.search(text)
+        if fence and '{' in fence.group(1):
+            return fence.group(1)
+    return text
+
+
+def repair_json(text: str, opener: str = '{') -> Optional[str]:
+    """从第一个 opener（{ 或 [）开始扫描到与之匹配的括号，修复常见的JSON瑕疵，返回可以解析的文本
+
+    一次扫描中完成：单引号/中文引号转为双引号、字符串内未转义的引号和换行转义、
+    去掉尾随逗号、中文冒号和逗号转为英文、行末缺失的逗号补齐、截断的字符串和括号补全。
+    找不到 opener 时返回None
+    """
+    i = text.find(opener)
+    if i < 0:
+        return None
+    n = len(text)
+    out = []
+    stack = []
+    closing = None  # 可以结束当前字符串的引号，None 表示不在字符串中
+    while i < n:
+        ch = text[i]
+        if closing is not None:
+            if ch == '\\' and i + 1 < n:
+                out.append(text[i:i + 2])
+                i += 2
+                continue
+            if ch in closing:
+                # 后面紧跟结构字符（或换行后紧跟下一个字段）才视为字符串结束，否则是内容中的引号
+                j = i + 1
+                while j < n and text[j] in _WHITESPACE:
+                    j += 1
+                if j >= n or text[j] in _AFTER_STRING:
+                    out.append('"')
+                    closing = None
+                elif text[j] in _OPEN_QUOTES and '\n' in text[i + 1:j]:
+                    out.append('",')
+                    closing = None
+                else:
+                    out.append('\\"')
+            elif ch == '"':
+                out.append('\\"')
+            elif ch == '\n':
+                out.append('\\n')
+            else:
+                out.append(ch)
+            i += 1
+            continue
+
+        if ch in _OPEN_QUOTES:
+            closing = _OPEN_QUOTES[ch]
+            out.append('"')
+        elif ch in '{[':
+            stack.append('}' if ch == '{' else ']')
+            out.append(ch)
+        elif ch in '}]':
+            if stack:
+                stack.pop()
+            out.append(ch)
+            if not stack:
+                break
+        elif ch in ',，':
+            j = i + 1
+            while j < n and text[j] in _WHITESPACE:
+                j += 1
+            if j < n and text[j] not in '}]':
+                out.append(',')
+        elif ch == '：':
+            out.append(':')
+        else:
+            out.append(ch)
+        i += 1
+
+    # 输出被截断时补全字符串和括号
+    if closing is not None:
+        out.append('"')
+    out.extend(reversed(stack))
+    return ''.join(out)
+
+
+def find_fields(data) -> Optional[dict]:
+    """在解析结果中找到包含SEO字段的对象（兼容外层包了一层的情况）"""
+    if isinstance(data, list) and data:
+        data = data[0]
+    if not isinstance(data, dict):
+        return None
+    fields = {FIELD_ALIASES[k.lower()]: v for k, v in data.items()
+              if isinstance(k, str) and k.lower() in FIELD_ALIASES}
+    if fields:
+        return fields
+    for value in data.values():
+        if isinstance(value, dict):
+            nested = find_fields(value)
+            if nested:
+                return nested
+    return None
+
+
+def strip_wrapper_quotes(value: str) -> str:
+    """去掉包住整个值的成对引号（可多层）；引号只在开头或结尾、不成对时保留（如 “双碳”目标……）"""
+    while len(value) >= 2 and value[0] in _WRAPPER_QUOTES:
+        opener, closer = value[0], _WRAPPER_QUOTES[value[0]]
+        if value[-1] != closer:
+            break
+        inner = value[1:-1]
+        if opener == closer:
+            if opener in inner:
+                break
+        else:
+            # 开头的引号必须与结尾的引号配对，而不是与中间的引号配对
+            depth = 0
+            for ch in inner:
+                depth += (ch == opener) - (ch == closer)
+                if depth < 0:
+                    break
+            if depth != 0:
+                break
+        value = inner.strip()
+    return value
+
+
+def extract_fields(text: str) -> dict:
+    """JSON无法解析时按行提取字段"""
+    fields = {}
+    for match in FIELD_LINE_PATTERN.finditer(text):
+        name = FIELD_ALIASES[match.group(1).lower()]
+        if name not in fields:
+            fields[name] = strip_wrapper_quotes(match.group(2).rstrip(',，').strip())
+    return fields
+
+
+def normalize_keywords(value) -> str:
+    """关键词统一为英文逗号分隔、无空格、去重"""
+    if isinstance(value, (list, tuple)):
+        parts = [str(v) for v in value]
+    else:
+        parts = KEYWORD_SEPARATOR_PATTERN.split(str(value or ''))
+    keywords = []
+    for part in parts:
+        part = part.strip().strip('"“”\'')
+        if part and part not in keywords:
+            keywords.append(part)
+    return ','.join(keywords)
+
+
+def normalize_slug(value) -> str:
+    """slug只保留小写字母、数字和连字符"""
+    return SLUG_INVALID_PATTERN.sub('-', str(value or '').lower()).strip('-')
+
+
+def normalize_fields(fields: dict) -> dict:
+    """校验并整理三个字段，缺失的字段为空字符串"""
+    summary = fields.get('summary', '')
+    if isinstance(summary, (list, tuple)):
+        summary = ''.join(str(s) for s in summary)
+    return {
+        'summary': str(summary or '').strip(),
+        'keywords': normalize_keywords(fields.get('keywords', '')),
+        'slug': normalize_slug(fields.get('slug', ''))
+    }
+
+
+def loads_tolerant(text: str, opener: str = '{'):
+    """解析文本中第一个JSON对象（opener='['时为数组），无法解析时返回None
+
+    先直接解析首尾括号之间的内容（格式正确时最快），失败后再修复
+    """
+    start = text.find(opener)
+    if start < 0:
+        return None
+    end = text.rfind('}' if opener == '{' else ']')
+    if end > start:
+        try:
+            return _DECODER.decode(text[start:end + 1])
+        except json.JSONDecodeError:
+            pass
+    try:
+        return _DECODER.decode(repair_json(text, opener))
+    except json.JSONDecodeError:
+        return None
+
+
+def parse_ai_response(result_text: str) -> dict:
+    """解析AI返回的JSON格式响应，返回 summary、keywords、slug（无法解析的字段为空字符串）"""
+    text = strip_wrappers(result_text or '')
+    fields = find_fields(loads_tolerant(text))
+    if fields and fields.get('summary'):
+        return normalize_fields(fields)
+
+    logger.warning("AI返回格式不是标准JSON，尝试提取信息")
+    return normalize_fields(extract_fields(text))
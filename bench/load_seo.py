@@ -0,0 +1,166 @@
+"""
+SEO接口端到端压测
+生成一批 .docx 文档，按指定并发上传到 /api/seo/process（或 /api/seo/stream），
+统计延迟分位数（p50/p95/p99）、吞吐量，并通过持续探测 /api/auth/check 估算服务端事件循环延迟
+
+用法（先启动 bench/mock_provider.py，并将服务的提供商地址指向它）：
+    python bench/load_seo.py --base-url http://127.0.0.1:8000 --docs 100 --concurrency 20 --provider deepseek
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import random
+import statistics
+import time
+
+import httpx
+from docx import Document
+
+# 生成文档用的词汇
+VOCABULARY = [
+    '人工智能', '医疗影像', '辅助诊断', '新能源汽车', '消费补贴', '跨境电商', '海外仓', '供应链',
+    '数字化转型', '云计算', '数据安全', '监管政策', '市场规模', '同比增长', '行业报告', '技术创新',
+    '用户体验', '产业升级', '投资机构', '融资', '芯片', '算力', '大模型', '应用落地'
+]
+CONNECTORS = ['推动了', '带动', '促进', '影响', '加速', '提升了', '改变了', '支撑']
+
+
+def make_sentence() -> str:
+    return f"{random.choice(VOCABULARY)}{random.choice(CONNECTORS)}{random.choice(VOCABULARY)}的发展，" \
+           f"{random.choice(VOCABULARY)}成为{random.choice(VOCABULARY)}关注的重点。"
+
+
+def make_docx(index: int, paragraphs: int) -> bytes:
+    """生成一篇随机文档"""
+    doc = Document()
+    doc.add_heading(f"{random.choice(VOCABULARY)}与{random.choice(VOCABULARY)}观察（{index}）", 0)
+    for i in range(paragraphs):
+        if i and i % 8 == 0:
+            doc.add_heading(f"{random.choice(VOCABULARY)}趋势", 1)
+        doc.add_paragraph(''.join(make_sentence() for _ in range(random.randint(2, 6))))
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def login(client: httpx.AsyncClient, username: str, password: str):
+    response = await client.post('/api/auth/login', data={'username': username, 'password': password})
+    response.raise_for_status()
+
+
+async def upload(client: httpx.AsyncClient, args, name: str, data: bytes) -> dict:
+    """上传一篇文档，返回耗时、首字节时间和结果来源"""
+    params = {'cache': 'bypass'} if args.bypass_cache else {}
+    files = {'file': (name, data, 'application/vnd.openxmlformats-officedocument.wordprocessingml.document')}
+    form = {'provider': args.provider}
+    start = time.perf_counter()
+    first_byte = None
+    ok = False
+    source = ''
+    if args.endpoint == 'stream':
+        async with client.stream('POST', '/api/seo/stream', params=params, files=files, data=form) as response:
+            async for line in response.aiter_lines():
+                if first_byte is None:
+                    first_byte = time.perf_counter() - start
+                if line.startswith('event: done'):
+                    ok = True
+        source = 'stream'
+    else:
+        response = await client.post('/api/seo/process', params=params, files=files, data=form)
+        first_byte = time.perf_counter() - start
+        ok = response.status_code == 200
+        if ok:
+            source = response.json().get('source', '')
+    return {'latency': time.perf_counter() - start, 'ttfb': first_byte or 0.0, 'ok': ok, 'source': source}
+
+
+async def probe_event_loop(client: httpx.AsyncClient, stop: asyncio.Event, samples: list, interval: float):
+    """持续请求一个轻量接口，其延迟近似反映服务端事件循环被阻塞的程度"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            await client.post('/api/auth/check')
+            samples.append(time.perf_counter() - start)
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(interval)
+
+
+async def run(args):
+    random.seed(args.seed)
+    corpus = [(f"bench_{i}.docx", make_docx(i, random.randint(args.min_paragraphs, args.max_paragraphs)))
+              for i in range(args.docs)]
+    print(f"已生成 {len(corpus)} 篇文档，平均大小 {statistics.mean(len(d) for _, d in corpus) / 1024:.1f} KB")
+
+    limits = httpx.Limits(max_connections=args.concurrency + 2, max_keepalive_connections=args.concurrency + 2)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client, \
+            httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout) as probe_client:
+        await login(client, args.username, args.password)
+        await login(probe_client, args.username, args.password)
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+        results = []
+        lag_samples = []
+        stop = asyncio.Event()
+
+        async def worker(name, data):
+            async with semaphore:
+                try:
+                    results.append(await upload(client, args, name, data))
+                except httpx.HTTPError as e:
+                    results.append({'latency': 0.0, 'ttfb': 0.0, 'ok': False, 'source': type(e).__name__})
+
+        probe = asyncio.create_task(probe_event_loop(probe_client, stop, lag_samples, args.probe_interval))
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(name, data) for name, data in corpus))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await probe
+
+    succeeded = [r for r in results if r['ok']]
+    latencies = [r['latency'] for r in succeeded]
+    ttfbs = [r['ttfb'] for r in succeeded]
+    sources = {}
+    for r in results:
+        sources[r['source']] = sources.get(r['source'], 0) + 1
+
+    print(f"\n接口: {args.endpoint}, 提供商: {args.provider or '自动'}, 并发: {args.concurrency}")
+    print(f"成功/总数: {len(succeeded)}/{len(results)}, 总耗时: {elapsed:.2f}s, 吞吐量: {len(succeeded) / elapsed:.2f} 篇/秒")
+    print(f"结果来源: {sources}")
+    print(f"延迟 p50/p95/p99/max: {percentile(latencies, 0.5):.3f} / {percentile(latencies, 0.95):.3f} / "
+          f"{percentile(latencies, 0.99):.3f} / {max(latencies, default=0):.3f} s")
+    print(f"首字节 p50/p95/p99: {percentile(ttfbs, 0.5):.3f} / {percentile(ttfbs, 0.95):.3f} / {percentile(ttfbs, 0.99):.3f} s")
+    print(f"事件循环探测 p50/p99/max: {percentile(lag_samples, 0.5) * 1000:.1f} / "
+          f"{percentile(lag_samples, 0.99) * 1000:.1f} / {max(lag_samples, default=0) * 1000:.1f} ms（{len(lag_samples)} 次）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SEO接口端到端压测')
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--username', default=os.getenv('AUTH_USERNAME', 'admin'))
+    parser.add_argument('--password', default=os.getenv('AUTH_PASSWORD', 'admin123'))
+    parser.add_argument('--endpoint', choices=['process', 'stream'], default='process')
+    parser.add_argument('--provider', default='deepseek', help="提供商，传空字符串表示自动切换")
+    parser.add_argument('--docs', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--min-paragraphs', type=int, default=5)
+    parser.add_argument('--max-paragraphs', type=int, default=60)
+    parser.add_argument('--bypass-cache', action=argparse.BooleanOptionalAction, default=True,
+                        help='是否附加 cache=bypass（默认开启，避免缓存影响结果）')
+    parser.add_argument('--timeout', type=float, default=300)
+    parser.add_argument('--probe-interval', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=42)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
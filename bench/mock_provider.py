@@ -0,0 +1,215 @@
+"""
+本地模拟AI提供商
+实现DeepSeek/豆包使用的OpenAI兼容 chat/completions 接口（含流式）和通义千问DashScope的文本生成接口，
+可配置延迟分布、错误率、429比例和返回非法JSON的比例，用于在不消耗Token的情况下压测SEO接口
+
+用法：
+    python bench/mock_provider.py --port 9000 --latency-median 2 --latency-sigma 0.5 --error-rate 0.02
+
+然后将服务指向模拟提供商：
+    DEEPSEEK_API_URL=http://127.0.0.1:9000/chat/completions
+    DOUBAO_API_URL=http://127.0.0.1:9000/api/v3/chat/completions
+    QWEN_API_BASE_URL=http://127.0.0.1:9000/api/v1
+    DEEPSEEK_API_KEY=mock DOUBAO_API_KEY=mock DASHSCOPE_API_KEY=mock
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import random
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+app = FastAPI(title="Mock AI Provider")
+
+# 运行配置（由命令行参数覆盖）
+CONFIG = {
+    'latency_median': 2.0,  # 对数正态分布的中位数（秒）
+    'latency_sigma': 0.5,
+    'error_rate': 0.0,
+    'rate_limit_rate': 0.0,
+    'retry_after': 1,
+    'malformed_rate': 0.0,
+    'stream_chunk_delay': 0.02,
+    'prefix_cache': True
+}
+
+# 模拟提示词前缀缓存：按固定长度的块记录见过的前缀（与DeepSeek按64 Token为单位缓存类似）
+PREFIX_BLOCK_CHARS = 128
+seen_prefixes = set()
+
+# 模拟的输出样例
+SAMPLE_RESULTS = [
+    {'summary': '人工智能正加速走进医院影像科，辅助医生提升诊断效率与准确率。', 'keywords': '人工智能,医疗影像,辅助诊断', 'slug': 'ai-medical-imaging-diagnosis'},
+    {'summary': '多地出台新能源汽车消费补贴政策，带动一季度销量同比大幅增长。', 'keywords': '新能源汽车,消费补贴,销量增长', 'slug': 'new-energy-vehicle-subsidy-sales'},
+    {'summary': '跨境电商企业借助海外仓布局缩短配送时效，提升用户复购率。', 'keywords': '跨境电商,海外仓,物流时效', 'slug': 'cross-border-ecommerce-overseas-warehouse'}
+]
+
+
+# 多篇文章合并生成时提示词中的文章编号
+PACKED_ARTICLE_PATTERN = re.compile(r'【文章 \d+】')
+
+
+def sample_latency() -> float:
+    return random.lognormvariate(0, CONFIG['latency_sigma']) * CONFIG['latency_median']
+
+
+def sample_content(prompt: str = '') -> str:
+    """生成一条模型输出，按比例返回非法JSON；多篇文章合并的提示词返回按编号排列的JSON数组"""
+    count = len(PACKED_ARTICLE_PATTERN.findall(prompt))
+    if count:
+        result = [{'id': number, **random.choice(SAMPLE_RESULTS)} for number in range(1, count + 1)]
+    else:
+        result = random.choice(SAMPLE_RESULTS)
+    text = json.dumps(result, ensure_ascii=False, indent=4)
+    if random.random() < CONFIG['malformed_rate']:
+        damage = random.choice([
+            lambda t: f"```json\n{t}\n```",
+            lambda t: t.replace('"\n}', '",\n}'),
+            lambda t: '好的，以下是生成结果：\n' + t,
+            lambda t: t[:len(t) // 2]
+        ])
+        text = damage(text)
+    return text
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 2)
+
+
+def cached_prefix_chars(text: str) -> int:
+    """返回与之前请求相同的最长前缀长度（按块对齐），并记录本次请求的前缀"""
+    if not CONFIG['prefix_cache']:
+        return 0
+    cached = 0
+    for end in range(PREFIX_BLOCK_CHARS, len(text) + 1, PREFIX_BLOCK_CHARS):
+        prefix = hash(text[:end])
+        if prefix in seen_prefixes:
+            cached = end
+        else:
+            seen_prefixes.add(prefix)
+    return cached
+
+
+def failure_response(dashscope: bool = False):
+    """按配置的比例返回429或500，否则返回None"""
+    roll = random.random()
+    if roll < CONFIG['rate_limit_rate']:
+        body = {'code': 'Throttling', 'message': 'Requests rate limit exceeded'} if dashscope else \
+            {'error': {'code': 'rate_limit_exceeded', 'message': 'Rate limit reached'}}
+        return JSONResponse(body, status_code=429, headers={'Retry-After': str(CONFIG['retry_after'])})
+    if roll < CONFIG['rate_limit_rate'] + CONFIG['error_rate']:
+        body = {'code': 'InternalError', 'message': 'Mock internal error'} if dashscope else \
+            {'error': {'code': 'internal_error', 'message': 'Mock internal error'}}
+        return JSONResponse(body, status_code=500)
+    return None
+
+
+async def chat_completions(request: Request):
+    payload = await request.json()
+    failure = failure_response()
+    if failure is not None:
+        await asyncio.sleep(sample_latency() * 0.1)
+        return failure
+
+    messages = json.dumps(payload.get('messages', []), ensure_ascii=False)
+    prompt_tokens = estimate_tokens(messages)
+    cached_tokens = min(prompt_tokens, cached_prefix_chars(messages) // 2)
+    content = sample_content(messages)
+    usage = {
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': estimate_tokens(content),
+        'total_tokens': prompt_tokens + estimate_tokens(content),
+        'prompt_cache_hit_tokens': cached_tokens
+    }
+    # 命中缓存的部分不需要重新计算，按比例缩短延迟
+    speedup = 1 - 0.3 * cached_tokens / prompt_tokens
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    model = payload.get('model', 'mock')
+
+    if not payload.get('stream'):
+        await asyncio.sleep(sample_latency() * speedup)
+        return {
+            'id': completion_id,
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+            'usage': usage
+        }
+
+    async def events():
+        # 首个分片前等待部分延迟，其余时间均匀分布在各分片之间
+        latency = sample_latency()
+        await asyncio.sleep(latency * 0.3 * speedup)
+        pieces = [content[i:i + 4] for i in range(0, len(content), 4)]
+        delay = min(CONFIG['stream_chunk_delay'], latency * 0.7 / max(1, len(pieces)))
+        for piece in pieces:
+            chunk = {'id': completion_id, 'object': 'chat.completion.chunk', 'model': model,
+                     'choices': [{'index': 0, 'delta': {'content': piece}, 'finish_reason': None}]}
+            yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+            await asyncio.sleep(delay)
+        final = {'id': completion_id, 'object': 'chat.completion.chunk', 'model': model, 'choices': [], 'usage': usage}
+        yield f"data: {json.dumps(final)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type='text/event-stream')
+
+
+app.add_api_route('/chat/completions', chat_completions, methods=['POST'])
+app.add_api_route('/v1/chat/completions', chat_completions, methods=['POST'])
+app.add_api_route('/api/v3/chat/completions', chat_completions, methods=['POST'])
+
+
+@app.post('/api/v1/services/aigc/text-generation/generation')
+async def dashscope_generation(request: Request):
+    """DashScope文本生成接口（result_format='message'）"""
+    payload = await request.json()
+    request_id = str(uuid.uuid4())
+    failure = failure_response(dashscope=True)
+    if failure is not None:
+        await asyncio.sleep(sample_latency() * 0.1)
+        return failure
+
+    await asyncio.sleep(sample_latency())
+    messages = payload.get('input', {}).get('messages', [])
+    content = sample_content(json.dumps(messages, ensure_ascii=False))
+    return {
+        'request_id': request_id,
+        'output': {
+            'choices': [{'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': content}}]
+        },
+        'usage': {
+            'input_tokens': estimate_tokens(json.dumps(messages, ensure_ascii=False)),
+            'output_tokens': estimate_tokens(content)
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟AI提供商')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9000)
+    parser.add_argument('--latency-median', type=float, default=CONFIG['latency_median'], help='延迟中位数（秒）')
+    parser.add_argument('--latency-sigma', type=float, default=CONFIG['latency_sigma'], help='对数正态分布的sigma，越大长尾越明显')
+    parser.add_argument('--error-rate', type=float, default=CONFIG['error_rate'], help='返回500的比例')
+    parser.add_argument('--rate-limit-rate', type=float, default=CONFIG['rate_limit_rate'], help='返回429的比例')
+    parser.add_argument('--retry-after', type=int, default=CONFIG['retry_after'], help='429响应的Retry-After（秒）')
+    parser.add_argument('--prefix-cache', action=argparse.BooleanOptionalAction, default=CONFIG['prefix_cache'],
+                        help='模拟提示词前缀缓存（返回 prompt_cache_hit_tokens）')
+    parser.add_argument('--malformed-rate', type=float, default=CONFIG['malformed_rate'], help='返回非法JSON的比例')
+    args = parser.parse_args()
+
+    for key in ('latency_median', 'latency_sigma', 'error_rate', 'rate_limit_rate', 'retry_after', 'malformed_rate',
+                'prefix_cache'):
+        CONFIG[key] = getattr(args, key)
+    uvicorn.run(app, host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+AI返回内容解析的基准测试
+用 bench/malformed_outputs.jsonl 中收集的模型输出（包含各种格式瑕疵），
+对比旧版解析逻辑和 ai_response.parse_ai_response 的解析成功率与单次耗时
+
+用法：
+    python bench/parse_benchmark.py [--repeat 2000]
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ai_response import parse_ai_response  # noqa: E402
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'malformed_outputs.jsonl')
+
+
+def legacy_parse(result_text: str) -> dict:
+    """旧版 main.parse_ai_response 的逻辑（作为对比基线）"""
+    try:
+        result = json.loads(result_text)
+        return {
+            'summary': result.get('summary', '').strip(),
+            'keywords': result.get('keywords', '').strip(),
+            'slug': result.get('slug', '').strip()
+        }
+    except json.JSONDecodeError:
+        try:
+            json_match = re.search(r'\{[^{}]*"summary"[^{}]*\}', result_text, re.DOTALL)
+            if json_match:
+                result = json.loads(json_match.group())
+                return {
+                    'summary': result.get('summary', '').strip(),
+                    'keywords': result.get('keywords', '').strip(),
+                    'slug': result.get('slug', '').strip()
+                }
+        except Exception:
+            pass
+        summary_match = re.search(r'"summary"\s*:\s*"([^"]+)"', result_text)
+        keywords_match = re.search(r'"keywords"\s*:\s*"([^"]+)"', result_text)
+        slug_match = re.search(r'"slug"\s*:\s*"([^"]+)"', result_text)
+        return {
+            'summary': summary_match.group(1) if summary_match else '',
+            'keywords': keywords_match.group(1) if keywords_match else '',
+            'slug': slug_match.group(1) if slug_match else ''
+        }
+
+
+def safe_parse(parser, text: str) -> dict:
+    try:
+        return parser(text)
+    except Exception:
+        return {'summary': '', 'keywords': '', 'slug': ''}
+
+
+def is_success(result: dict, expected_summary: str) -> bool:
+    """摘要与预期一致，且关键词和slug非空"""
+    return result['summary'] == expected_summary and bool(result['keywords']) and bool(result['slug'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='AI返回内容解析基准测试')
+    parser.add_argument('--repeat', type=int, default=2000, help='每条样本的计时重复次数')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    with open(CORPUS, encoding='utf-8') as f:
+        cases = [json.loads(line) for line in f if line.strip()]
+
+    print(f"{'样本':<24}{'旧版':>8}{'新版':>8}{'旧版(µs)':>12}{'新版(µs)':>12}")
+    totals = {'legacy': [0, 0.0], 'new': [0, 0.0]}
+    for case in cases:
+        row = []
+        for name, func in (('legacy', legacy_parse), ('new', parse_ai_response)):
+            ok = is_success(safe_parse(func, case['text']), case['summary'])
+            seconds = min(timeit.repeat(lambda: safe_parse(func, case['text']), number=args.repeat, repeat=3)) / args.repeat
+            totals[name][0] += ok
+            totals[name][1] += seconds
+            row.append((ok, seconds))
+        (legacy_ok, legacy_s), (new_ok, new_s) = row
+        print(f"{case['case']:<24}{'✓' if legacy_ok else '✗':>8}{'✓' if new_ok else '✗':>8}"
+              f"{legacy_s * 1e6:>12.1f}{new_s * 1e6:>12.1f}")
+
+    count = len(cases)
+    print(f"\n成功率 - 旧版: {totals['legacy'][0]}/{count}, 新版: {totals['new'][0]}/{count}")
+    print(f"平均耗时 - 旧版: {totals['legacy'][1] / count * 1e6:.1f}µs, 新版: {totals['new'][1] / count * 1e6:.1f}µs")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+AI提供商熔断器
+按提供商统计最近调用的失败率和连续超时次数，异常时熔断（open），
+熔断期间直接跳过该提供商；冷却后进入半开（half_open）状态放行少量探测请求，
+探测成功则恢复（closed），失败则重新熔断
+"""
+
+import os
+import time
+import logging
+from collections import deque
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+# 熔断配置 - 从环境变量读取，如果没有则使用默认值
+CB_WINDOW = int(os.getenv('CB_WINDOW', '20'))  # 统计失败率的最近调用数
+CB_MIN_CALLS = int(os.getenv('CB_MIN_CALLS', '5'))  # 样本少于该值时不按失败率熔断
+CB_FAILURE_RATE = float(os.getenv('CB_FAILURE_RATE', '0.5'))
+CB_CONSECUTIVE_TIMEOUTS = int(os.getenv('CB_CONSECUTIVE_TIMEOUTS', '3'))
+CB_OPEN_SECONDS = float(os.getenv('CB_OPEN_SECONDS', '30'))
+CB_HALF_OPEN_CALLS = int(os.getenv('CB_HALF_OPEN_CALLS', '1'))
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """单个提供商的熔断器"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = STATE_CLOSED
+        self.outcomes = deque(maxlen=CB_WINDOW)  # True 表示成功
+        self.consecutive_timeouts = 0
+        self.opened_at = 0.0
+        self.half_open_in_flight = 0
+        self.skipped = 0
+
+    def allow_request(self) -> bool:
+        """是否放行一次调用；半开状态下放行的调用必须以 record_* 或 release 结束"""
+        if self.state == STATE_OPEN:
+            if time.monotonic() - self.opened_at < CB_OPEN_SECONDS:
+                self.skipped += 1
+                return False
+            self.state = STATE_HALF_OPEN
+            self.half_open_in_flight = 0
+            logger.info(f"熔断器进入半开状态，放行探测请求 - 提供商: {self.name}")
+        if self.state == STATE_HALF_OPEN:
+            if self.half_open_in_flight >= CB_HALF_OPEN_CALLS:
+                self.skipped += 1
+                return False
+            self.half_open_in_flight += 1
+        return True
+
+    def release(self):
+        """调用被取消（未产生结果）时归还半开探测名额，不计入统计"""
+        if self.state == STATE_HALF_OPEN and self.half_open_in_flight > 0:
+            self.half_open_in_flight -= 1
+
+    def record_success(self):
+        self.consecutive_timeouts = 0
+        if self.state == STATE_HALF_OPEN:
+            logger.info(f"探测请求成功，熔断器恢复 - 提供商: {self.name}")
+            self.state = STATE_CLOSED
+            self.outcomes.clear()
+        self.outcomes.append(True)
+
+    def record_failure(self, timeout: bool = False):
+        self.outcomes.append(False)
+        self.consecutive_timeouts = self.consecutive_timeouts + 1 if timeout else 0
+        if self.state == STATE_HALF_OPEN:
+            self._open('探测请求失败')
+            return
+        if self.state != STATE_CLOSED:
+            return
+        if self.consecutive_timeouts >= CB_CONSECUTIVE_TIMEOUTS:
+            self._open(f'连续超时 {self.consecutive_timeouts} 次')
+        elif len(self.outcomes) >= CB_MIN_CALLS and self.failure_rate() >= CB_FAILURE_RATE:
+            self._open(f'失败率 {self.failure_rate():.0%}')
+
+    def failure_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def _open(self, reason: str):
+        self.state = STATE_OPEN
+        self.opened_at = time.monotonic()
+        self.half_open_in_flight = 0
+        logger.warning(f"熔断器打开 - 提供商: {self.name}, 原因: {reason}, {CB_OPEN_SECONDS:.0f}秒内跳过该提供商")
+
+    def snapshot(self) -> dict:
+        """当前状态（用于接口展示）"""
+        retry_in = 0.0
+        if self.state == STATE_OPEN:
+            retry_in = max(0.0, CB_OPEN_SECONDS - (time.monotonic() - self.opened_at))
+        return {
+            'state': self.state,
+            'failure_rate': round(self.failure_rate(), 3),
+            'recent_calls': len(self.outcomes),
+            'consecutive_timeouts': self.consecutive_timeouts,
+            'retry_in_seconds': round(retry_in, 1),
+            'skipped': self.skipped
+        }
+
+
+class CircuitBreakerRegistry:
+    """按提供商名称管理熔断器"""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, name: str) -> CircuitBreaker:
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            breaker = self._breakers[name] = CircuitBreaker(name)
+        return breaker
+
+    def snapshot(self) -> dict:
+        return {name: breaker.snapshot() for name, breaker in self._breakers.items()}
@@ -0,0 +1,22 @@
+"""
+测试公共配置
+导入 main 时会在当前目录下创建 logs/、history/ 等目录并打开其中的数据库，
+因此在临时目录中导入，整个测试会话共用同一个 main 模块
+"""
+
+import os
+import importlib
+
+import pytest
+
+
+@pytest.fixture(scope='session')
+def app_main(tmp_path_factory):
+    workdir = tmp_path_factory.mktemp('app')
+    (workdir / 'logs').mkdir()
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        yield importlib.import_module('main')
+    finally:
+        os.chdir(cwd)
@@ -0,0 +1,225 @@
+"""
+文章内容压缩
+在给定的Token预算内，从文章中挑选信息量最高的内容放入提示词：
+标题性段落、各段首句，以及按TF-IDF打分排序的句子，最终按原文顺序拼接
+"""
+
+import os
+import re
+import math
+from collections import Counter
+from typing import List
+
+# 压缩配置 - 从环境变量读取，如果没有则使用默认值
+CONTENT_CONDENSE_ENABLED = os.getenv('CONTENT_CONDENSE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+CONTENT_TOKEN_BUDGET = int(os.getenv('CONTENT_TOKEN_BUDGET', '1000'))
+
+# 各提供商分词器的粗略系数：每个中文字符约对应的Token数，其他字符约每4个1个Token
+TOKENS_PER_CJK = {
+    'qwen': 0.8,
+    'deepseek': 0.6,
+    'doubao': 0.7
+}
+DEFAULT_TOKENS_PER_CJK = 1.0
+
+CJK_PATTERN = re.compile(r'[一-鿿]')
+SENTENCE_PATTERN = re.compile(r'[^。！？!?；;]*[。！？!?；;]+|[^。！？!?；;]+$')
+LATIN_WORD_PATTERN = re.compile(r'[a-zA-Z][a-zA-Z0-9\-]+|\d+(?:\.\d+)?%?')
+HEADING_END_PUNCTUATION = tuple('。！？!?；;，,：:、')
+
+# 常见虚词，不参与打分
+STOP_CHARS = set('的了是在和与及或而也都就要把被这那有为之其中对将从于以并等')
+
+# 标题性段落的最大长度（字符）
+HEADING_MAX_CHARS = 30
+
+
+def estimate_tokens(text: str, provider: str = None) -> int:
+    """按提供商粗略估算文本的Token数"""
+    cjk = len(CJK_PATTERN.findall(text))
+    ratio = TOKENS_PER_CJK.get(provider, DEFAULT_TOKENS_PER_CJK)
+    return int(cjk * ratio + (len(text) - cjk) / 4) + 1
+
+
+def is_heading(paragraph: str) -> bool:
+    """短且不以句读结尾的段落视为小标题"""
+    return len(paragraph) <= HEADING_MAX_CHARS and not paragraph.endswith(HEADING_END_PUNCTUATION)
+
+
+def split_sentences(paragraph: str) -> List[str]:
+    return [s.strip() for s in SENTENCE_PATTERN.findall(paragraph) if s.strip()]
+
+
+def extract_terms(text: str) -> List[str]:
+    """提取打分用的词项：中文使用相邻二字组合（无需分词词典），英文和数字使用整词"""
+    terms = [w.lower() for w in LATIN_WORD_PATTERN.findall(text)]
+    chars = [ch if CJK_PATTERN.match(ch) and ch not in STOP_CHARS else ' ' for ch in text]
+    for a, b in zip(chars, chars[1:]):
+        if a != ' ' and b != ' ':
+            terms.append(a + b)
+    return terms
+
+
+def condense_content(title: str, content: str, budget_tokens: int = CONTENT_TOKEN_BUDGET,
+                     provider: str = None) -> str:
+    """在Token预算内压缩文章内容
+
+    内容本身未超出预算时原样返回（去除空段落）；否则按以下优先级选取句子，直到用完预算：
+    第一段首句 > 小标题 > 各段首句 > 其余句子（按TF-IDF得分，与标题重合的词项加权）
+    """
+    paragraphs = [p.strip() for p in content.split('\n') if p.strip()]
+    compact = '\n'.join(paragraphs)
+    if estimate_tokens(compact, provider) <= budget_tokens:
+        return compact
+
+    # 拆分句子，记录 (段落序号, 句子序号, 文本, 是否小标题)
+    units = []
+    for p_index, paragraph in enumerate(paragraphs):
+        if is_heading(paragraph):
+            units.append((p_index, 0, paragraph, True))
+            continue
+        for s_index, sentence in enumerate(split_sentences(paragraph)):
+            units.append((p_index, s_index, sentence, False))
+
+    # 以段落为文档计算IDF
+    paragraph_terms = [set(extract_terms(p)) for p in paragraphs]
+    document_frequency = Counter(term for terms in paragraph_terms for term in terms)
+    total = len(paragraphs)
+    title_terms = set(extract_terms(title))
+
+    def score(text: str) -> float:
+        terms = extract_terms(text)
+        if not terms:
+            return 0.0
+        weight = 0.0
+        for term, count in Counter(terms).items():
+            idf = math.log((1 + total) / (1 + document_frequency.get(term, 0))) + 1
+            weight += count * idf * (2.0 if term in title_terms else 1.0)
+        return weight / math.sqrt(len(terms))
+
+    def priority(unit):
+        p_index, s_index, text, heading = unit
+        if p_index == 0 and s_index == 0:
+            return (0, 0.0)
+        if heading:
+            return (1, 0.0)
+        if s_index == 0:
+            return (2, -score(text))
+        return (3, -score(text))
+
+    selected = set()
+    used = 0
+    for index in sorted(range(len(units)), key=lambda i: priority(units[i])):
+        cost = estimate_tokens(units[index][2], provider)
+        if used + cost > budget_tokens:
+            continue
+        selected.add(index)
+        used += cost
+
+    if not selected:
+        # 单句即超出预算（如没有标点的超长段落），退化为按字符截断
+        return compact[:budget_tokens]
+
+    # 按原文顺序拼接，同一段落的句子合并为一行
+    lines = []
+    current_paragraph = None
+    for index in sorted(selected):
+        p_index, _, text, _ = units[index]
+        if p_index == current_paragraph:
+            lines[-1] += text
+        else:
+            lines.append(text)
+            current_paragraph = p_index
+    return '\n'.join(lines)
+
+
+# 摘要不应使用的开头（与提示词要求一致）
+SUMMARY_OPENER_PATTERN = re.compile(r'^(?:本文|文章|这篇文章|本篇文章|本篇)[，,：:、]?\s*')
+CLAUSE_PATTERN = re.compile(r'[^，,；;：:]*[，,；;：:]|[^，,；;：:]+$')
+SENTENCE_END = '。！？!?'
+# 截断后的摘要短于该长度时视为不可用
+SUMMARY_MIN_CHARS = 15
+
+
+def fit_sentence(sentence: str, max_chars: int) -> str:
+    """句子超出长度时按分句截断（在逗号等处断开，以句号结尾），无法截断到可用长度时返回空字符串"""
+    sentence = SUMMARY_OPENER_PATTERN.sub('', sentence.strip())
+    if len(sentence) <= max_chars:
+        return sentence
+    result = ''
+    for clause in CLAUSE_PATTERN.findall(sentence):
+        if len(result) + len(clause) > max_chars:
+            break
+        result += clause
+    result = result.rstrip('，,；;：:、 ')
+    if len(result) + 1 > max_chars or len(result) < SUMMARY_MIN_CHARS:
+        return ''
+    return result + '。'
+
+
+def truncate_text(text: str, max_chars: int) -> str:
+    """文本超出长度时截断到 max_chars - 1 个字并加省略号"""
+    text = SUMMARY_OPENER_PATTERN.sub('', text.strip())
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars - 1].rstrip('，,；;：:、 ') + '…'
+
+
+def summarize(title: str, content: str, max_chars: int = 68) -> str:
+    """抽取式摘要：按词项重要性为句子打分，选取得分最高、长度不超过 max_chars 的句子组合
+
+    词项权重为其在全文中的出现次数（与标题重合的词项加倍），句子得分按长度归一化，
+    第一段和各段首句适当加权；最高分句子过长时按分句截断，无法按分句截断时截断到长度上限并加省略号，
+    剩余长度允许时按原文顺序补充其他句子；只有没有任何内容时才使用标题
+    """
+    paragraphs = [p.strip() for p in content.split('\n') if p.strip() and not is_heading(p.strip())]
+    units = []
+    for p_index, paragraph in enumerate(paragraphs):
+        for s_index, sentence in enumerate(split_sentences(paragraph)):
+            units.append((p_index, s_index, sentence))
+    if not units:
+        lines = [p.strip() for p in content.split('\n') if p.strip()]
+        if lines:
+            return truncate_text(lines[0], max_chars)
+        return fit_sentence(title, max_chars) or truncate_text(title, max_chars)
+
+    unit_terms = [extract_terms(text) for _, _, text in units]
+    frequency = Counter(term for terms in unit_terms for term in set(terms))
+    title_terms = set(extract_terms(title))
+
+    def score(index: int) -> float:
+        p_index, s_index, _ = units[index]
+        terms = set(unit_terms[index])
+        if not terms:
+            return 0.0
+        weight = sum(frequency[t] * (2.0 if t in title_terms else 1.0) for t in terms) / math.sqrt(len(terms))
+        if p_index == 0:
+            weight *= 1.3
+        if s_index == 0:
+            weight *= 1.2
+        return weight
+
+    ranked = sorted(range(len(units)), key=score, reverse=True)
+    chosen = {}
+    for index in ranked:
+        fitted = fit_sentence(units[index][2], max_chars)
+        if fitted:
+            chosen[index] = fitted
+            break
+    if not chosen:
+        chosen[ranked[0]] = truncate_text(units[ranked[0]][2], max_chars)
+
+    # 剩余长度允许时补充其他完整句子
+    used = sum(len(s) for s in chosen.values())
+    for index in ranked:
+        if index in chosen:
+            continue
+        sentence = SUMMARY_OPENER_PATTERN.sub('', units[index][2].strip())
+        if used + len(sentence) <= max_chars and len(sentence) >= SUMMARY_MIN_CHARS:
+            chosen[index] = sentence
+            used += len(sentence)
+
+    summary = ''.join(chosen[i] for i in sorted(chosen))
+    if summary[-1] not in SENTENCE_END + '…' and len(summary) < max_chars:
+        summary += '。'
+    return summary
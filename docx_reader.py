@@ -0,0 +1,337 @@
+"""
+Word文档快速读取
+直接从上传的字节中读取 word/document.xml（以及用于判断标题样式的 styles.xml），
+用增量XML解析器逐段处理，不写入uploads/、不构建python-docx的完整对象模型；
+表格、图片等内容不展开（图片数据不会被读取），已处理的段落随即释放。
+
+提取规则与python-docx一致：只取正文中的顶层段落（不含表格内的段落），
+段落文本由段落及其超链接下的文本块拼接（w:t、制表符、换行等），
+样式按 styleId 查找，找不到或类型不是段落样式时使用默认段落样式
+
+解析前检查上传大小和解压后的XML总大小（按压缩包中登记的大小，zipfile读取时不会超出），
+防止压缩炸弹
+
+提示词只需要文章开头部分，长文档按 DOCX_CONTENT_BUDGET 提前结束解析：前一半预算读取全文，
+之后只保留各节标题和节首段落，预算用完即停止构建元素；全文统计（字数、段落、标题、表格、图片）
+对 document.xml 的字节直接做正则计数，不解析XML，书籍长度的文档也只多出解压和扫描的开销
+"""
+
+import io
+import os
+import re
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from content_condense import is_heading
+
+# 读取方式配置 - 从环境变量读取，如果没有则使用默认值
+DOCX_FAST_READER = os.getenv('DOCX_FAST_READER', 'true').lower() in ('1', 'true', 'yes')
+DOCX_MAX_UPLOAD_MB = float(os.getenv('DOCX_MAX_UPLOAD_MB', '50'))  # 上传文件大小上限
+DOCX_MAX_XML_MB = float(os.getenv('DOCX_MAX_XML_MB', '100'))  # 解压后的XML部件总大小上限
+DOCX_CONTENT_BUDGET = int(os.getenv('DOCX_CONTENT_BUDGET', '8000'))  # 读取的正文字符数上限，0表示全部读取
+
+READ_CHUNK = 64 * 1024
+
+MB = 1024 * 1024
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+REL = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+RT_OFFICE_DOCUMENT = '/officeDocument'
+RT_STYLES = '/styles'
+
+P, R, HYPERLINK, PPR, PSTYLE = W + 'p', W + 'r', W + 'hyperlink', W + 'pPr', W + 'pStyle'
+T, TAB, BR, CR, NO_BREAK_HYPHEN, PTAB = W + 't', W + 'tab', W + 'br', W + 'cr', W + 'noBreakHyphen', W + 'ptab'
+VAL, TYPE = W + 'val', W + 'type'
+
+# 文本块中非 w:t 元素对应的文本（w:br 只有换行类型对应"\n"，分页、分栏为空）
+RUN_CHARS = {TAB: '\t', CR: '\n', NO_BREAK_HYPHEN: '-', PTAB: '\t'}
+ON_VALUES = ('1', 'true', 'on')
+
+# styles.xml 中的内部样式名与界面显示名（与python-docx相同，"heading 1" 显示为 "Heading 1"）
+STYLE_UI_NAMES = {'caption': 'Caption', 'footer': 'Footer', 'header': 'Header'}
+STYLE_UI_NAMES.update({f'heading {i}': f'Heading {i}' for i in range(1, 10)})
+
+# 字节计数用的模式（Word、WPS、LibreOffice等生成的文档都使用 w: 前缀）
+STANDARD_NAMESPACE = b'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+RAW_TEXT = re.compile(rb'<w:t(?:\s[^>]*)?>([^<]*)</w:t>')
+RAW_STYLE = re.compile(rb'<w:pStyle\s[^>]*?w:val="([^"]*)"')
+RAW_ENTITY = re.compile(rb'&[#\w]+;')
+# w:tbl、w:drawing 没有属性，w:pict 几乎没有
+RAW_PARAGRAPH_TAGS = (b'</w:p>', b'<w:p/>')
+RAW_TABLE_TAGS = (b'<w:tbl>',)
+RAW_IMAGE_TAGS = (b'<w:drawing>', b'<w:pict>')
+# UTF-8中：后续字节（删除后每个字符剩一个字节）、U+4E00-U+9FFF的首字节、空白（只计ASCII空白）
+UTF8_CONTINUATION = bytes(range(0x80, 0xC0))
+CJK_LEAD_BYTES = bytes(range(0xE4, 0xEA))
+ASCII_SPACES = b' \t\r\n'
+# 英文字母和数字映射为 a、其他字节映射为空格，单词数即 " a" 出现的次数
+WORD_TABLE = bytes(0x61 if chr(i).isascii() and chr(i).isalnum() else 0x20 for i in range(256))
+
+_default_styles: Optional[bytes] = None
+
+
+class DocumentLimitError(Exception):
+    """文档超出解析限制（文件大小、解压后的XML大小、CPU时间或内存）"""
+
+
+def check_upload_size(data: bytes):
+    if len(data) > DOCX_MAX_UPLOAD_MB * MB:
+        raise DocumentLimitError(f"文件大小 {len(data) / MB:.1f} MB，超过上限 {DOCX_MAX_UPLOAD_MB:g} MB")
+
+
+def check_archive(archive: zipfile.ZipFile):
+    """解压后的XML部件（.xml、.rels）总大小超过上限时抛出 DocumentLimitError"""
+    total = sum(info.file_size for info in archive.infolist() if info.filename.endswith(('.xml', '.rels')))
+    if total > DOCX_MAX_XML_MB * MB:
+        raise DocumentLimitError(f"解压后的XML共 {total / MB:.1f} MB，超过上限 {DOCX_MAX_XML_MB:g} MB")
+
+
+def _default_styles_xml() -> bytes:
+    """文档缺少样式部件时python-docx使用的默认样式表"""
+    global _default_styles
+    if _default_styles is None:
+        import docx
+        path = os.path.join(os.path.dirname(docx.__file__), 'templates', 'default-styles.xml')
+        with open(path, 'rb') as f:
+            _default_styles = f.read()
+    return _default_styles
+
+
+def _relationship_target(archive: zipfile.ZipFile, source: str, rel_type: str) -> Optional[str]:
+    """按关系类型查找部件路径（source 为空字符串表示包级关系）"""
+    folder, name = posixpath.split(source)
+    rels_path = posixpath.join(folder, '_rels', name + '.rels')
+    try:
+        root = ET.fromstring(archive.read(rels_path))
+    except KeyError:
+        return None
+    for rel in root.iter(REL + 'Relationship'):
+        if rel.get('Type', '').endswith(rel_type) and rel.get('TargetMode') != 'External':
+            target = rel.get('Target', '')
+            if target.startswith('/'):
+                return target[1:]
+            return posixpath.normpath(posixpath.join(folder, target))
+    return None
+
+
+def _paragraph_styles(data: bytes) -> Tuple[Dict[str, Optional[str]], Optional[str]]:
+    """解析样式表，返回 (段落样式ID -> 显示名, 默认段落样式的显示名)"""
+    names, default = {}, None
+    for style in ET.fromstring(data).iter(W + 'style'):
+        if style.get(TYPE) != 'paragraph':
+            continue
+        name_element = style.find(W + 'name')
+        name = name_element.get(VAL) if name_element is not None else None
+        name = STYLE_UI_NAMES.get(name, name)
+        # 样式ID重复时与python-docx一样取第一个
+        names.setdefault(style.get(W + 'styleId'), name)
+        if style.get(W + 'default') in ON_VALUES:
+            default = name
+    return names, default
+
+
+class DocumentStats:
+    """按字节统计 document.xml 中的字数、段落、标题、表格和图片（不构建元素，可与解析同时进行）
+
+    字数与Word的统计方式相同：每个中文字符计1，英文单词和数字计1；包含表格中的文字。
+    计数直接在UTF-8字节上进行（中文按首字节判断，含少量扩展A区字符）
+    """
+
+    def __init__(self, heading_ids: Set[bytes]):
+        self.heading_ids = heading_ids
+        self.carry = b''
+        self.standard = None
+        self.counts = {'words': 0, 'characters': 0, 'paragraphs': 0, 'headings': 0, 'tables': 0, 'images': 0}
+
+    def feed(self, chunk: bytes, final: bool = False):
+        data = self.carry + chunk
+        if self.standard is None:
+            self.standard = STANDARD_NAMESPACE in data[:4096]
+        # 在最后一个开始标签处截断，未完整的元素留到下一块
+        end = len(data) if final else max(data.rfind(b'<w:'), 0)
+        self.carry = data[end:]
+        data = data[:end]
+        text = b''.join(RAW_TEXT.findall(data))
+        if b'&' in text:
+            text = RAW_ENTITY.sub(b'&', text)
+        leads = text.translate(None, UTF8_CONTINUATION)
+        counts = self.counts
+        counts['characters'] += len(leads.translate(None, ASCII_SPACES))
+        latin_words = (b' ' + text.translate(WORD_TABLE)).count(b' a')
+        counts['words'] += len(leads) - len(leads.translate(None, CJK_LEAD_BYTES)) + latin_words
+        counts['paragraphs'] += sum(data.count(tag) for tag in RAW_PARAGRAPH_TAGS)
+        counts['tables'] += sum(data.count(tag) for tag in RAW_TABLE_TAGS)
+        counts['images'] += sum(data.count(tag) for tag in RAW_IMAGE_TAGS)
+        if self.heading_ids:
+            counts['headings'] += sum(1 for style_id in RAW_STYLE.findall(data) if style_id in self.heading_ids)
+
+    def result(self, truncated: bool) -> Optional[dict]:
+        """统计结果；文档使用非标准命名空间前缀时无法按字节计数，返回None"""
+        if not self.standard:
+            return None
+        return {**self.counts, 'truncated': truncated}
+
+
+def pull_events(stream, stats: DocumentStats) -> Iterator[tuple]:
+    """分块读取 document.xml，每块同时交给统计和增量解析器，产出解析事件"""
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    while True:
+        chunk = stream.read(READ_CHUNK)
+        if not chunk:
+            break
+        stats.feed(chunk)
+        parser.feed(chunk)
+        yield from parser.read_events()
+    stats.feed(b'', final=True)
+    parser.close()
+    yield from parser.read_events()
+
+
+def iter_paragraphs(events: Iterable[tuple], style_names: Dict[str, Optional[str]],
+                    default_style: Optional[str]) -> Iterator[Tuple[str, str]]:
+    """由 document.xml 的解析事件按顺序产出正文顶层段落的 (文本, 样式显示名)
+
+    元素深度：document(0) > body(1) > p(2) > r / hyperlink / pPr(3) > ...
+    """
+    path = []
+    body = None
+    parts: List[str] = []
+    style_id = None
+    for event, elem in events:
+        if event == 'start':
+            path.append(elem.tag)
+            if len(path) == 2:
+                body = elem
+            continue
+        tag = path.pop()
+        depth = len(path)
+        if depth == 2:
+            if tag == P:
+                name = style_names[style_id] if style_id in style_names else default_style
+                yield ''.join(parts), name or ''
+                parts = []
+                style_id = None
+            # 已处理的顶层元素（段落、表格等）不再需要，释放内存
+            body.remove(elem)
+        elif depth > 3 and path[2] == P:
+            if (depth == 4 and path[3] == R) or (depth == 5 and path[4] == R and path[3] == HYPERLINK):
+                if tag == T:
+                    parts.append(elem.text or '')
+                elif tag == BR:
+                    parts.append('\n' if elem.get(TYPE, 'textWrapping') == 'textWrapping' else '')
+                elif tag in RUN_CHARS:
+                    parts.append(RUN_CHARS[tag])
+            elif depth == 4 and tag == PSTYLE and path[3] == PPR:
+                style_id = elem.get(VAL)
+
+
+def select_paragraphs(paragraphs: Iterable[Tuple[str, str]], budget: int) -> Tuple[List[Tuple[str, str]], bool]:
+    """在字符预算内挑选段落，返回 (段落列表, 是否有段落未读取)
+
+    前一半预算按顺序保留全部段落，之后只保留标题（标题样式，或短且不以句读结尾的段落）
+    和标题后的第一个非空段落，预算用完时停止（不再读取后面的段落）
+    """
+    selected = []
+    collected = 0
+    skipped = False
+    lead = False
+    for text, style_name in paragraphs:
+        if budget and collected >= budget // 2:
+            stripped = text.strip()
+            if stripped and (style_name.startswith('Heading') or is_heading(stripped)):
+                lead = True
+            elif lead and stripped:
+                lead = False
+            else:
+                skipped = True
+                continue
+        selected.append((text, style_name))
+        collected += len(text.strip())
+        if budget and collected >= budget:
+            return selected, True
+    return selected, skipped
+
+
+def _open_document(archive: zipfile.ZipFile):
+    """返回 (document.xml 路径, 段落样式ID -> 显示名, 默认段落样式的显示名, 标题样式ID)"""
+    check_archive(archive)
+    document_path = _relationship_target(archive, '', RT_OFFICE_DOCUMENT) or 'word/document.xml'
+    styles_path = _relationship_target(archive, document_path, RT_STYLES)
+    try:
+        styles_xml = archive.read(styles_path) if styles_path else _default_styles_xml()
+    except KeyError:
+        styles_xml = _default_styles_xml()
+    style_names, default_style = _paragraph_styles(styles_xml)
+    heading_ids = {
+        style_id.encode('utf-8') for style_id, name in style_names.items()
+        if style_id and name and name.startswith('Heading')
+    }
+    return document_path, style_names, default_style, heading_ids
+
+
+def read_docx_paragraphs(data: bytes, budget: int = 0) -> Tuple[List[Tuple[str, str]], Optional[dict]]:
+    """从Word文档字节中读取正文顶层段落，返回 ([(文本, 样式显示名)], 全文统计)
+
+    budget 为正文字符预算（见 select_paragraphs），为0时读取全部段落
+    """
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        document_path, style_names, default_style, heading_ids = _open_document(archive)
+        stats = DocumentStats(heading_ids)
+        with archive.open(document_path) as stream:
+            events = pull_events(stream, stats)
+            paragraphs, truncated = select_paragraphs(iter_paragraphs(events, style_names, default_style), budget)
+            # 提前结束时剩余部分只做字节计数
+            for chunk in iter(lambda: stream.read(READ_CHUNK), b''):
+                stats.feed(chunk)
+            stats.feed(b'', final=True)
+    return paragraphs, stats.result(truncated)
+
+
+def parse_document(data: bytes, fast: bool = True, budget: int = DOCX_CONTENT_BUDGET) -> dict:
+    """读取Word文档字节的标题、内容和全文统计（stats）
+
+    fast=False 时使用python-docx读取全部段落（不按预算截断）；两种方式都先检查大小限制
+    """
+    check_upload_size(data)
+    if fast:
+        paragraphs, stats = read_docx_paragraphs(data, budget)
+        return {**build_document(paragraphs), 'stats': stats}
+    from docx import Document
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        document_path, _, _, heading_ids = _open_document(archive)
+        stats = DocumentStats(heading_ids)
+        with archive.open(document_path) as stream:
+            for chunk in iter(lambda: stream.read(READ_CHUNK), b''):
+                stats.feed(chunk)
+        stats.feed(b'', final=True)
+    doc = Document(io.BytesIO(data))
+    return {**build_document((para.text, para.style.name) for para in doc.paragraphs), 'stats': stats.result(False)}
+
+
+def build_document(paragraphs) -> dict:
+    """由 (文本, 样式显示名) 段落序列组装标题和内容：第一个非空段落或标题样式段落作为标题"""
+    title = ""
+    content_parts = []
+    for text, style_name in paragraphs:
+        if style_name.startswith('Heading') or not title:
+            if text.strip():
+                if not title:
+                    title = text.strip()
+                else:
+                    content_parts.append(text.strip())
+        else:
+            content_parts.append(text.strip())
+
+    # 如果没有找到标题，使用第一个段落
+    if not title and content_parts:
+        title = content_parts[0]
+        content_parts = content_parts[1:]
+
+    content = '\n'.join(content_parts)
+
+    return {
+        'title': title or '未命名文档',
+        'content': content or '文档内容为空'
+    }
@@ -0,0 +1,46 @@
+"""
+历史记录CSV增量读取
+历史记录只追加写入，索引（关键词IDF、slug去重）记录已读取到的字节位置，
+之后只读取新追加的完整行；文件比已读取的位置短时说明已被清空或替换，需要从头重建
+"""
+
+import io
+import os
+import csv
+from typing import List, Optional, Tuple
+
+HEADER_FIRST_COLUMN = '时间'
+
+
+def read_appended_rows(path: str, offset: int) -> Tuple[Optional[List[list]], int]:
+    """读取 offset 之后新追加的完整行，返回 (行列表, 新的位置)
+
+    文件被清空或替换时返回 (None, 0)，调用方应重置索引后从头读取；标题行会被跳过，
+    末尾未写完的行留到下次读取
+    """
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        size = 0
+    if size < offset:
+        return None, 0
+    if size == offset:
+        return [], offset
+
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read(size - offset)
+    end = data.rfind(b'\n') + 1
+    if end == 0:
+        return [], offset
+    reader = csv.reader(io.StringIO(data[:end].decode('utf-8-sig', errors='replace')))
+    rows = [row for row in reader if row and row[0] != HEADER_FIRST_COLUMN]
+    return rows, offset + end
+
+
+def has_changed(path: str, offset: int) -> bool:
+    """文件大小与已读取的位置不同（有新追加的内容，或被清空、删除）"""
+    try:
+        return os.path.getsize(path) != offset
+    except OSError:
+        return offset != 0
@@ -0,0 +1,335 @@
+"""
+SEO处理任务队列
+提交的文档写入 history/ 下的SQLite任务表后立即返回任务ID，由后台worker按提交顺序取出处理，
+客户端通过轮询（或长轮询）获取任务状态和结果。
+执行中的任务记录领取它的worker并定期更新心跳，心跳超时（进程退出或崩溃）的任务会重新排队继续处理，
+多进程部署时不会把其他进程正在执行的任务重新排队。
+SQLite使用一个长连接，所有读写都在线程中执行，数据库被锁定时不阻塞事件循环
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import asyncio
+import logging
+import threading
+from typing import Awaitable, Callable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# 任务队列配置 - 从环境变量读取，如果没有则使用默认值
+JOB_QUEUE_DB = os.getenv('JOB_QUEUE_DB', 'history/seo_jobs.sqlite3')
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '4'))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))  # 重启时被中断的任务最多执行次数
+JOB_RETENTION_DAYS = int(os.getenv('JOB_RETENTION_DAYS', '7'))
+JOB_POLL_INTERVAL = 1.0  # 空闲worker和长轮询检查数据库的间隔（秒），兼容多进程部署
+JOB_HEARTBEAT_INTERVAL = float(os.getenv('JOB_HEARTBEAT_INTERVAL', '10'))  # 执行中任务的心跳间隔（秒）
+JOB_LEASE_SECONDS = float(os.getenv('JOB_LEASE_SECONDS', '60'))  # 心跳超过该时间未更新的任务视为中断
+
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_SUCCEEDED = 'succeeded'
+STATUS_FAILED = 'failed'
+FINISHED_STATUSES = (STATUS_SUCCEEDED, STATUS_FAILED)
+
+# 返回给客户端的字段（不包含上传的文件内容）
+_PUBLIC_COLUMNS = ('id, batch_id, status, filename, provider, result, error, attempts, '
+                   'created_at, started_at, finished_at')
+# worker领取任务时返回的字段
+_CLAIM_COLUMNS = 'id, batch_id, filename, provider, use_cache, pack, data, attempts'
+
+# 处理一组任务，返回与任务顺序一致的结果（单个任务失败时对应位置为异常）
+JobHandler = Callable[[List[dict]], Awaitable[List[Union[dict, Exception]]]]
+
+
+class JobQueue:
+    """基于SQLite的持久化任务队列
+
+    公开方法都是协程（数据库操作在线程中执行）；以下划线开头的同名方法是在线程中执行的同步实现
+    """
+
+    def __init__(self, db_path: str = JOB_QUEUE_DB):
+        self.db_path = db_path
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._changed = asyncio.Event()
+        self._workers: List[asyncio.Task] = []
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=5, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            conn = self._conn
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS seo_jobs ('
+                'id TEXT PRIMARY KEY, batch_id TEXT, status TEXT, filename TEXT, provider TEXT, '
+                'use_cache INTEGER, data BLOB, result TEXT, error TEXT, attempts INTEGER DEFAULT 0, '
+                'created_at REAL, started_at REAL, finished_at REAL, pack INTEGER DEFAULT 0)'
+            )
+            columns = {row['name'] for row in conn.execute('PRAGMA table_info(seo_jobs)')}
+            if 'pack' not in columns:
+                conn.execute('ALTER TABLE seo_jobs ADD COLUMN pack INTEGER DEFAULT 0')
+            if 'worker_id' not in columns:
+                conn.execute('ALTER TABLE seo_jobs ADD COLUMN worker_id TEXT')
+                conn.execute('ALTER TABLE seo_jobs ADD COLUMN heartbeat_at REAL')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_seo_jobs_status ON seo_jobs(status, created_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_seo_jobs_batch ON seo_jobs(batch_id)')
+
+    def _notify(self):
+        """唤醒等待中的worker和长轮询请求"""
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    @staticmethod
+    async def _wait_changed(changed: asyncio.Event, timeout: float):
+        """等待队列变化或超时
+
+        不使用 asyncio.wait_for：Python 3.11 中事件触发与取消同时发生时取消会被吞掉，worker无法停止
+        """
+        waiter = asyncio.ensure_future(changed.wait())
+        try:
+            await asyncio.wait((waiter,), timeout=timeout)
+        finally:
+            waiter.cancel()
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> dict:
+        job = dict(row)
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    async def submit(self, files: List[tuple], provider: Optional[str], use_cache: bool = True,
+                     pack: bool = False) -> dict:
+        """提交一批文档 [(文件名, 文件内容)]，返回批次ID和各任务ID
+
+        pack 为True时，同一批次的任务可以被一起领取，合并为一次AI调用
+        """
+        batch_id = uuid.uuid4().hex
+        now = time.time()
+        jobs = [
+            (uuid.uuid4().hex, batch_id, STATUS_QUEUED, filename, provider, int(use_cache), int(pack), data,
+             now + index * 1e-6)
+            for index, (filename, data) in enumerate(files)
+        ]
+        await asyncio.to_thread(self._submit, jobs)
+        self._notify()
+        return {
+            'batch_id': batch_id,
+            'jobs': [{'id': job[0], 'filename': job[3], 'status': STATUS_QUEUED} for job in jobs]
+        }
+
+    def _submit(self, jobs: List[tuple]):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT INTO seo_jobs (id, batch_id, status, filename, provider, use_cache, pack, data, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                jobs
+            )
+
+    async def claim(self, limit: int = 1) -> List[dict]:
+        """取出最早提交的排队任务并标记为执行中（单条UPDATE保证多个worker/进程不会重复领取）
+
+        该任务允许合并时，同时领取同一批次中其余允许合并的排队任务，最多 limit 个
+        """
+        return await asyncio.to_thread(self._claim, limit)
+
+    def _claim(self, limit: int) -> List[dict]:
+        now = time.time()
+        with self._lock, self._conn:
+            conn = self._conn
+            row = conn.execute(
+                'UPDATE seo_jobs SET status = ?, started_at = ?, attempts = attempts + 1, worker_id = ?, heartbeat_at = ? '
+                'WHERE id = (SELECT id FROM seo_jobs WHERE status = ? ORDER BY created_at LIMIT 1) '
+                f'RETURNING {_CLAIM_COLUMNS}',
+                (STATUS_RUNNING, now, self.worker_id, now, STATUS_QUEUED)
+            ).fetchone()
+            if row is None:
+                return []
+            jobs = [dict(row)]
+            if row['pack'] and limit > 1:
+                rows = conn.execute(
+                    'UPDATE seo_jobs SET status = ?, started_at = ?, attempts = attempts + 1, worker_id = ?, heartbeat_at = ? '
+                    'WHERE id IN (SELECT id FROM seo_jobs WHERE status = ? AND batch_id = ? AND pack = 1 '
+                    'ORDER BY created_at LIMIT ?) '
+                    f'RETURNING {_CLAIM_COLUMNS}',
+                    (STATUS_RUNNING, now, self.worker_id, now, STATUS_QUEUED, row['batch_id'], limit - 1)
+                ).fetchall()
+                jobs.extend(dict(r) for r in rows)
+        return jobs
+
+    def _finish(self, job_id: str, status: str, result: Optional[dict] = None, error: Optional[str] = None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'UPDATE seo_jobs SET status = ?, result = ?, error = ?, finished_at = ?, data = NULL WHERE id = ?',
+                (status, json.dumps(result, ensure_ascii=False) if result else None, error, time.time(), job_id)
+            )
+
+    async def complete(self, job_id: str, result: dict):
+        await asyncio.to_thread(self._finish, job_id, STATUS_SUCCEEDED, result)
+        self._notify()
+
+    async def fail(self, job_id: str, error: str):
+        await asyncio.to_thread(self._finish, job_id, STATUS_FAILED, None, error)
+        self._notify()
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await asyncio.to_thread(self._get, job_id)
+
+    def _get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(f'SELECT {_PUBLIC_COLUMNS} FROM seo_jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    async def get_batch(self, batch_id: str) -> List[dict]:
+        return await asyncio.to_thread(self._get_batch, batch_id)
+
+    def _get_batch(self, batch_id: str) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT {_PUBLIC_COLUMNS} FROM seo_jobs WHERE batch_id = ? ORDER BY created_at', (batch_id,)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    async def stats(self) -> dict:
+        """各状态的任务数"""
+        return await asyncio.to_thread(self._stats)
+
+    def _stats(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute('SELECT status, COUNT(*) FROM seo_jobs GROUP BY status').fetchall()
+        counts = {status: 0 for status in (STATUS_QUEUED, STATUS_RUNNING, STATUS_SUCCEEDED, STATUS_FAILED)}
+        counts.update({row[0]: row[1] for row in rows})
+        return counts
+
+    async def wait_for(self, predicate: Callable[[], Awaitable[bool]], timeout: float) -> bool:
+        """长轮询：等待 await predicate() 为真或超时，返回最后一次检查的结果"""
+        deadline = time.monotonic() + timeout
+        while True:
+            changed = self._changed
+            if await predicate():
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            await self._wait_changed(changed, min(remaining, JOB_POLL_INTERVAL))
+
+    async def heartbeat(self):
+        """更新本进程执行中任务的心跳"""
+        await asyncio.to_thread(self._heartbeat)
+
+    def _heartbeat(self):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'UPDATE seo_jobs SET heartbeat_at = ? WHERE status = ? AND worker_id = ?',
+                (time.time(), STATUS_RUNNING, self.worker_id)
+            )
+
+    async def requeue_stale(self) -> tuple:
+        """心跳超时的执行中任务（执行它的进程已退出）：未超过重试次数的重新排队，否则标记为失败
+
+        没有心跳记录的旧任务按开始时间判断；返回 (重新排队数, 放弃数)
+        """
+        requeued, failed = await asyncio.to_thread(self._requeue_stale)
+        if requeued:
+            self._notify()
+        return requeued, failed
+
+    def _requeue_stale(self) -> tuple:
+        stale_before = time.time() - JOB_LEASE_SECONDS
+        stale = 'status = ? AND COALESCE(heartbeat_at, started_at, 0) < ?'
+        with self._lock, self._conn:
+            requeued = self._conn.execute(
+                'UPDATE seo_jobs SET status = ?, started_at = NULL, worker_id = NULL, heartbeat_at = NULL '
+                f'WHERE {stale} AND attempts < ?',
+                (STATUS_QUEUED, STATUS_RUNNING, stale_before, JOB_MAX_ATTEMPTS)
+            ).rowcount
+            failed = self._conn.execute(
+                f'UPDATE seo_jobs SET status = ?, error = ?, finished_at = ?, data = NULL WHERE {stale}',
+                (STATUS_FAILED, '任务多次中断，已放弃', time.time(), STATUS_RUNNING, stale_before)
+            ).rowcount
+        return requeued, failed
+
+    async def recover(self):
+        """启动时重新排队心跳超时的任务，并清理过期的已结束任务"""
+        requeued, failed = await self.requeue_stale()
+        pruned = await asyncio.to_thread(self._prune)
+        if requeued or failed or pruned:
+            logger.info(f"任务队列恢复 - 重新排队: {requeued}, 放弃: {failed}, 清理过期: {pruned}")
+
+    def _prune(self) -> int:
+        with self._lock, self._conn:
+            return self._conn.execute(
+                'DELETE FROM seo_jobs WHERE finished_at < ?', (time.time() - JOB_RETENTION_DAYS * 86400,)
+            ).rowcount
+
+    async def release(self):
+        """把本进程执行中的任务放回队列（正常关闭时调用，不计入执行次数）"""
+        released = await asyncio.to_thread(self._release)
+        if released:
+            logger.info(f"任务队列关闭 - 放回队列: {released}")
+
+    def _release(self) -> int:
+        with self._lock, self._conn:
+            return self._conn.execute(
+                'UPDATE seo_jobs SET status = ?, started_at = NULL, worker_id = NULL, heartbeat_at = NULL, '
+                'attempts = MAX(attempts - 1, 0) WHERE status = ? AND worker_id = ?',
+                (STATUS_QUEUED, STATUS_RUNNING, self.worker_id)
+            ).rowcount
+
+    async def start(self, handler: JobHandler, workers: int = JOB_WORKERS, group_size: int = 1):
+        """启动后台worker和心跳任务；每个worker每次领取最多 group_size 个任务交给 handler 处理"""
+        await self.recover()
+        self._workers = [asyncio.create_task(self._worker(handler, group_size)) for _ in range(workers)]
+        self._workers.append(asyncio.create_task(self._heartbeat_loop()))
+        logger.info(f"任务队列已启动 - worker数: {workers}, worker标识: {self.worker_id}")
+
+    async def stop(self):
+        """停止worker，正在执行的任务放回队列"""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        try:
+            await self.release()
+        except sqlite3.Error as e:
+            logger.error(f"放回执行中的任务失败: {e}")
+
+    async def _heartbeat_loop(self):
+        """定期更新本进程任务的心跳，并重新排队其他进程留下的心跳超时任务"""
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_INTERVAL)
+            try:
+                await self.heartbeat()
+                requeued, failed = await self.requeue_stale()
+                if requeued or failed:
+                    logger.warning(f"心跳超时的任务 - 重新排队: {requeued}, 放弃: {failed}")
+            except sqlite3.Error as e:
+                logger.error(f"更新任务心跳失败: {e}")
+
+    async def _worker(self, handler: JobHandler, group_size: int):
+        while True:
+            changed = self._changed
+            try:
+                jobs = await self.claim(group_size)
+            except sqlite3.Error as e:
+                logger.error(f"领取任务失败: {e}")
+                jobs = []
+            if not jobs:
+                await self._wait_changed(changed, JOB_POLL_INTERVAL)
+                continue
+
+            try:
+                results = await handler(jobs)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                results = [e] * len(jobs)
+            for job, result in zip(jobs, results):
+                if isinstance(result, Exception):
+                    detail = getattr(result, 'detail', None) or str(result)
+                    logger.error(f"任务执行失败 {job['id']} ({job['filename']}): {detail}")
+                    await self.fail(job['id'], detail)
+                else:
+                    await self.complete(job['id'], result)
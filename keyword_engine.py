@@ -0,0 +1,256 @@
+"""
+本地关键词提取
+不依赖分词库，离线运行：候选词来自历史记录中AI生成过的关键词（作为领域词表）、
+英文单词，以及文章中重复出现的中文片段；按 词频 × IDF 打分，
+IDF 由历史记录（history/seo_history.csv）中的标题和摘要统计，
+索引序列化为压缩的JSON文件，启动时加载一次，之后只增量读取CSV中新追加的行
+"""
+
+import os
+import gzip
+import json
+import math
+import logging
+from collections import Counter
+from typing import Dict, Iterable, List, Set
+
+from content_condense import CJK_PATTERN, LATIN_WORD_PATTERN
+from history_reader import read_appended_rows, has_changed
+
+logger = logging.getLogger(__name__)
+
+# 关键词配置 - 从环境变量读取，如果没有则使用默认值
+KEYWORD_INDEX_PATH = os.getenv('KEYWORD_INDEX_PATH', 'history/keyword_index.json.gz')
+KEYWORD_TOP_K = int(os.getenv('KEYWORD_TOP_K', '6'))
+KEYWORD_INDEX_MAX_TERMS = int(os.getenv('KEYWORD_INDEX_MAX_TERMS', '200000'))  # 超出时丢弃文档频率最低的词项
+KEYWORD_CONTENT_CHARS = 3000  # 参与提取的正文长度
+
+INDEX_VERSION = 1
+# IDF表只统计2-4字的中文片段，更长的词用其中4字片段的最小文档频率估计
+DF_NGRAM_MAX = 4
+# 候选片段的长度范围
+CANDIDATE_MIN = 2
+CANDIDATE_MAX = 6
+# 标题中出现的词权重更高；来自词表的词是已知的"好关键词"
+TITLE_WEIGHT = 3.0
+LEXICON_WEIGHT = 1.5
+# 较长片段的出现次数不低于较短片段的该比例时，较短片段视为它的一部分
+SUBSUME_RATIO = 0.8
+# 两个关键词首尾重叠的中文字数达到该值时视为同一词的不同切分（如"新能源汽车"与"能源汽车产业"）
+OVERLAP_MIN = 2
+LEXICON_MAX_CHARS = 12
+
+# 切分中文片段的虚词（片段不跨越这些字）
+BREAK_CHARS = set('的了是在和与及或而也都就把被这那之其并等着过吗呢吧啊')
+# 常见但没有检索价值的词
+STOP_WORDS = {
+    '我们', '他们', '你们', '一个', '一些', '没有', '可以', '进行', '通过', '以及', '已经', '目前',
+    '这些', '那些', '因为', '所以', '但是', '如果', '表示', '认为', '相关', '方面', '问题', '情况',
+    '同时', '其中', '不仅', '还是', '对于', '今年', '去年', '未来', '随着', '作为', '成为', '主要'
+}
+
+
+def cjk_runs(text: str) -> List[str]:
+    """按非中文字符和虚词切分出连续的中文片段"""
+    runs, current = [], []
+    for ch in text:
+        if CJK_PATTERN.match(ch) and ch not in BREAK_CHARS:
+            current.append(ch)
+        elif current:
+            runs.append(''.join(current))
+            current = []
+    if current:
+        runs.append(''.join(current))
+    return runs
+
+
+def ngrams(text: str, low: int, high: int) -> Iterable[str]:
+    for run in cjk_runs(text):
+        for size in range(low, min(high, len(run)) + 1):
+            for i in range(len(run) - size + 1):
+                yield run[i:i + size]
+
+
+def overlaps(a: str, b: str) -> bool:
+    """两个词互相包含，或一个词的结尾与另一个词的开头有至少 OVERLAP_MIN 个相同的中文字"""
+    if a in b or b in a:
+        return True
+    for left, right in ((a, b), (b, a)):
+        for size in range(min(len(left), len(right)) - 1, OVERLAP_MIN - 1, -1):
+            if left[-size:] == right[:size] and all(CJK_PATTERN.match(ch) for ch in right[:size]):
+                return True
+    return False
+
+
+def split_keywords(value: str) -> List[str]:
+    return [k.strip() for k in value.replace('，', ',').split(',') if k.strip()]
+
+
+class KeywordEngine:
+    """基于历史记录的TF-IDF关键词提取"""
+
+    def __init__(self, history_csv: str, index_path: str = KEYWORD_INDEX_PATH):
+        self.history_csv = history_csv
+        self.index_path = index_path
+        self.docs = 0
+        self.offset = 0  # 已读取到的CSV字节位置
+        self.df: Counter = Counter()
+        self.lexicon: Set[str] = set()
+        self._lexicon_lengths: Dict[str, List[int]] = {}  # 首字 -> 词表中以它开头的词长（降序）
+        self.dirty = False
+
+    def load(self):
+        """加载序列化的索引，并读取CSV中之后新增的记录"""
+        try:
+            with gzip.open(self.index_path, 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == INDEX_VERSION:
+                self.docs = data['docs']
+                self.offset = data['offset']
+                self.df = Counter(data['df'])
+                self._add_lexicon(data['lexicon'])
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"关键词索引损坏，重新构建: {e}")
+            self._reset()
+        self.refresh()
+        logger.info(f"关键词索引已加载 - 文档数: {self.docs}, 词项数: {len(self.df)}, 词表: {len(self.lexicon)}")
+
+    def save(self):
+        """索引有变化时写入文件（先写临时文件再替换）"""
+        if not self.dirty:
+            return
+        if len(self.df) > KEYWORD_INDEX_MAX_TERMS:
+            self.df = Counter(dict(self.df.most_common(KEYWORD_INDEX_MAX_TERMS)))
+        data = {
+            'version': INDEX_VERSION,
+            'docs': self.docs,
+            'offset': self.offset,
+            'df': dict(self.df),
+            'lexicon': sorted(self.lexicon)
+        }
+        tmp_path = self.index_path + '.tmp'
+        try:
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, self.index_path)
+            self.dirty = False
+        except OSError as e:
+            logger.warning(f"保存关键词索引失败: {e}")
+
+    def refresh(self):
+        """读取CSV中新追加的记录；CSV被清空或替换（比已读取的位置短）时重新构建"""
+        rows, offset = read_appended_rows(self.history_csv, self.offset)
+        if rows is None:
+            logger.info("历史记录已被清空或替换，重新构建关键词索引")
+            self._reset()
+            rows, offset = read_appended_rows(self.history_csv, 0)
+        if offset == self.offset:
+            return
+        added = 0
+        for row in rows:
+            if len(row) >= 4:
+                self.add_document(row[1] + '\n' + row[2], split_keywords(row[3]))
+                added += 1
+        self.offset = offset
+        self.dirty = True
+        if added:
+            logger.info(f"关键词索引新增 {added} 篇历史记录")
+
+    def refresh_if_changed(self):
+        if has_changed(self.history_csv, self.offset):
+            self.refresh()
+
+    def add_document(self, text: str, keywords: List[str]):
+        """将一篇历史记录（标题和摘要）计入文档频率，关键词加入词表"""
+        self._add_lexicon(k for k in keywords if CANDIDATE_MIN <= len(k) <= LEXICON_MAX_CHARS)
+        terms = set(ngrams(text, CANDIDATE_MIN, DF_NGRAM_MAX))
+        terms.update(w.lower() for w in LATIN_WORD_PATTERN.findall(text))
+        terms.update(self._lexicon_matches(text))
+        self.df.update(terms)
+        self.docs += 1
+
+    def idf(self, term: str) -> float:
+        df = self.df.get(term)
+        if df is None and len(term) > DF_NGRAM_MAX and CJK_PATTERN.match(term[0]):
+            # 长词：包含它的文档数不超过其任一4字片段的文档数
+            df = min(self.df.get(term[i:i + DF_NGRAM_MAX], 0) for i in range(len(term) - DF_NGRAM_MAX + 1))
+        return math.log((self.docs + 1) / ((df or 0) + 1)) + 1
+
+    def extract(self, title: str, content: str, top_k: int = KEYWORD_TOP_K) -> List[str]:
+        """提取关键词，按得分从高到低返回最多 top_k 个"""
+        body = content[:KEYWORD_CONTENT_CHARS]
+        counts = Counter()
+        title_counts = Counter()
+        lexicon_terms = set()
+        for text, counter in ((title, title_counts), (body, counts)):
+            counter.update(ngrams(text, CANDIDATE_MIN, CANDIDATE_MAX))
+            counter.update(w for w in LATIN_WORD_PATTERN.findall(text) if not w[0].isdigit())
+            # 词表中的词可能跨越虚词或包含英文（如"5G网络"），单独计数
+            for term, count in Counter(self._lexicon_matches(text)).items():
+                counter[term] = max(counter[term], count)
+                lexicon_terms.add(term)
+
+        # 候选：词表中的词、在标题和正文中合计出现两次以上的片段（只出现一次的片段多半是跨词的碎片）
+        candidates = {}
+        for term in set(counts) | set(title_counts):
+            if term in STOP_WORDS:
+                continue
+            if term not in lexicon_terms and counts[term] + title_counts[term] < 2:
+                continue
+            tf = counts[term] + TITLE_WEIGHT * title_counts[term]
+            candidates[term] = tf * LEXICON_WEIGHT if term in lexicon_terms else tf
+
+        # 较长片段出现次数与其中的短片段相当时，去掉短片段（如"新能源"被"新能源汽车"覆盖）
+        for term in sorted(candidates, key=len):
+            if term not in candidates or term in lexicon_terms:
+                continue
+            for longer in candidates:
+                if len(longer) > len(term) and term in longer and candidates[longer] >= candidates[term] * SUBSUME_RATIO:
+                    del candidates[term]
+                    break
+
+        scored = sorted(
+            ((tf * self.idf(term.lower()) * math.sqrt(len(term)), term) for term, tf in candidates.items()),
+            reverse=True
+        )
+        keywords = []
+        for _, term in scored:
+            # 与已选关键词互相包含或首尾重叠的片段跳过
+            if any(overlaps(term, chosen) for chosen in keywords):
+                continue
+            keywords.append(term)
+            if len(keywords) >= top_k:
+                break
+        return keywords
+
+    def snapshot(self) -> dict:
+        return {'docs': self.docs, 'terms': len(self.df), 'lexicon': len(self.lexicon), 'offset': self.offset}
+
+    def _reset(self):
+        self.docs = 0
+        self.offset = 0
+        self.df = Counter()
+        self.lexicon = set()
+        self._lexicon_lengths = {}
+        self.dirty = True
+
+    def _add_lexicon(self, words: Iterable[str]):
+        for word in words:
+            if word in self.lexicon:
+                continue
+            self.lexicon.add(word)
+            lengths = self._lexicon_lengths.setdefault(word[0], [])
+            if len(word) not in lengths:
+                lengths.append(len(word))
+                lengths.sort(reverse=True)
+
+    def _lexicon_matches(self, text: str) -> Iterable[str]:
+        """文本中出现的词表词（同一位置取最长的）"""
+        for i, ch in enumerate(text):
+            for length in self._lexicon_lengths.get(ch, ()):
+                word = text[i:i + length]
+                if word in self.lexicon:
+                    yield word
+                    break
@@ -0,0 +1,172 @@
+"""
+共享的AI接口客户端
+为DeepSeek、豆包等OpenAI兼容接口提供长连接复用的异步客户端，
+为通义千问（DashScope同步SDK）提供有界线程池，
+在应用启动时创建、关闭时释放，避免同步请求阻塞事件循环
+"""
+
+import os
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# 连接池配置 - 从环境变量读取，如果没有则使用默认值
+# 每个上游主机使用独立的连接池，以下限制均为单个主机的上限
+HTTP_MAX_CONNECTIONS = int(os.getenv('HTTP_MAX_CONNECTIONS', '20'))
+HTTP_MAX_KEEPALIVE = int(os.getenv('HTTP_MAX_KEEPALIVE', '10'))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv('HTTP_KEEPALIVE_EXPIRY', '30'))
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '10'))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', '60'))
+HTTP2_ENABLED = os.getenv('HTTP2_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+
+# 通义千问线程池配置：最大并发调用数，以及允许排队等待的请求数
+QWEN_MAX_WORKERS = int(os.getenv('QWEN_MAX_WORKERS', '4'))
+QWEN_MAX_QUEUE = int(os.getenv('QWEN_MAX_QUEUE', '16'))
+QWEN_API_BASE_URL = os.getenv('QWEN_API_BASE_URL', '')  # 为空时使用dashscope默认地址
+
+# 按主机缓存的客户端（进程内共享）
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+# 通义千问客户端状态
+_qwen_initialized = False
+_qwen_generation = None
+_qwen_executor: Optional[ThreadPoolExecutor] = None
+_qwen_pending = 0  # 已提交到线程池、尚未执行完的调用数（调用结束时在线程池的回调中减少）
+_qwen_pending_lock = threading.Lock()
+
+
+class ExecutorQueueFull(Exception):
+    """线程池排队已满，调用方应尽快失败并尝试其他提供商"""
+
+
+def _http2_available() -> bool:
+    """检查是否可以启用HTTP/2（需要安装h2库）"""
+    if not HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        logger.warning("未安装h2库，HTTP/2不可用，回退到HTTP/1.1（可通过 pip install httpx[http2] 安装）")
+        return False
+
+
+def _create_client() -> httpx.AsyncClient:
+    """创建一个带连接池限制的异步客户端"""
+    return httpx.AsyncClient(
+        http2=_http2_available(),
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+    )
+
+
+def get_http_client(url: str) -> httpx.AsyncClient:
+    """获取指定URL所属主机的共享客户端，不存在时创建"""
+    host = urlsplit(url).netloc
+    client = _clients.get(host)
+    if client is None or client.is_closed:
+        client = _create_client()
+        _clients[host] = client
+    return client
+
+
+def init_http_clients(urls: Optional[list] = None):
+    """应用启动时预先创建客户端"""
+    for url in urls or []:
+        get_http_client(url)
+    logger.info(f"HTTP客户端已初始化 - 主机数: {len(_clients)}, 单主机最大连接数: {HTTP_MAX_CONNECTIONS}, HTTP/2: {_http2_available()}")
+
+
+async def close_http_clients():
+    """应用关闭时释放所有连接"""
+    for host, client in list(_clients.items()):
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.warning(f"关闭HTTP客户端失败 {host}: {e}")
+    _clients.clear()
+    logger.info("HTTP客户端已关闭")
+
+
+def init_qwen_client():
+    """初始化通义千问客户端：只在启动时设置一次API密钥并创建线程池"""
+    global _qwen_initialized, _qwen_generation, _qwen_executor
+    if _qwen_initialized:
+        return
+    _qwen_initialized = True
+
+    api_key = os.getenv('DASHSCOPE_API_KEY', '')
+    if not api_key:
+        logger.warning("通义千问API密钥未配置")
+        return
+    try:
+        import dashscope
+        from dashscope import Generation
+    except ImportError:
+        logger.warning("未安装dashscope库，跳过通义千问API")
+        return
+
+    dashscope.api_key = api_key
+    if QWEN_API_BASE_URL:
+        dashscope.base_http_api_url = QWEN_API_BASE_URL
+    _qwen_generation = Generation
+    _qwen_executor = ThreadPoolExecutor(max_workers=QWEN_MAX_WORKERS, thread_name_prefix='qwen')
+    logger.info(f"通义千问客户端已初始化 - 最大并发: {QWEN_MAX_WORKERS}, 最大排队: {QWEN_MAX_QUEUE}")
+
+
+def qwen_client_ready() -> bool:
+    """通义千问客户端是否可用"""
+    init_qwen_client()
+    return _qwen_generation is not None
+
+
+async def call_qwen_generation(**kwargs):
+    """在独立线程池中调用 dashscope.Generation.call，不阻塞事件循环
+
+    同时在途的调用数超过 QWEN_MAX_WORKERS + QWEN_MAX_QUEUE 时直接抛出 ExecutorQueueFull
+    """
+    global _qwen_pending
+    if not qwen_client_ready():
+        return None
+    if _qwen_pending >= QWEN_MAX_WORKERS + QWEN_MAX_QUEUE:
+        raise ExecutorQueueFull(f"通义千问请求排队已满（{_qwen_pending}）")
+
+    # 调用方被取消（如请求超时）后线程仍在执行，计数在线程真正结束时才减少
+    with _qwen_pending_lock:
+        _qwen_pending += 1
+    try:
+        future = _qwen_executor.submit(partial(_qwen_generation.call, **kwargs))
+    except BaseException:
+        _release_qwen_slot()
+        raise
+    future.add_done_callback(_release_qwen_slot)
+    return await asyncio.wrap_future(future)
+
+
+def _release_qwen_slot(_future=None):
+    global _qwen_pending
+    with _qwen_pending_lock:
+        _qwen_pending -= 1
+
+
+def shutdown_qwen_client():
+    """应用关闭时释放线程池"""
+    global _qwen_initialized, _qwen_generation, _qwen_executor
+    if _qwen_executor is not None:
+        _qwen_executor.shutdown(wait=False, cancel_futures=True)
+        logger.info("通义千问线程池已关闭")
+    _qwen_initialized = False
+    _qwen_generation = None
+    _qwen_executor = None
@@ -2,6 +2,10 @@ import os
 import csv
 import logging
 import re
+import json
+import time
+import asyncio
+import functools
 from datetime import datetime
 from pathlib import Path
 from typing import List, Optional
@@ -22,20 +26,51 @@ except ImportError:
                     key, value = line.split('=', 1)
                     os.environ[key.strip()] = value.strip()
 
-from fastapi import FastAPI, File, UploadFile, HTTPException, Query, Form
+from fastapi import FastAPI, File, UploadFile, HTTPException, Query, Form, Request
 from fastapi.responses import HTMLResponse, FileResponse, StreamingResponse
 import uvicorn
-from docx import Document
 from PIL import Image
 import io
 import zipfile
-import aiofiles
+import httpx
 
 # 导入认证模块
 from auth import (
     authenticate, verify_session, get_session_token, delete_session,
     AuthMiddleware, require_auth
 )
+from llm_client import (
+    get_http_client, init_http_clients, close_http_clients,
+    init_qwen_client, qwen_client_ready, call_qwen_generation, shutdown_qwen_client,
+    ExecutorQueueFull, HTTP_CONNECT_TIMEOUT
+)
+from seo_cache import LLMResultCache, make_cache_key, hash_text, LLM_CACHE_ENABLED
+from single_flight import SingleFlight
+from provider_stats import LatencyTracker, HedgeBudget
+from circuit_breaker import CircuitBreakerRegistry
+from provider_router import ProviderRouter, provider_price
+from rate_limiter import (
+    RateLimiterRegistry, RateLimitedError, AdmissionTimeout,
+    parse_retry_after, RATE_LIMIT_MAX_RETRIES
+)
+from usage_store import (
+    UsageStore, start_usage_scope, report_usage, parse_openai_usage,
+    OUTCOME_SUCCESS, OUTCOME_EMPTY, OUTCOME_ERROR, OUTCOME_TIMEOUT, OUTCOME_RATE_LIMITED, OUTCOME_CACHE_HIT
+)
+from content_condense import (
+    condense_content, estimate_tokens, summarize, CONTENT_CONDENSE_ENABLED, CONTENT_TOKEN_BUDGET
+)
+from job_queue import JobQueue, FINISHED_STATUSES
+from ai_response import parse_ai_response
+from keyword_engine import KeywordEngine, KEYWORD_TOP_K
+from slug_engine import SlugIndex, make_slug
+from docx_reader import DocumentLimitError, DOCX_FAST_READER
+from parse_pool import init_parse_pool, shutdown_parse_pool, parse_docx, ParsePoolBusy
+from near_duplicate import NearDuplicateIndex, minhash_signature, NEAR_DUP_ENABLED
+from prompt_layout import format_prompt, PROMPT_PREFIX_CACHE
+from seo_packing import (
+    plan_packs, build_packed_prompt, parse_packed_response, SEO_PACK_ENABLED, SEO_PACK_MAX_DOCS
+)
 
 # 配置日志
 logging.basicConfig(
@@ -67,12 +102,89 @@ app.add_middleware(AuthMiddleware)
 # 配置
 MAX_WEBP_FILES = 20  # 可配置的WebP上传上限
 HISTORY_CSV = 'history/seo_history.csv'
+HISTORY_HEADER = ['时间', '标题', '摘要', '关键词', 'slug', '文章附加', 'AI模型', '结果来源']
+RATINGS_CSV = 'history/ratings.csv'
+RATINGS_HEADER = ['时间', '模型', '标题', '摘要', '关键词', 'Slug', '评分', '结果来源']
+
+# 提供商显示名称（写入历史记录的"AI模型"列）
+MODEL_NAMES = {
+    'qwen': '通义千问',
+    'deepseek': 'DeepSeek',
+    'doubao': '豆包',
+    'local': '本地算法'
+}
+
+# 结果来源（写入历史记录的"结果来源"列）
+RESULT_SOURCE_LABELS = {
+    'ai': 'AI生成',
+    'cache': '缓存命中',
+    'mock': '模拟数据',
+    'local': '本地生成',
+    'reused': '相似文章复用'
+}
+# 评分计入智能路由的结果来源：由该提供商实际生成的结果（模拟数据、本地生成、相似文章复用不计入）
+RATED_SOURCES = ('ai', 'cache')
 
 # AI API 配置 - 支持三个提供商
-# 可选值: 'qwen' (通义千问), 'deepseek' (DeepSeek), 'doubao' (豆包)
+# 可选值: 'qwen' (通义千问), 'deepseek' (DeepSeek), 'doubao' (豆包), 'auto' (智能路由，见 provider_router.py)
 # 默认使用通义千问
 AI_API_PROVIDER = os.getenv('AI_API_PROVIDER', 'qwen')  # 默认使用通义千问
 
+# OpenAI兼容接口地址（可通过环境变量指向代理或本地模拟服务，见 bench/mock_provider.py）
+DEEPSEEK_API_URL = os.getenv('DEEPSEEK_API_URL', "https://api.deepseek.com/chat/completions")
+DOUBAO_API_URL = os.getenv('DOUBAO_API_URL', "https://ark.cn-beijing.volces.com/api/v3/chat/completions")
+
+# 各提供商使用的模型与生成温度
+QWEN_MODEL = 'qwen-turbo'  # 或 'qwen-plus' 更高质量但更贵
+DEEPSEEK_MODEL = 'deepseek-chat'  # 对应DeepSeek-V3.2非思考模式
+# 模型名称需要从火山引擎控制台获取实际的模型端点ID
+DOUBAO_MODEL = os.getenv('DOUBAO_MODEL', 'ep-20251214170039-ml795')
+PROVIDER_MODELS = {
+    'qwen': QWEN_MODEL,
+    'deepseek': DEEPSEEK_MODEL,
+    'doubao': DOUBAO_MODEL
+}
+# 未指定提供商时的尝试顺序
+DEFAULT_PROVIDER_ORDER = ('doubao', 'deepseek', 'qwen')
+# 智能路由：按最近耗时、失败率、成本和评分动态决定尝试顺序
+AUTO_PROVIDER = 'auto'
+# 本地生成：摘要、关键词、slug均由本地算法生成，不调用任何AI接口
+LOCAL_PROVIDER = 'local'
+AI_TEMPERATURE = 0.7
+SUMMARY_MAX_CHARS = 68  # 摘要字数上限（与提示词中的要求一致）
+AI_COMPLETION_TOKENS = 300  # 预估的输出Token数（用于TPM限流）
+
+# 自适应超时：按提供商最近耗时的分位数乘以系数作为读超时，限制在上下限之间；样本不足时使用默认值
+AI_TIMEOUT_ADAPTIVE = os.getenv('AI_TIMEOUT_ADAPTIVE', 'true').lower() in ('1', 'true', 'yes')
+AI_TIMEOUT_DEFAULT = float(os.getenv('AI_TIMEOUT_DEFAULT', '30'))
+AI_TIMEOUT_MIN = float(os.getenv('AI_TIMEOUT_MIN', '8'))
+AI_TIMEOUT_MAX = float(os.getenv('AI_TIMEOUT_MAX', '60'))
+AI_TIMEOUT_PERCENTILE = float(os.getenv('AI_TIMEOUT_PERCENTILE', '0.99'))
+AI_TIMEOUT_FACTOR = float(os.getenv('AI_TIMEOUT_FACTOR', '2'))
+AI_TIMEOUT_MIN_SAMPLES = int(os.getenv('AI_TIMEOUT_MIN_SAMPLES', '20'))
+AI_CONNECT_TIMEOUT_MIN = float(os.getenv('AI_CONNECT_TIMEOUT_MIN', '2'))
+# 调用超时后是否改用其他提供商重试（即使请求指定了提供商）
+AI_TIMEOUT_FALLBACK = os.getenv('AI_TIMEOUT_FALLBACK', 'true').lower() in ('1', 'true', 'yes')
+# 调用超时（httpx超时，或通义千问调用超过读超时）
+TIMEOUT_ERRORS = (httpx.TimeoutException, asyncio.TimeoutError)
+
+# 对冲请求配置：未指定提供商时，主提供商超过对冲延迟仍未返回，则同时请求下一个提供商
+AI_HEDGE_ENABLED = os.getenv('AI_HEDGE_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+AI_HEDGE_DELAY = float(os.getenv('AI_HEDGE_DELAY', '10'))  # 样本不足时使用的默认对冲延迟（秒）
+AI_HEDGE_MIN_DELAY = float(os.getenv('AI_HEDGE_MIN_DELAY', '1'))
+AI_HEDGE_PERCENTILE = float(os.getenv('AI_HEDGE_PERCENTILE', '0.9'))  # 以该分位耗时作为对冲延迟
+AI_HEDGE_MIN_SAMPLES = int(os.getenv('AI_HEDGE_MIN_SAMPLES', '10'))
+AI_HEDGE_MAX_RATIO = float(os.getenv('AI_HEDGE_MAX_RATIO', '0.2'))  # 最多对冲的请求比例
+
+# 流式接口在没有新数据时发送心跳的间隔（秒），需小于Nginx的proxy_read_timeout
+SSE_KEEPALIVE_SECONDS = float(os.getenv('SSE_KEEPALIVE_SECONDS', '15'))
+
+# 批量处理配置：单次最多上传的文档数，以及同时调用AI的文档数
+SEO_BATCH_MAX_FILES = int(os.getenv('SEO_BATCH_MAX_FILES', '50'))
+SEO_BATCH_CONCURRENCY = int(os.getenv('SEO_BATCH_CONCURRENCY', '5'))
+# 任务接口长轮询的最长等待时间（秒），需小于Nginx的 proxy_read_timeout（60秒）
+JOB_LONG_POLL_MAX = float(os.getenv('JOB_LONG_POLL_MAX', '25'))
+
 # 提示词配置 - 三个模型可以有不同的提示词
 PROMPT_CONFIG = {
     'qwen': """你是一个专业的SEO内容优化专家。请根据以下文章内容，生成高质量的SEO信息。
@@ -206,90 +318,498 @@ PROMPT_CONFIG = {
 # 提示词密码（可以通过环境变量配置）
 PROMPT_PASSWORD = os.getenv('PROMPT_PASSWORD', '112346')
 
-# 初始化历史记录CSV文件（如果不存在）
+@app.on_event("startup")
+async def startup_event():
+    """应用启动时初始化共享资源"""
+    init_http_clients([DEEPSEEK_API_URL, DOUBAO_API_URL])
+    init_qwen_client()
+    init_parse_pool()
+    keyword_engine.load()
+    keyword_engine.save()
+    slug_index.refresh()
+    if NEAR_DUP_ENABLED:
+        near_dup_index.load()
+    await job_queue.start(run_seo_jobs, group_size=SEO_PACK_MAX_DOCS)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """应用关闭时释放共享资源"""
+    await job_queue.stop()
+    await close_http_clients()
+    shutdown_qwen_client()
+    shutdown_parse_pool()
+    keyword_engine.save()
+    usage_store.close()
+
+# AI生成结果缓存（内存LRU + history/下的SQLite）
+seo_cache = LLMResultCache()
+
+# AI调用用量记录（history/下的SQLite）
+usage_store = UsageStore()
+
+# 相同请求合并（同时处理同一篇文章时只调用一次AI）
+seo_single_flight = SingleFlight()
+
+# SEO处理任务队列（history/下的SQLite，重启后未完成的任务继续处理）
+job_queue = JobQueue()
+
+# 提供商耗时统计与对冲预算
+provider_latency = LatencyTracker()
+hedge_budget = HedgeBudget(AI_HEDGE_MAX_RATIO)
+
+# 提供商熔断器（熔断期间直接跳过该提供商）
+circuit_breakers = CircuitBreakerRegistry()
+# 提供商准入控制（并发上限、RPM/TPM令牌桶、429退避）
+rate_limiters = RateLimiterRegistry()
+for _provider_name in PROVIDER_MODELS:
+    circuit_breakers.get(_provider_name)
+    rate_limiters.get(_provider_name)
+
+# 智能路由（auto 模式）：按耗时、失败率、成本和评分为提供商排序，只在配置了API Key的提供商中选择
+PROVIDER_API_KEYS = {'qwen': 'DASHSCOPE_API_KEY', 'deepseek': 'DEEPSEEK_API_KEY', 'doubao': 'DOUBAO_API_KEY'}
+provider_router = ProviderRouter(
+    provider_latency, circuit_breakers,
+    lambda api_provider: bool(os.getenv(PROVIDER_API_KEYS.get(api_provider, ''), '')),
+    PROVIDER_MODELS
+)
+
+def upgrade_csv_header(path: str, header: list):
+    """旧版文件缺少最后一列（历史记录和评分记录的“结果来源”）：把标题行更新为 header，数据行保持不变"""
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        current = next(csv.reader(f), None)
+        if current is None or len(current) != len(header) - 1 or current != header[:len(current)]:
+            return
+        rest = f.read()
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8-sig', newline='') as f:
+        csv.writer(f).writerow(header)
+        f.write(rest)
+    os.replace(tmp_path, path)
+    logger.info(f"{path} 标题行已更新为 {len(header)} 列")
+
+# 初始化历史记录CSV文件（如果不存在），旧版文件更新标题行
 if not Path(HISTORY_CSV).exists():
     with open(HISTORY_CSV, 'w', encoding='utf-8-sig', newline='') as f:
         writer = csv.writer(f)
-        writer.writerow(['时间', '标题', '摘要', '关键词', 'slug', '文章附加', 'AI模型'])
+        writer.writerow(HISTORY_HEADER)
+else:
+    upgrade_csv_header(HISTORY_CSV, HISTORY_HEADER)
+
+# 历史评分（只计入由提供商实际生成的结果；旧版评分记录没有“结果来源”列，全部计入）
+if Path(RATINGS_CSV).exists():
+    upgrade_csv_header(RATINGS_CSV, RATINGS_HEADER)
+provider_router.load_ratings(
+    RATINGS_CSV, {name: key for key, name in MODEL_NAMES.items()},
+    {RESULT_SOURCE_LABELS[source] for source in RATED_SOURCES}
+)
+
+# 本地关键词提取（IDF来自历史记录中的标题和摘要，索引保存在history/下）
+keyword_engine = KeywordEngine(HISTORY_CSV)
+# 历史记录中已使用的slug（保存结果时去重）
+slug_index = SlugIndex(HISTORY_CSV)
+# 已处理文章的MinHash签名（相似文章复用之前的生成结果，保存在history/下）
+near_dup_index = NearDuplicateIndex()
 
 # AI生成函数 - 支持多个API提供商
-async def generate_seo_content(title: str, content: str, provider: str = None) -> dict:
+async def generate_seo_content(title: str, content: str, provider: str = None, use_cache: bool = True) -> dict:
     """生成SEO内容：摘要、关键词、slug
     
     Args:
         title: 文章标题
         content: 文章内容
-        provider: API提供商，可选值: 'qwen', 'deepseek', 'doubao'
+        provider: API提供商，可选值: 'qwen', 'deepseek', 'doubao', 'auto'（智能路由）, 'local'（本地生成）
                   如果为None，则使用配置的默认提供商
+        use_cache: 是否读取AI结果缓存（为False时仍会用新结果刷新缓存）
+    
+    Returns:
+        包含 summary、keywords、slug 的字典，另附 provider（实际使用的提供商）
+        和 source（'ai'、'cache'、'local' 或 'mock'）
     """
+    if is_local_provider(provider):
+        return generate_local_seo_content(title, content)
+    
+    prompt, providers = build_seo_prompt(title, content, provider)
+    
+    # 先检查缓存，命中则无需调用AI
+    if use_cache:
+        cached = await lookup_cached_result(providers, prompt)
+        if cached:
+            return cached
+    
+    # 相同的请求（指定的提供商和文章都相同）正在进行时，等待并共享其结果（每个调用方仍各自写入历史记录）；
+    # 键使用请求指定的提供商而不是排序后的提供商列表，auto 模式下每次的排序可能不同
+    article_hash = hash_text(f"{title}\n{content}")
+    key = f"{provider or AI_API_PROVIDER}|{article_hash}"
+    result = await seo_single_flight.do(key, lambda: generate_uncached(title, content, prompt, providers))
+    return dict(result)
+
+async def generate_uncached(title: str, content: str, prompt: str, providers: list) -> dict:
+    """按顺序（或对冲方式）调用提供商生成SEO内容，全部失败时返回模拟数据"""
+    if AI_HEDGE_ENABLED and len(providers) > 1:
+        api_provider, result = await generate_hedged(providers, title, content, prompt)
+        if result:
+            await store_cached_result(api_provider, prompt, result)
+            return {**result, 'provider': api_provider, 'source': 'ai'}
+    else:
+        remaining = list(providers)
+        tried = []
+        while remaining:
+            api_provider = remaining.pop(0)
+            tried.append(api_provider)
+            try:
+                result = await call_provider(api_provider, title, content, prompt)
+                if result:
+                    await store_cached_result(api_provider, prompt, result)
+                    return {**result, 'provider': api_provider, 'source': 'ai'}
+            except TIMEOUT_ERRORS:
+                logger.warning(f"{api_provider} API调用超时，尝试下一个API")
+                if AI_TIMEOUT_FALLBACK and not remaining:
+                    # 指定的提供商超时时，改用其他提供商，而不是直接返回模拟数据
+                    remaining = [p for p in DEFAULT_PROVIDER_ORDER if p not in tried]
+            except Exception as e:
+                logger.warning(f"{api_provider} API调用失败: {e}，尝试下一个API")
+                continue
+    
+    # 所有API都失败，使用模拟数据
+    logger.warning("所有AI API调用失败，使用模拟数据")
+    return {**generate_mock_seo_content(title, content), 'provider': None, 'source': 'mock'}
+
+def is_local_provider(provider: str = None) -> bool:
+    """是否使用本地生成（provider 为None时取配置的默认提供商）"""
+    return (AI_API_PROVIDER if provider is None else provider) == LOCAL_PROVIDER
+
+def select_providers(provider: str = None):
+    """确定提示词模板和按顺序尝试的提供商列表，返回 (provider, prompt_template, providers)"""
     if provider is None:
         provider = AI_API_PROVIDER
     
+    if provider == AUTO_PROVIDER:
+        # 智能路由：按当前得分排序，使用排在第一位的提供商的提示词模板
+        providers = provider_router.rank(list(DEFAULT_PROVIDER_ORDER))
+        return provider, PROMPT_CONFIG.get(providers[0], PROMPT_CONFIG['qwen']), providers
+    
     # 获取对应模型的提示词模板
     prompt_template = PROMPT_CONFIG.get(provider or 'qwen', PROMPT_CONFIG['qwen'])
-    # 格式化提示词
-    prompt = prompt_template.format(title=title, content=content[:2000])
     
     # 按优先级尝试不同的API（排序：豆包>deepseek>通义千问）
-    providers = [provider] if provider else ['doubao', 'deepseek', 'qwen']
+    providers = [provider] if provider else list(DEFAULT_PROVIDER_ORDER)
+    return provider, prompt_template, providers
+
+def build_seo_prompt(title: str, content: str, provider: str = None):
+    """格式化提示词，并确定按顺序尝试的提供商列表，返回 (prompt, providers)"""
+    provider, prompt_template, providers = select_providers(provider)
+    prompt = format_prompt(prompt_template, title, prepare_prompt_content(title, content, provider))
+    return prompt, providers
+
+async def generate_seo_content_packed(docs: List[dict], provider: str = None, use_cache: bool = True,
+                                      concurrency: int = SEO_BATCH_CONCURRENCY):
+    """批量生成SEO内容：多篇短文章合并为一次AI调用，按完成顺序产出 (序号, 结果)
     
+    docs 中每项包含 title、content，结果与 generate_seo_content 相同。
+    长文章、合并结果中缺失或解析失败的文章单独调用 generate_seo_content；
+    每篇文章的结果按单篇提示词写入缓存，与单篇处理共用缓存
+    """
+    if is_local_provider(provider):
+        for index, doc in enumerate(docs):
+            yield index, generate_local_seo_content(doc['title'], doc['content'])
+        return
+    
+    provider, prompt_template, providers = select_providers(provider)
+    prepared = []
+    for doc in docs:
+        content = prepare_prompt_content(doc['title'], doc['content'], provider)
+        prepared.append({
+            'title': doc['title'],
+            'content': content,
+            'prompt': format_prompt(prompt_template, doc['title'], content)
+        })
+    
+    pending = []
+    for index, item in enumerate(prepared):
+        cached = await lookup_cached_result(providers, item['prompt']) if use_cache else None
+        if cached:
+            yield index, cached
+        else:
+            pending.append(index)
+    
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def generate_pack(indices: List[int]) -> List[tuple]:
+        results = {}
+        async with semaphore:
+            packed_prompt = build_packed_prompt(prompt_template, [prepared[i] for i in indices]) if len(indices) > 1 else None
+            for api_provider in (providers if packed_prompt else []):
+                try:
+                    parsed = await call_provider(
+                        api_provider, '', '', packed_prompt,
+                        parse=functools.partial(parse_packed_response, count=len(indices)),
+                        completion_tokens=AI_COMPLETION_TOKENS * len(indices)
+                    )
+                except Exception as e:
+                    logger.warning(f"{api_provider} 合并生成失败: {e}，尝试下一个API")
+                    continue
+                if parsed:
+                    logger.info(f"合并生成完成 - 提供商: {api_provider}, 文章数: {len(indices)}, 解析成功: {len(parsed)}")
+                    for number, result in parsed.items():
+                        index = indices[number - 1]
+                        await store_cached_result(api_provider, prepared[index]['prompt'], result)
+                        results[index] = {**result, 'provider': api_provider, 'source': 'ai'}
+                    break
+            
+            # 未得到结果的文章单独生成
+            missing = [i for i in indices if i not in results]
+            singles = await asyncio.gather(*(
+                generate_seo_content(docs[i]['title'], docs[i]['content'], provider=provider, use_cache=False)
+                for i in missing
+            ))
+            results.update(zip(missing, singles))
+        return [(i, results[i]) for i in indices]
+    
+    packs = plan_packs([prepared[i] for i in pending], provider or None)
+    tasks = [asyncio.create_task(generate_pack([pending[i] for i in pack])) for pack in packs]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            for item in await next_done:
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+
+def prepare_prompt_content(title: str, content: str, provider: str = None) -> str:
+    """放入提示词的文章内容（在Token预算内挑选最有信息量的内容）"""
+    if CONTENT_CONDENSE_ENABLED:
+        return condense_content(title, content, CONTENT_TOKEN_BUDGET, provider or None)
+    return content[:2000]
+
+def get_cache_key(api_provider: str, prompt: str) -> str:
+    """AI结果缓存键"""
+    return make_cache_key(api_provider, prompt, PROVIDER_MODELS.get(api_provider, ''), AI_TEMPERATURE)
+
+async def lookup_cached_result(providers: list, prompt: str) -> Optional[dict]:
+    """按提供商顺序查找缓存结果，命中时返回带 provider/source 的结果（磁盘缓存在线程中查询）"""
+    if not LLM_CACHE_ENABLED:
+        return None
     for api_provider in providers:
-        try:
-            if api_provider == 'qwen':
-                result = await generate_with_qwen(title, content, prompt)
-                if result:
-                    logger.info(f"使用通义千问API生成SEO内容成功")
-                    return result
-            elif api_provider == 'deepseek':
-                result = await generate_with_deepseek(title, content, prompt)
-                if result:
-                    logger.info(f"使用DeepSeek API生成SEO内容成功")
-                    return result
-            elif api_provider == 'doubao':
-                result = await generate_with_doubao(title, content, prompt)
-                if result:
-                    logger.info(f"使用豆包API生成SEO内容成功")
-                    return result
-        except Exception as e:
-            logger.warning(f"{api_provider} API调用失败: {e}，尝试下一个API")
-            continue
+        cached = await seo_cache.aget(get_cache_key(api_provider, prompt))
+        if cached:
+            logger.info(f"AI结果缓存命中 - 提供商: {api_provider}")
+            usage_store.record(api_provider, PROVIDER_MODELS.get(api_provider, ''), OUTCOME_CACHE_HIT,
+                               prompt_chars=len(prompt), cache_hit=True)
+            return {**cached, 'provider': api_provider, 'source': 'cache'}
+    return None
+
+async def store_cached_result(api_provider: str, prompt: str, result: dict):
+    """写入AI结果缓存（只缓存有效结果，解析失败的空结果不缓存；磁盘写入在线程中执行）"""
+    if LLM_CACHE_ENABLED and result.get('summary'):
+        await seo_cache.aset(get_cache_key(api_provider, prompt), api_provider, PROVIDER_MODELS.get(api_provider, ''), result)
+
+async def dispatch_provider(api_provider: str, title: str, content: str, prompt: str, parse=None,
+                            timeout: httpx.Timeout = None) -> dict:
+    """按名称调用对应提供商的生成函数，parse 为解析返回文本的函数（默认 parse_ai_response）"""
+    result = None
+    if api_provider == 'qwen':
+        result = await generate_with_qwen(title, content, prompt, parse, timeout)
+        if result:
+            logger.info(f"使用通义千问API生成SEO内容成功")
+    elif api_provider == 'deepseek':
+        result = await generate_with_deepseek(title, content, prompt, parse, timeout)
+        if result:
+            logger.info(f"使用DeepSeek API生成SEO内容成功")
+    elif api_provider == 'doubao':
+        result = await generate_with_doubao(title, content, prompt, parse, timeout)
+        if result:
+            logger.info(f"使用豆包API生成SEO内容成功")
+    return result
+
+async def call_provider(api_provider: str, title: str, content: str, prompt: str,
+                        parse=None, completion_tokens: int = AI_COMPLETION_TOKENS) -> dict:
+    """调用指定提供商生成SEO内容，记录调用耗时（超时的调用按超时时间记为删失样本），并更新该提供商的熔断器
     
-    # 所有API都失败，使用模拟数据
-    logger.warning("所有AI API调用失败，使用模拟数据")
-    return generate_mock_seo_content(title, content)
+    提供商处于熔断状态、排队超时或多次限流（429）时直接返回None；
+    限流和排队超时不计入熔断统计。completion_tokens 为预估的输出Token数（用于TPM限流和超时）
+    """
+    breaker = circuit_breakers.get(api_provider)
+    if not breaker.allow_request():
+        logger.info(f"{api_provider} 处于熔断状态，跳过")
+        return None
+    
+    limiter = rate_limiters.get(api_provider)
+    model = PROVIDER_MODELS.get(api_provider, '')
+    # 合并生成多篇文章时输出更长，超时按输出量放大，且耗时不计入单篇耗时统计
+    scale = max(1.0, completion_tokens / AI_COMPLETION_TOKENS)
+    timeout = get_provider_timeout(api_provider, scale)
+    usage = start_usage_scope()
+    result = None
+    start = time.monotonic()
+    try:
+        for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+            async with limiter.admit(estimate_tokens(prompt, api_provider) + completion_tokens):
+                start = time.monotonic()
+                try:
+                    result = await dispatch_provider(api_provider, title, content, prompt, parse, timeout)
+                    break
+                except RateLimitedError as e:
+                    usage_store.record(api_provider, model, OUTCOME_RATE_LIMITED, time.monotonic() - start, len(prompt))
+                    limiter.backoff(e.retry_after, attempt)
+        else:
+            logger.warning(f"{api_provider} 多次触发限流，尝试下一个API")
+            breaker.release()
+            return None
+    except AdmissionTimeout as e:
+        logger.warning(f"{e}，尝试下一个API")
+        breaker.release()
+        return None
+    except asyncio.CancelledError:
+        # 被对冲请求取消，不计入熔断统计
+        breaker.release()
+        raise
+    except TIMEOUT_ERRORS:
+        breaker.record_failure(timeout=True)
+        if scale == 1.0:
+            provider_latency.record((api_provider, model), timeout.read, censored=True)
+        usage_store.record(api_provider, model, OUTCOME_TIMEOUT, time.monotonic() - start, len(prompt))
+        raise
+    except Exception:
+        breaker.record_failure()
+        usage_store.record(api_provider, model, OUTCOME_ERROR, time.monotonic() - start, len(prompt))
+        raise
+    
+    latency = time.monotonic() - start
+    if result:
+        breaker.record_success()
+        if scale == 1.0:
+            provider_latency.record((api_provider, model), latency)
+            provider_router.record_usage(api_provider, usage)
+    else:
+        breaker.record_failure()
+    usage_store.record(api_provider, model, OUTCOME_SUCCESS if result else OUTCOME_EMPTY, latency, len(prompt), usage)
+    return result
+
+def latency_key(api_provider: str) -> tuple:
+    """耗时统计的键：(提供商, 当前使用的模型)"""
+    return api_provider, PROVIDER_MODELS.get(api_provider, '')
+
+def describe_provider_timeout(api_provider: str, scale: float = 1.0) -> dict:
+    """计算提供商调用的读超时和连接超时（秒），并说明取值依据"""
+    samples = provider_latency.count(latency_key(api_provider))
+    if not AI_TIMEOUT_ADAPTIVE or samples < AI_TIMEOUT_MIN_SAMPLES:
+        read = AI_TIMEOUT_DEFAULT
+        basis = f"样本不足（{samples}/{AI_TIMEOUT_MIN_SAMPLES}），使用默认值" if AI_TIMEOUT_ADAPTIVE else "未启用自适应超时"
+    else:
+        observed = provider_latency.percentile(latency_key(api_provider), AI_TIMEOUT_PERCENTILE)
+        read = min(AI_TIMEOUT_MAX, max(AI_TIMEOUT_MIN, observed * AI_TIMEOUT_FACTOR))
+        basis = (f"p{AI_TIMEOUT_PERCENTILE * 100:g}={observed:.2f}s × {AI_TIMEOUT_FACTOR:g}，"
+                 f"限制在 [{AI_TIMEOUT_MIN:g}, {AI_TIMEOUT_MAX:g}] 秒内")
+    read *= scale
+    connect = min(HTTP_CONNECT_TIMEOUT, max(AI_CONNECT_TIMEOUT_MIN, read / 4))
+    return {'read': round(read, 2), 'connect': round(connect, 2), 'basis': basis}
+
+def get_provider_timeout(api_provider: str, scale: float = 1.0) -> httpx.Timeout:
+    """提供商调用的超时设置（读超时来自最近耗时分布，见 describe_provider_timeout）"""
+    timeout = describe_provider_timeout(api_provider, scale)
+    return httpx.Timeout(timeout['read'], connect=timeout['connect'])
+
+def get_hedge_delay(api_provider: str) -> float:
+    """对冲延迟：取该提供商最近耗时的分位数，样本不足时使用默认值"""
+    key = latency_key(api_provider)
+    if provider_latency.count(key) < AI_HEDGE_MIN_SAMPLES:
+        return AI_HEDGE_DELAY
+    return max(AI_HEDGE_MIN_DELAY, provider_latency.percentile(key, AI_HEDGE_PERCENTILE))
+
+async def generate_hedged(providers: list, title: str, content: str, prompt: str):
+    """对冲方式调用多个提供商，返回 (提供商, 结果)，全部失败时返回 (None, None)
+    
+    先请求第一个提供商；超过对冲延迟仍未返回时（且对冲预算允许），同时请求下一个提供商；
+    某个调用失败时立即启动下一个。采用第一个有效结果，并取消其余仍在进行的调用。
+    """
+    remaining = list(providers)
+    pending = {}
+    allow_hedge = True
+    hedged = False
+    
+    def launch():
+        api_provider = remaining.pop(0)
+        task = asyncio.create_task(call_provider(api_provider, title, content, prompt))
+        pending[task] = api_provider
+        return api_provider
+    
+    hedge_budget.deposit()
+    last_launched = launch()
+    try:
+        while pending:
+            timeout = get_hedge_delay(last_launched) if remaining and allow_hedge else None
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            
+            if not done:
+                # 超过对冲延迟仍未返回
+                if hedged or hedge_budget.try_withdraw():
+                    hedged = True
+                    logger.info(f"{last_launched} 超过 {timeout:.1f}s 未返回，对冲请求 {remaining[0]}")
+                    last_launched = launch()
+                else:
+                    logger.info("对冲预算已用完，继续等待当前提供商")
+                    allow_hedge = False
+                continue
+            
+            for task in done:
+                api_provider = pending.pop(task)
+                try:
+                    result = task.result()
+                except Exception as e:
+                    logger.warning(f"{api_provider} API调用失败: {e}，尝试下一个API")
+                    continue
+                if result and result.get('summary'):
+                    return api_provider, result
+            
+            # 没有在途调用时立即尝试下一个提供商
+            if not pending and remaining:
+                last_launched = launch()
+        return None, None
+    finally:
+        for task in pending:
+            task.cancel()
 
-async def generate_with_qwen(title: str, content: str, prompt: str) -> dict:
-    """使用通义千问（阿里云）API生成SEO内容"""
+async def generate_with_qwen(title: str, content: str, prompt: str, parse=None,
+                             timeout: httpx.Timeout = None) -> dict:
+    """使用通义千问（阿里云）API生成SEO内容（同步SDK在独立的有界线程池中执行）"""
     try:
-        import dashscope
-        api_key = os.getenv('DASHSCOPE_API_KEY', '')
-        if not api_key:
-            logger.warning("通义千问API密钥未配置")
+        if not qwen_client_ready():
             return None
         
-        dashscope.api_key = api_key
-        
-        from dashscope import Generation
-        
-        response = Generation.call(
-            model='qwen-turbo',  # 或 'qwen-plus' 更高质量但更贵
+        # SDK调用无法中途取消，超时后不再等待结果（线程池中的调用会在SDK返回后结束）
+        response = await asyncio.wait_for(call_qwen_generation(
+            model=QWEN_MODEL,
             messages=[
                 {'role': 'system', 'content': '你是一个专业的SEO内容生成助手，擅长生成高质量的摘要、关键词和URL友好的slug。'},
                 {'role': 'user', 'content': prompt}
             ],
-            temperature=0.7,
+            temperature=AI_TEMPERATURE,
             result_format='message'
-        )
+        ), timeout=(timeout or get_provider_timeout('qwen')).read)
         
         if response.status_code == 200:
             result_text = response.output.choices[0].message.content
+            usage = response.usage or {}
+            report_usage(
+                usage.get('input_tokens', 0),
+                usage.get('output_tokens', 0),
+                (usage.get('prompt_tokens_details') or {}).get('cached_tokens', 0)
+            )
             logger.info(f"通义千问API调用成功，返回内容长度: {len(result_text)}")
-            return parse_ai_response(result_text)
+            return (parse or parse_ai_response)(result_text)
+        elif response.status_code == 429:
+            raise RateLimitedError(f"通义千问API限流: {response.message}")
         else:
             logger.error(f"通义千问API错误: {response.message}")
             return None
-    except ImportError:
-        logger.warning("未安装dashscope库，跳过通义千问API")
+    except RateLimitedError:
+        raise
+    except asyncio.TimeoutError:
+        # 超时交由调用方计入熔断统计
+        logger.warning(f"通义千问API请求超时")
+        raise
+    except ExecutorQueueFull as e:
+        logger.warning(f"{e}，跳过通义千问API")
         return None
     except Exception as e:
         logger.error(f"通义千问API调用异常: {e}")
@@ -329,33 +849,35 @@ async def generate_with_ernie(title: str, content: str, prompt: str) -> dict:
         logger.error(f"文心一言API调用异常: {e}")
         return None
 
-async def generate_with_deepseek(title: str, content: str, prompt: str) -> dict:
-    """使用DeepSeek API生成SEO内容（使用requests直接调用，避免openai库版本问题）"""
+async def generate_with_deepseek(title: str, content: str, prompt: str, parse=None,
+                                 timeout: httpx.Timeout = None) -> dict:
+    """使用DeepSeek API生成SEO内容（通过共享的异步HTTP客户端调用，不阻塞事件循环）"""
     try:
-        import requests
         api_key = os.getenv('DEEPSEEK_API_KEY', '')
         if not api_key:
             logger.warning("DeepSeek API密钥未配置")
             return None
         
-        # 根据DeepSeek官方文档，使用requests直接调用API
-        url = "https://api.deepseek.com/chat/completions"
+        # 根据DeepSeek官方文档，直接调用HTTP接口
+        url = DEEPSEEK_API_URL
         headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {api_key}"
         }
         
         data = {
-            "model": "deepseek-chat",  # 使用deepseek-chat模型（对应DeepSeek-V3.2非思考模式）
+            "model": DEEPSEEK_MODEL,
             "messages": [
                 {"role": "system", "content": "你是一个专业的SEO内容生成助手，擅长生成高质量的摘要、关键词和URL友好的slug。"},
                 {"role": "user", "content": prompt}
             ],
-            "temperature": 0.7,
+            "temperature": AI_TEMPERATURE,
             "stream": False
         }
         
-        response = requests.post(url, headers=headers, json=data, timeout=60)
+        client = get_http_client(url)
+        response = await client.post(url, headers=headers, json=data,
+                                     timeout=timeout or get_provider_timeout('deepseek'))
         
         if response.status_code == 200:
             result = response.json()
@@ -370,14 +892,18 @@ async def generate_with_deepseek(title: str, content: str, prompt: str) -> dict:
                     prompt_tokens = usage.get('prompt_tokens', 0)
                     completion_tokens = usage.get('completion_tokens', 0)
                     total_tokens = usage.get('total_tokens', 0)
-                    logger.info(f"DeepSeek API调用成功 - 模型: deepseek-chat, 输入Token: {prompt_tokens}, 输出Token: {completion_tokens}, 总计Token: {total_tokens}")
+                    reported = parse_openai_usage(usage)
+                    report_usage(**reported)
+                    logger.info(f"DeepSeek API调用成功 - 模型: {DEEPSEEK_MODEL}, 输入Token: {prompt_tokens}（缓存命中: {reported['cached_tokens']}）, 输出Token: {completion_tokens}, 总计Token: {total_tokens}")
                 else:
                     logger.info(f"DeepSeek API调用成功，返回内容长度: {len(result_text)}")
                 
-                return parse_ai_response(result_text)
+                return (parse or parse_ai_response)(result_text)
             else:
                 logger.error("DeepSeek API响应格式异常：没有choices字段")
                 return None
+        elif response.status_code == 429:
+            raise RateLimitedError(f"DeepSeek API限流 - HTTP状态码: 429", parse_retry_after(response.headers.get('Retry-After')))
         else:
             # 处理错误
             try:
@@ -393,34 +919,36 @@ async def generate_with_deepseek(title: str, content: str, prompt: str) -> dict:
                 logger.error(f"DeepSeek API错误 - HTTP状态码: {response.status_code}, 响应: {response.text}")
             return None
             
-    except ImportError:
-        logger.warning("未安装requests库，跳过DeepSeek API")
-        return None
+    except RateLimitedError:
+        raise
+    except httpx.TimeoutException:
+        # 超时交由调用方计入熔断统计，不打印完整堆栈
+        logger.warning(f"DeepSeek API请求超时")
+        raise
     except Exception as e:
         logger.error(f"DeepSeek API调用异常: {e}")
         import traceback
         logger.error(f"DeepSeek API错误详情: {traceback.format_exc()}")
         return None
 
-async def generate_with_doubao(title: str, content: str, prompt: str) -> dict:
-    """使用豆包（字节跳动）API生成SEO内容（使用requests直接调用，避免openai库版本问题）"""
+async def generate_with_doubao(title: str, content: str, prompt: str, parse=None,
+                               timeout: httpx.Timeout = None) -> dict:
+    """使用豆包（字节跳动）API生成SEO内容（通过共享的异步HTTP客户端调用，不阻塞事件循环）"""
     try:
-        import requests
         api_key = os.getenv('DOUBAO_API_KEY', '')
         if not api_key:
             logger.warning("豆包API密钥未配置")
             return None
         
         # 豆包使用OpenAI兼容接口，通过火山引擎访问
-        # 根据火山引擎文档，使用requests直接调用API
-        url = "https://ark.cn-beijing.volces.com/api/v3/chat/completions"
+        # 根据火山引擎文档，直接调用HTTP接口
+        url = DOUBAO_API_URL
         headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {api_key}"
         }
         
-        # 模型名称需要从火山引擎控制台获取实际的模型端点ID
-        model_name = os.getenv('DOUBAO_MODEL', 'ep-20251214170039-ml795')
+        model_name = DOUBAO_MODEL
         
         data = {
             "model": model_name,
@@ -428,11 +956,13 @@ async def generate_with_doubao(title: str, content: str, prompt: str) -> dict:
                 {"role": "system", "content": "你是一个专业的SEO内容生成助手，擅长生成高质量的摘要、关键词和URL友好的slug。"},
                 {"role": "user", "content": prompt}
             ],
-            "temperature": 0.7,
+            "temperature": AI_TEMPERATURE,
             "stream": False
         }
         
-        response = requests.post(url, headers=headers, json=data, timeout=60)
+        client = get_http_client(url)
+        response = await client.post(url, headers=headers, json=data,
+                                     timeout=timeout or get_provider_timeout('doubao'))
         
         if response.status_code == 200:
             result = response.json()
@@ -447,14 +977,18 @@ async def generate_with_doubao(title: str, content: str, prompt: str) -> dict:
                     prompt_tokens = usage.get('prompt_tokens', 0)
                     completion_tokens = usage.get('completion_tokens', 0)
                     total_tokens = usage.get('total_tokens', 0)
-                    logger.info(f"豆包API调用成功 - 模型: {model_name}, 输入Token: {prompt_tokens}, 输出Token: {completion_tokens}, 总计Token: {total_tokens}")
+                    reported = parse_openai_usage(usage)
+                    report_usage(**reported)
+                    logger.info(f"豆包API调用成功 - 模型: {model_name}, 输入Token: {prompt_tokens}（缓存命中: {reported['cached_tokens']}）, 输出Token: {completion_tokens}, 总计Token: {total_tokens}")
                 else:
                     logger.info(f"豆包API调用成功 - 模型: {model_name}, 返回内容长度: {len(result_text)}")
                 
-                return parse_ai_response(result_text)
+                return (parse or parse_ai_response)(result_text)
             else:
                 logger.error("豆包API响应格式异常：没有choices字段")
                 return None
+        elif response.status_code == 429:
+            raise RateLimitedError(f"豆包API限流 - HTTP状态码: 429", parse_retry_after(response.headers.get('Retry-After')))
         else:
             # 处理错误
             try:
@@ -470,67 +1004,177 @@ async def generate_with_doubao(title: str, content: str, prompt: str) -> dict:
                 logger.error(f"豆包API错误 - HTTP状态码: {response.status_code}, 响应: {response.text}")
             return None
             
-    except ImportError:
-        logger.warning("未安装requests库，跳过豆包API")
-        return None
+    except RateLimitedError:
+        raise
+    except httpx.TimeoutException:
+        # 超时交由调用方计入熔断统计，不打印完整堆栈
+        logger.warning(f"豆包API请求超时")
+        raise
     except Exception as e:
         logger.error(f"豆包API调用异常: {e}")
         import traceback
         logger.error(f"豆包API错误详情: {traceback.format_exc()}")
         return None
 
-def parse_ai_response(result_text: str) -> dict:
-    """解析AI返回的JSON格式响应"""
-    import json
-    import re
+# 流式输出中已完整的字段，如 "summary": "..."
+STREAM_FIELD_PATTERN = re.compile(r'"(summary|keywords|slug)"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+class IncrementalFieldParser:
+    """增量解析流式输出的JSON，每个字段的字符串值完整后立即返回"""
+    
+    def __init__(self):
+        self.buffer = ''
+        self.fields = {}
+    
+    def feed(self, text: str) -> dict:
+        """追加一段输出，返回本次新完成的字段"""
+        self.buffer += text
+        completed = {}
+        for match in STREAM_FIELD_PATTERN.finditer(self.buffer):
+            name = match.group(1)
+            if name in self.fields:
+                continue
+            try:
+                value = json.loads('"' + match.group(2) + '"')
+            except json.JSONDecodeError:
+                value = match.group(2)
+            self.fields[name] = completed[name] = value.strip()
+        return completed
+
+async def stream_openai_compatible(api_provider: str, prompt: str):
+    """以流式方式调用OpenAI兼容接口（DeepSeek、豆包），逐段产出生成的文本"""
+    if api_provider == 'deepseek':
+        url, api_key, model_name = DEEPSEEK_API_URL, os.getenv('DEEPSEEK_API_KEY', ''), DEEPSEEK_MODEL
+    else:
+        url, api_key, model_name = DOUBAO_API_URL, os.getenv('DOUBAO_API_KEY', ''), DOUBAO_MODEL
+    if not api_key:
+        raise RuntimeError(f"{MODEL_NAMES[api_provider]} API密钥未配置")
+    
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {api_key}"
+    }
+    data = {
+        "model": model_name,
+        "messages": [
+            {"role": "system", "content": "你是一个专业的SEO内容生成助手，擅长生成高质量的摘要、关键词和URL友好的slug。"},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": AI_TEMPERATURE,
+        "stream": True,
+        "stream_options": {"include_usage": True}  # 最后一个分片返回Token用量
+    }
+    
+    client = get_http_client(url)
+    async with client.stream('POST', url, headers=headers, json=data,
+                             timeout=get_provider_timeout(api_provider)) as response:
+        if response.status_code == 429:
+            raise RateLimitedError(f"{api_provider} 限流 - HTTP状态码: 429", parse_retry_after(response.headers.get('Retry-After')))
+        if response.status_code != 200:
+            body = await response.aread()
+            raise RuntimeError(f"{api_provider} API错误 - HTTP状态码: {response.status_code}, 响应: {body[:500].decode('utf-8', 'replace')}")
+        async for line in response.aiter_lines():
+            if not line.startswith('data:'):
+                continue
+            payload = line[5:].strip()
+            if payload == '[DONE]':
+                break
+            chunk = json.loads(payload)
+            if chunk.get('usage'):
+                report_usage(**parse_openai_usage(chunk['usage']))
+            choices = chunk.get('choices') or []
+            if choices:
+                delta = choices[0].get('delta', {}).get('content')
+                if delta:
+                    yield delta
+
+async def stream_provider(api_provider: str, prompt: str):
+    """带熔断和准入控制的流式调用，逐段产出文本；完成后按完整输出是否可解析记录成功或失败"""
+    breaker = circuit_breakers.get(api_provider)
+    if not breaker.allow_request():
+        raise RuntimeError(f"{api_provider} 处于熔断状态，跳过")
     
+    limiter = rate_limiters.get(api_provider)
+    model = PROVIDER_MODELS.get(api_provider, '')
+    usage = start_usage_scope()
+    parts = []
+    start = time.monotonic()
     try:
-        # 尝试直接解析JSON
-        result = json.loads(result_text)
-        return {
-            'summary': result.get('summary', '').strip(),
-            'keywords': result.get('keywords', '').strip(),
-            'slug': result.get('slug', '').strip()
-        }
-    except json.JSONDecodeError:
-        # 如果直接解析失败，尝试提取JSON部分
+        async with limiter.admit(estimate_tokens(prompt, api_provider) + AI_COMPLETION_TOKENS):
+            start = time.monotonic()
+            async for delta in stream_openai_compatible(api_provider, prompt):
+                parts.append(delta)
+                yield delta
+    except (asyncio.CancelledError, GeneratorExit, AdmissionTimeout):
+        breaker.release()
+        raise
+    except RateLimitedError:
+        breaker.release()
+        usage_store.record(api_provider, model, OUTCOME_RATE_LIMITED, time.monotonic() - start, len(prompt))
+        raise
+    except TIMEOUT_ERRORS:
+        breaker.record_failure(timeout=True)
+        # 流式调用的读超时是分片之间的间隔，总耗时至少为已经过的时间
+        provider_latency.record((api_provider, model), time.monotonic() - start, censored=True)
+        usage_store.record(api_provider, model, OUTCOME_TIMEOUT, time.monotonic() - start, len(prompt))
+        raise
+    except Exception:
+        breaker.record_failure()
+        usage_store.record(api_provider, model, OUTCOME_ERROR, time.monotonic() - start, len(prompt))
+        raise
+    
+    latency = time.monotonic() - start
+    if parse_ai_response(''.join(parts)).get('summary'):
+        breaker.record_success()
+        provider_latency.record((api_provider, model), latency)
+        usage_store.record(api_provider, model, OUTCOME_SUCCESS, latency, len(prompt), usage)
+    else:
+        breaker.record_failure()
+        usage_store.record(api_provider, model, OUTCOME_EMPTY, latency, len(prompt), usage)
+
+async def iter_with_keepalive(agen, interval: float):
+    """在独立任务中迭代异步生成器，超过 interval 秒没有新数据时产出None（用于发送心跳）"""
+    queue = asyncio.Queue()
+    finished = object()
+    
+    async def pump():
         try:
-            # 查找JSON对象
-            json_match = re.search(r'\{[^{}]*"summary"[^{}]*\}', result_text, re.DOTALL)
-            if json_match:
-                result = json.loads(json_match.group())
-                return {
-                    'summary': result.get('summary', '').strip(),
-                    'keywords': result.get('keywords', '').strip(),
-                    'slug': result.get('slug', '').strip()
-                }
-        except:
-            pass
-        
-        # 如果还是失败，尝试从文本中提取
-        logger.warning("AI返回格式不是标准JSON，尝试提取信息")
-        summary_match = re.search(r'"summary"\s*:\s*"([^"]+)"', result_text)
-        keywords_match = re.search(r'"keywords"\s*:\s*"([^"]+)"', result_text)
-        slug_match = re.search(r'"slug"\s*:\s*"([^"]+)"', result_text)
-        
-        return {
-            'summary': summary_match.group(1) if summary_match else '',
-            'keywords': keywords_match.group(1) if keywords_match else '',
-            'slug': slug_match.group(1) if slug_match else ''
-        }
+            async for item in agen:
+                queue.put_nowait((item, None))
+            queue.put_nowait((finished, None))
+        except Exception as e:
+            queue.put_nowait((finished, e))
+    
+    task = asyncio.create_task(pump())
+    try:
+        while True:
+            try:
+                item, error = await asyncio.wait_for(queue.get(), timeout=interval)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+            if item is finished:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        task.cancel()
+
+def generate_local_seo_content(title: str, content: str) -> dict:
+    """provider=local：完全在本地生成SEO内容，不调用任何AI接口"""
+    return {**generate_mock_seo_content(title, content), 'provider': LOCAL_PROVIDER, 'source': 'local'}
 
 def generate_mock_seo_content(title: str, content: str) -> dict:
-    """生成模拟的SEO内容（用于测试）"""
-    # 生成摘要（截取前68字）
-    summary = content[:68] if len(content) > 68 else content
-    if len(content) > 68:
-        summary = summary[:65] + "..."
+    """本地生成SEO内容（所有AI接口都失败时的兜底，以及 provider=local 模式）"""
+    # 生成摘要（抽取式，68字以内）
+    summary = summarize(title, content, SUMMARY_MAX_CHARS)
     
     # 生成关键词（从标题和内容中提取）
     keywords = extract_keywords(title, content)
     
-    # 生成slug
-    slug = generate_slug(title)
+    # 生成slug（标题拼音，标题较短时用关键词补足）
+    slug = generate_slug(title, keywords)
     
     return {
         'summary': summary,
@@ -539,65 +1183,14 @@ def generate_mock_seo_content(title: str, content: str) -> dict:
     }
 
 def extract_keywords(title: str, content: str) -> str:
-    """从标题和内容中提取关键词"""
-    # 简单的关键词提取逻辑（实际应该使用更复杂的NLP方法）
-    words = (title + " " + content[:500]).lower()
-    # 移除标点符号
-    words = re.sub(r'[^\w\s]', ' ', words)
-    # 常见的中文停用词（简化版）
-    stop_words = {'的', '是', '在', '了', '和', '有', '为', '与', '等', '及', '或', '但', '而', '也', '都', '就', '要', '可以', '这个', '那个'}
-    word_list = [w for w in words.split() if w and len(w) > 1 and w not in stop_words]
-    # 取前3-6个
-    keywords = word_list[:6] if len(word_list) >= 6 else word_list[:3] if len(word_list) >= 3 else ['关键词1', '关键词2', '关键词3']
-    return ','.join(keywords[:6])
-
-def generate_slug(title: str) -> str:
-    """根据标题生成slug"""
-    # 转换为小写
-    slug = title.lower()
-    # 移除特殊字符，只保留字母、数字和空格
-    slug = re.sub(r'[^\w\s-]', '', slug)
-    # 将空格和多个连字符替换为单个连字符
-    slug = re.sub(r'[\s_-]+', '-', slug)
-    # 移除首尾的连字符
-    slug = slug.strip('-')
-    # 如果为空，使用默认值
-    if not slug:
-        slug = 'article-' + str(uuid.uuid4())[:8]
-    return slug[:50]  # 限制长度
-
-def read_docx(file_path: str) -> dict:
-    """读取Word文档，提取标题和内容"""
-    try:
-        doc = Document(file_path)
-        title = ""
-        content_parts = []
-        
-        # 提取标题（通常是第一个段落或第一个标题样式）
-        for para in doc.paragraphs:
-            if para.style.name.startswith('Heading') or not title:
-                if para.text.strip():
-                    if not title:
-                        title = para.text.strip()
-                    else:
-                        content_parts.append(para.text.strip())
-            else:
-                content_parts.append(para.text.strip())
-        
-        # 如果没有找到标题，使用第一个段落
-        if not title and content_parts:
-            title = content_parts[0]
-            content_parts = content_parts[1:]
-        
-        content = '\n'.join(content_parts)
-        
-        return {
-            'title': title or '未命名文档',
-            'content': content or '文档内容为空'
-        }
-    except Exception as e:
-        logger.error(f"读取Word文档失败: {e}")
-        raise HTTPException(status_code=400, detail=f"读取Word文档失败: {str(e)}")
+    """从标题和内容中提取关键词（本地TF-IDF，不调用AI，见 keyword_engine.py）"""
+    keyword_engine.refresh_if_changed()
+    keywords = keyword_engine.extract(title, content)
+    return ','.join(keywords or ['关键词1', '关键词2', '关键词3'])
+
+def generate_slug(title: str, keywords: str = '') -> str:
+    """根据标题生成slug（中文转为拼音，30-50个字符，见 slug_engine.py）"""
+    return make_slug(title, keywords)
 
 @app.get("/", response_class=HTMLResponse)
 async def read_root():
@@ -806,6 +1399,9 @@ async def read_root():
                     <option value="doubao">豆包（字节跳动）- 推荐，每天200w tokens</option>
                     <option value="deepseek">DeepSeek - 需要付费，质量优秀</option>
                     <option value="qwen">通义千问（阿里云）- 每月200w tokens</option>
+                    <option value="">自动（豆包 > DeepSeek > 通义千问，失败或超时自动切换）</option>
+                    <option value="auto">智能路由（按耗时、失败率、成本和评分选择）</option>
+                    <option value="local">本地算法（不调用AI，速度最快，质量一般）</option>
                 </select>
                 <div style="margin-top: 10px; font-size: 12px; color: #666;">
                     💡 提示：可以切换不同模型比较生成质量，选择最适合的模型
@@ -1035,7 +1631,122 @@ async def read_root():
             }
         }
         
-        // SEO处理
+        // 渲染单个SEO结果卡片
+        function renderSEOResult(result, resultId, providerName, selectedProvider) {
+            return `
+                <div class="result" id="${resultId}">
+                    <div style="margin-bottom: 10px; padding: 8px; background: #e7f3ff; border-radius: 4px; font-size: 12px; color: #0066cc;">
+                        🤖 使用模型: ${result.model || providerName}${result.cached ? '（缓存命中）' : ''}${result.reused ? `（相似文章复用，相似度 ${Math.round(result.similarity * 100)}%）` : ''}
+                    </div>
+                    <div class="result-item">
+                        <label>标题：</label>
+                        <div>${result.title}</div>
+                    </div>
+                    <div class="result-item">
+                        <label>摘要：</label>
+                        <div>${result.summary}</div>
+                    </div>
+                    <div class="result-item">
+                        <label>关键词：</label>
+                        <div>${result.keywords}</div>
+                    </div>
+                    <div class="result-item">
+                        <label>Slug：</label>
+                        <div>${result.slug}</div>
+                    </div>
+                    <div class="result-item" style="margin-top: 15px; padding-top: 15px; border-top: 1px solid #ddd;">
+                        <label>生成结果评分（可选）：</label>
+                        <div style="display: flex; align-items: center; gap: 10px; margin-top: 8px;">
+                            <button onclick="rateResult('${resultId}', '${result.provider || ''}', '${result.source || ''}', '${result.title.replace(/'/g, "\\'")}', '${result.summary.replace(/'/g, "\\'")}', '${result.keywords.replace(/'/g, "\\'")}', '${result.slug.replace(/'/g, "\\'")}', 1)" style="padding: 5px 10px; font-size: 14px; background: #f0f0f0; border: 1px solid #ccc; cursor: pointer;">1分</button>
+                            <button onclick="rateResult('${resultId}', '${result.provider || ''}', '${result.source || ''}', '${result.title.replace(/'/g, "\\'")}', '${result.summary.replace(/'/g, "\\'")}', '${result.keywords.replace(/'/g, "\\'")}', '${result.slug.replace(/'/g, "\\'")}', 2)" style="padding: 5px 10px; font-size: 14px; background: #f0f0f0; border: 1px solid #ccc; cursor: pointer;">2分</button>
+                            <button onclick="rateResult('${resultId}', '${result.provider || ''}', '${result.source || ''}', '${result.title.replace(/'/g, "\\'")}', '${result.summary.replace(/'/g, "\\'")}', '${result.keywords.replace(/'/g, "\\'")}', '${result.slug.replace(/'/g, "\\'")}', 3)" style="padding: 5px 10px; font-size: 14px; background: #f0f0f0; border: 1px solid #ccc; cursor: pointer;">3分</button>
+                            <button onclick="rateResult('${resultId}', '${result.provider || ''}', '${result.source || ''}', '${result.title.replace(/'/g, "\\'")}', '${result.summary.replace(/'/g, "\\'")}', '${result.keywords.replace(/'/g, "\\'")}', '${result.slug.replace(/'/g, "\\'")}', 4)" style="padding: 5px 10px; font-size: 14px; background: #f0f0f0; border: 1px solid #ccc; cursor: pointer;">4分</button>
+                            <button onclick="rateResult('${resultId}', '${result.provider || ''}', '${result.source || ''}', '${result.title.replace(/'/g, "\\'")}', '${result.summary.replace(/'/g, "\\'")}', '${result.keywords.replace(/'/g, "\\'")}', '${result.slug.replace(/'/g, "\\'")}', 5)" style="padding: 5px 10px; font-size: 14px; background: #f0f0f0; border: 1px solid #ccc; cursor: pointer;">5分</button>
+                            <span id="${resultId}_rating" style="margin-left: 10px; color: #28a745; font-weight: bold;"></span>
+                        </div>
+                    </div>
+                </div>
+            `;
+        }
+        
+        // 读取Server-Sent Events响应，逐条回调事件
+        async function readSSE(response, onEvent) {
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                let index;
+                while ((index = buffer.indexOf('\\n\\n')) >= 0) {
+                    const block = buffer.slice(0, index);
+                    buffer = buffer.slice(index + 2);
+                    let event = 'message';
+                    let data = '';
+                    block.split('\\n').forEach(line => {
+                        if (line.startsWith('event:')) event = line.slice(6).trim();
+                        else if (line.startsWith('data:')) data += line.slice(5).trim();
+                    });
+                    if (data) onEvent(event, JSON.parse(data));
+                }
+            }
+        }
+        
+        // 批量SEO处理（提交为后台任务后立即返回，通过长轮询显示进度和结果）
+        async function processSEOBatch(files, selectedProvider, providerName) {
+            const resultsDiv = document.getElementById('seoResults');
+            resultsDiv.innerHTML = `<div class="loading" id="seoBatchStatus">提交中...（使用${providerName}）</div>`;
+            
+            const formData = new FormData();
+            for (let file of files) {
+                formData.append('files', file);
+            }
+            formData.append('provider', selectedProvider);
+            
+            try {
+                const response = await fetch('/api/seo/jobs', {
+                    method: 'POST',
+                    body: formData
+                });
+                const submitted = await response.json();
+                if (!response.ok) {
+                    throw new Error(submitted.detail);
+                }
+                
+                const statusDiv = document.getElementById('seoBatchStatus');
+                const rendered = new Set();
+                let finished = -1;
+                let batch = null;
+                while (!batch || !batch.done) {
+                    const pollResponse = await fetch(`/api/seo/batches/${submitted.batch_id}?wait=20&finished=${finished}`);
+                    batch = await pollResponse.json();
+                    if (!pollResponse.ok) {
+                        throw new Error(batch.detail);
+                    }
+                    finished = batch.finished;
+                    const running = batch.counts.running || 0;
+                    statusDiv.textContent = `处理中... ${batch.finished}/${batch.total}，进行中 ${running}（使用${providerName}）`;
+                    batch.jobs.forEach((job, index) => {
+                        if (rendered.has(job.id) || (job.status !== 'succeeded' && job.status !== 'failed')) return;
+                        rendered.add(job.id);
+                        if (job.status === 'succeeded') {
+                            const resultId = 'result_' + Date.now() + '_' + index;
+                            resultsDiv.insertAdjacentHTML('beforeend', renderSEOResult(job.result, resultId, providerName, selectedProvider));
+                        } else {
+                            resultsDiv.insertAdjacentHTML('beforeend', `<div class="result" style="color: red;">错误（${job.filename}）: ${job.error}</div>`);
+                        }
+                    });
+                }
+                
+                statusDiv.style.color = '#28a745';
+                statusDiv.textContent = `✓ 已完成 ${batch.counts.succeeded || 0}/${batch.total}`;
+            } catch (error) {
+                resultsDiv.insertAdjacentHTML('beforeend', `<div class="result" style="color: red;">错误: ${error.message}</div>`);
+            }
+        }
+        
+        // SEO处理（单个文档流式返回，字段生成后立即显示；多个文档走批量接口）
         async function processSEO() {
             if (!checkAuthBeforeAction('processSEO')) return;
             
@@ -1051,77 +1762,67 @@ async def read_root():
             
             const resultsDiv = document.getElementById('seoResults');
             const providerName = providerSelect.options[providerSelect.selectedIndex].text.split('（')[0];
-            resultsDiv.innerHTML = `<div class="loading">处理中...（使用${providerName}）</div>`;
+            
+            if (files.length > 1) {
+                await processSEOBatch(files, selectedProvider, providerName);
+                return;
+            }
+            resultsDiv.innerHTML = '';
             
             let processedCount = 0;
-            const totalFiles = files.length;
+            let fileIndex = 0;
             
             for (let file of files) {
+                fileIndex++;
+                const resultId = 'result_' + Date.now() + '_' + fileIndex;
+                resultsDiv.insertAdjacentHTML('beforeend', `
+                    <div class="result" id="${resultId}">
+                        <div class="loading" data-field="status" style="padding: 8px; text-align: left;">处理中...（${file.name}）</div>
+                        <div class="result-item"><label>摘要：</label><div data-field="summary">...</div></div>
+                        <div class="result-item"><label>关键词：</label><div data-field="keywords">...</div></div>
+                        <div class="result-item"><label>Slug：</label><div data-field="slug">...</div></div>
+                    </div>
+                `);
+                const liveDiv = document.getElementById(resultId);
+                
                 const formData = new FormData();
                 formData.append('file', file);
                 formData.append('provider', selectedProvider);
                 
                 try {
-                    const response = await fetch('/api/seo/process', {
+                    const response = await fetch('/api/seo/stream', {
                         method: 'POST',
                         body: formData
                     });
                     
-                    const result = await response.json();
+                    if (!response.ok) {
+                        const result = await response.json();
+                        throw new Error(result.detail);
+                    }
                     
-                    if (response.ok) {
-                        processedCount++;
-                        // 如果是第一个结果，替换"处理中..."
-                        if (processedCount === 1) {
-                            resultsDiv.innerHTML = '';
+                    let finalResult = null;
+                    let errorDetail = null;
+                    await readSSE(response, (event, data) => {
+                        if (event === 'field') {
+                            const fieldDiv = liveDiv.querySelector(`[data-field="${data.name}"]`);
+                            if (fieldDiv) fieldDiv.textContent = data.value;
+                        } else if (event === 'progress' && data.stage === 'provider') {
+                            liveDiv.querySelector('[data-field="status"]').textContent = `生成中...（${file.name}，使用${data.model}）`;
+                        } else if (event === 'done') {
+                            finalResult = data;
+                        } else if (event === 'error') {
+                            errorDetail = data.detail;
                         }
-                        
-                        const resultId = 'result_' + Date.now() + '_' + processedCount;
-                        resultsDiv.innerHTML += `
-                            <div class="result" id="${resultId}">
-                                <div style="margin-bottom: 10px; padding: 8px; background: #e7f3ff; border-radius: 4px; font-size: 12px; color: #0066cc;">
-                                    🤖 使用模型: ${providerName}
-                                </div>
-                                <div class="result-item">
-                                    <label>标题：</label>
-                                    <div>${result.title}</div>
-                                </div>
-                                <div class="result-item">
-                                    <label>摘要：</label>
-                                    <div>${result.summary}</div>
-                                </div>
-                                <div class="result-item">
-                                    <label>关键词：</label>
-                                    <div>${result.keywords}</div>
-                                </div>
-                                <div class="result-item">
-                                    <label>Slug：</label>
-                                    <div>${result.slug}</div>
-                                </div>
-                                <div class="result-item" style="margin-top: 15px; padding-top: 15px; border-top: 1px solid #ddd;">
-                                    <label>生成结果评分（可选）：</label>
-                                    <div style="display: flex; align-items: center; gap: 10px; margin-top: 8px;">
-                                        <button onclick="rateResult('${resultId}', '${selectedProvider}', '${result.title.replace(/'/g, "\\'")}', '${result.summary.replace(/'/g, "\\'")}', '${result.keywords.replace(/'/g, "\\'")}', '${result.slug.replace(/'/g, "\\'")}', 1)" style="padding: 5px 10px; font-size: 14px; background: #f0f0f0; border: 1px solid #ccc; cursor: pointer;">1分</button>
-                                        <button onclick="rateResult('${resultId}', '${selectedProvider}', '${result.title.replace(/'/g, "\\'")}', '${result.summary.replace(/'/g, "\\'")}', '${result.keywords.replace(/'/g, "\\'")}', '${result.slug.replace(/'/g, "\\'")}', 2)" style="padding: 5px 10px; font-size: 14px; background: #f0f0f0; border: 1px solid #ccc; cursor: pointer;">2分</button>
-                                        <button onclick="rateResult('${resultId}', '${selectedProvider}', '${result.title.replace(/'/g, "\\'")}', '${result.summary.replace(/'/g, "\\'")}', '${result.keywords.replace(/'/g, "\\'")}', '${result.slug.replace(/'/g, "\\'")}', 3)" style="padding: 5px 10px; font-size: 14px; background: #f0f0f0; border: 1px solid #ccc; cursor: pointer;">3分</button>
-                                        <button onclick="rateResult('${resultId}', '${selectedProvider}', '${result.title.replace(/'/g, "\\'")}', '${result.summary.replace(/'/g, "\\'")}', '${result.keywords.replace(/'/g, "\\'")}', '${result.slug.replace(/'/g, "\\'")}', 4)" style="padding: 5px 10px; font-size: 14px; background: #f0f0f0; border: 1px solid #ccc; cursor: pointer;">4分</button>
-                                        <button onclick="rateResult('${resultId}', '${selectedProvider}', '${result.title.replace(/'/g, "\\'")}', '${result.summary.replace(/'/g, "\\'")}', '${result.keywords.replace(/'/g, "\\'")}', '${result.slug.replace(/'/g, "\\'")}', 5)" style="padding: 5px 10px; font-size: 14px; background: #f0f0f0; border: 1px solid #ccc; cursor: pointer;">5分</button>
-                                        <span id="${resultId}_rating" style="margin-left: 10px; color: #28a745; font-weight: bold;"></span>
-                                    </div>
-                                </div>
-                            </div>
-                        `;
+                    });
+                    
+                    if (finalResult) {
+                        processedCount++;
+                        liveDiv.outerHTML = renderSEOResult(finalResult, resultId, providerName, selectedProvider);
                     } else {
-                        if (processedCount === 0) {
-                            resultsDiv.innerHTML = '';
-                        }
-                        resultsDiv.innerHTML += `<div class="result" style="color: red;">错误: ${result.detail}</div>`;
+                        throw new Error(errorDetail || '生成中断');
                     }
                 } catch (error) {
-                    if (processedCount === 0) {
-                        resultsDiv.innerHTML = '';
-                    }
-                    resultsDiv.innerHTML += `<div class="result" style="color: red;">错误: ${error.message}</div>`;
+                    liveDiv.outerHTML = `<div class="result" style="color: red;">错误: ${error.message}</div>`;
                 }
             }
             
@@ -1329,7 +2030,7 @@ async def read_root():
                 });
                 
                 // 检查是否有AI模型列（兼容旧数据）
-                let html = '<table class="history-table"><thead><tr><th>时间</th><th>标题</th><th>摘要</th><th>关键词</th><th>Slug</th><th>文章附加</th><th>AI模型</th></tr></thead><tbody>';
+                let html = '<table class="history-table"><thead><tr><th>时间</th><th>标题</th><th>摘要</th><th>关键词</th><th>Slug</th><th>文章附加</th><th>AI模型</th><th>结果来源</th></tr></thead><tbody>';
                 data.forEach(row => {
                     html += `<tr>
                         <td>${row[0] || ''}</td>
@@ -1339,6 +2040,7 @@ async def read_root():
                         <td>${row[4] || ''}</td>
                         <td>${row[5] || ''}</td>
                         <td>${row[6] || '未知'}</td>
+                        <td>${row[7] || ''}</td>
                     </tr>`;
                 });
                 html += '</tbody></table>';
@@ -1383,7 +2085,7 @@ async def read_root():
         }
         
         // 评分功能
-        async function rateResult(resultId, provider, title, summary, keywords, slug, rating) {
+        async function rateResult(resultId, provider, source, title, summary, keywords, slug, rating) {
             try {
                 const response = await fetch('/api/seo/rate', {
                     method: 'POST',
@@ -1392,6 +2094,7 @@ async def read_root():
                     },
                     body: JSON.stringify({
                         provider: provider,
+                        source: source,
                         title: title,
                         summary: summary,
                         keywords: keywords,
@@ -1572,66 +2275,572 @@ async def read_root():
     """
     return HTMLResponse(content=html_content)
 
+async def read_uploaded_docx(filename: str, data: bytes) -> dict:
+    """读取上传的Word文档的标题和内容
+    
+    直接解析内存中的字节，不写入磁盘；解析在独立的进程池中执行（见 parse_pool.py），
+    超出大小或资源限制的文档返回413，解析排队已满时返回503。
+    DOCX_FAST_READER=false 时改用python-docx解析
+    """
+    try:
+        return await parse_docx(data, DOCX_FAST_READER)
+    except DocumentLimitError as e:
+        logger.warning(f"Word文档超出解析限制 {filename}: {e}")
+        raise HTTPException(status_code=413, detail=f"读取Word文档失败: {str(e)}")
+    except ParsePoolBusy as e:
+        logger.warning(f"文档解析繁忙 {filename}: {e}")
+        raise HTTPException(status_code=503, detail="文档解析繁忙，请稍后重试")
+    except Exception as e:
+        logger.error(f"读取Word文档失败: {e}")
+        raise HTTPException(status_code=400, detail=f"读取Word文档失败: {str(e)}")
+
+def article_signature(title: str, content: str):
+    """文章（压缩后的内容）的MinHash签名，未开启相似检测或内容太短时返回None"""
+    if not NEAR_DUP_ENABLED:
+        return None
+    return minhash_signature(title + '\n' + condense_content(title, content, CONTENT_TOKEN_BUDGET))
+
+async def find_similar_article(title: str, content: str, provider: str = None) -> Optional[dict]:
+    """查找足够相似的历史文章，返回可直接使用的SEO结果（source 为 'reused'），没有时返回None
+    
+    指定了提供商（不是 'auto'）时只复用该提供商生成的结果；本地生成不复用
+    """
+    if not NEAR_DUP_ENABLED or is_local_provider(provider):
+        return None
+    signature = await asyncio.to_thread(article_signature, title, content)
+    if signature is None:
+        return None
+    match = near_dup_index.lookup(signature, None if provider == AUTO_PROVIDER else provider)
+    if match is None:
+        return None
+    logger.info(f"找到相似文章: {title} ≈ {match['title']}（相似度 {match['similarity']}），复用之前的结果")
+    return {
+        'summary': match['summary'],
+        'keywords': match['keywords'],
+        'slug': match['slug'],
+        'provider': match['provider'] or None,
+        'source': 'reused',
+        'similarity': match['similarity'],
+        'reused_from': match['title']
+    }
+
+async def register_similar_article(record: dict, content: str):
+    """把AI生成的结果登记到相似文章索引，之后上传的相似文章可直接复用（签名计算和写库在线程中执行）"""
+    if record['source'] != 'ai' or not content or not NEAR_DUP_ENABLED:
+        return
+    signature = await asyncio.to_thread(article_signature, record['title'], content)
+    if signature is not None:
+        await near_dup_index.add(signature, record['title'], record)
+
+def build_seo_record(title: str, seo_data: dict, filename: str, provider: str = None,
+                     stats: Optional[dict] = None) -> dict:
+    """组装返回给前端的SEO结果（slug与历史记录中其他文章重复时追加序号；复用相似文章的结果时沿用其slug）
+    
+    stats 为文档的全文统计（字数、标题数等）
+    """
+    source = seo_data['source']
+    slug = seo_data['slug'] or generate_slug(title, seo_data['keywords'])
+    record = {
+        'title': title,
+        'summary': seo_data['summary'],
+        'keywords': seo_data['keywords'],
+        'slug': slug if source == 'reused' else slug_index.claim(slug, title),
+        'model': MODEL_NAMES.get(seo_data['provider'] or provider or 'qwen', '通义千问'),
+        'provider': seo_data['provider'] or provider or '',
+        'source': source,
+        'cached': source == 'cache',
+        'reused': source == 'reused',
+        'filename': filename
+    }
+    if stats:
+        record['stats'] = stats
+    if source == 'reused':
+        record['similarity'] = seo_data['similarity']
+        record['reused_from'] = seo_data['reused_from']
+    return record
+
+def append_history(records: List[dict]):
+    """将SEO结果追加到历史记录（一次写入多条）"""
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    with open(HISTORY_CSV, 'a', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerows([
+            [
+                timestamp,
+                record['title'],
+                record['summary'],
+                record['keywords'],
+                record['slug'],
+                record['filename'],
+                record['model'],
+                RESULT_SOURCE_LABELS.get(record['source'], record['source'])
+            ]
+            for record in records
+        ])
+
 @app.post("/api/seo/process")
-async def process_seo(file: UploadFile = File(...), provider: str = Form(None)):
-    """处理Word文档，生成SEO内容"""
-    logger.info(f"收到SEO处理请求: {file.filename}, 使用API: {provider or '默认'}")
+async def process_seo(file: UploadFile = File(...), provider: str = Form(None),
+                      cache: Optional[str] = Query(None), reuse: bool = Query(True)):
+    """处理Word文档，生成SEO内容
     
-    # 保存上传的文件
-    file_path = f"uploads/{uuid.uuid4()}_{file.filename}"
-    async with aiofiles.open(file_path, 'wb') as f:
-        content = await file.read()
-        await f.write(content)
+    查询参数 cache=bypass 时跳过AI结果缓存和相似文章复用，强制重新生成；
+    reuse=false 时只跳过相似文章复用（与历史文章足够相似时默认直接返回之前的结果）
+    """
+    logger.info(f"收到SEO处理请求: {file.filename}, 使用API: {provider or '默认'}")
     
     try:
         # 读取Word文档
-        doc_data = read_docx(file_path)
+        doc_data = await read_uploaded_docx(file.filename, await file.read())
         title = doc_data['title']
         content = doc_data['content']
         
-        logger.info(f"文档标题: {title}, 内容长度: {len(content)}")
+        stats = doc_data.get('stats') or {}
+        logger.info(f"文档标题: {title}, 内容长度: {len(content)}, 全文字数: {stats.get('words', '-')}"
+                    f"{'（已截取）' if stats.get('truncated') else ''}")
         
-        # 生成SEO内容（传入provider参数）
-        seo_data = await generate_seo_content(title, content, provider=provider)
+        # 与历史文章足够相似时复用之前的结果，否则生成SEO内容（传入provider参数）
+        seo_data = await find_similar_article(title, content, provider) if reuse and cache != 'bypass' else None
+        if seo_data is None:
+            seo_data = await generate_seo_content(title, content, provider=provider, use_cache=(cache != 'bypass'))
+        record = build_seo_record(title, seo_data, file.filename, provider, doc_data.get('stats'))
         
-        # 确定使用的模型名称
-        model_names = {
-            'qwen': '通义千问',
-            'deepseek': 'DeepSeek',
-            'doubao': '豆包'
-        }
-        used_model = model_names.get(provider or 'qwen', '通义千问')
+        # 保存到历史记录（增加AI模型字段），AI生成的结果登记到相似文章索引
+        append_history([record])
+        await register_similar_article(record, content)
         
-        # 保存到历史记录（增加AI模型字段）
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        with open(HISTORY_CSV, 'a', encoding='utf-8-sig', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                timestamp,
-                title,
-                seo_data['summary'],
-                seo_data['keywords'],
-                seo_data['slug'],
-                file.filename,
-                used_model
-            ])
-        
-        logger.info(f"SEO内容生成成功: {title}, 使用模型: {used_model}")
+        logger.info(f"SEO内容生成成功: {title}, 使用模型: {record['model']}")
         
+        return record
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"处理SEO请求失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/seo/keywords")
+async def extract_seo_keywords(file: UploadFile = File(None), title: str = Form(''), content: str = Form(''),
+                               top_k: int = Query(KEYWORD_TOP_K, ge=1, le=20)):
+    """只提取关键词：上传Word文档，或直接提交标题和内容；使用本地TF-IDF，不调用AI"""
+    if file is not None:
+        doc_data = await read_uploaded_docx(file.filename, await file.read())
+        title, content = doc_data['title'], doc_data['content']
+    if not title and not content:
+        raise HTTPException(status_code=400, detail="请上传文档或提供标题和内容")
+    
+    start = time.perf_counter()
+    keyword_engine.refresh_if_changed()
+    keywords = keyword_engine.extract(title, content, top_k)
+    return {
+        'title': title,
+        'keywords': ','.join(keywords),
+        'source': 'local',
+        'elapsed_ms': round((time.perf_counter() - start) * 1000, 2),
+        'index': keyword_engine.snapshot()
+    }
+
+@app.get("/api/seo/slug")
+async def suggest_seo_slug(title: str = Query(..., min_length=1), keywords: str = Query('')):
+    """根据标题在本地生成slug（不调用AI），并检查是否与历史记录中其他文章重复"""
+    slug = generate_slug(title, keywords)
+    unique = slug_index.unique(slug, title)
+    return {'slug': unique, 'generated': slug, 'duplicate': unique != slug}
+
+def format_sse(event: str, data: dict) -> str:
+    """格式化一条Server-Sent Events消息"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/api/seo/stream")
+async def process_seo_stream(file: UploadFile = File(...), provider: str = Form(None),
+                             cache: Optional[str] = Query(None), reuse: bool = Query(True)):
+    """处理Word文档，以Server-Sent Events流式返回SEO内容
+    
+    cache 和 reuse 参数与 /api/seo/process 相同：与历史文章足够相似时直接返回之前的结果
+    
+    事件类型：
+        progress: 处理进度（parsed / provider / retry / saving）
+        token: 模型输出的增量文本
+        field: 某个字段（summary / keywords / slug）已完整
+        done: 最终结果（与 /api/seo/process 的返回相同）
+        error: 处理失败
+    
+    DeepSeek和豆包使用流式接口；通义千问使用普通调用，等待期间发送心跳。
+    """
+    logger.info(f"收到SEO流式处理请求: {file.filename}, 使用API: {provider or '默认'}")
+    data = await file.read()
+    filename = file.filename
+    
+    async def event_stream():
+        try:
+            doc_data = await read_uploaded_docx(filename, data)
+            title = doc_data['title']
+            content = doc_data['content']
+            yield format_sse('progress', {
+                'stage': 'parsed', 'title': title, 'content_length': len(content), 'stats': doc_data.get('stats')
+            })
+            
+            if is_local_provider(provider):
+                prompt, providers = None, []
+                seo_data = generate_local_seo_content(title, content)
+            else:
+                seo_data = await find_similar_article(title, content, provider) if reuse and cache != 'bypass' else None
+                if seo_data:
+                    prompt, providers = None, []
+                else:
+                    prompt, providers = build_seo_prompt(title, content, provider)
+                    seo_data = await lookup_cached_result(providers, prompt) if cache != 'bypass' else None
+            
+            for api_provider in ([] if seo_data else providers):
+                yield format_sse('progress', {'stage': 'provider', 'provider': api_provider, 'model': MODEL_NAMES.get(api_provider)})
+                try:
+                    if api_provider == 'qwen':
+                        call = call_provider(api_provider, title, content, prompt)
+                        result = None
+                        async for item in iter_with_keepalive(_await_once(call), SSE_KEEPALIVE_SECONDS):
+                            if item is None:
+                                yield ': keepalive\n\n'
+                            else:
+                                result = item
+                    else:
+                        parser = IncrementalFieldParser()
+                        async for delta in iter_with_keepalive(stream_provider(api_provider, prompt), SSE_KEEPALIVE_SECONDS):
+                            if delta is None:
+                                yield ': keepalive\n\n'
+                                continue
+                            yield format_sse('token', {'text': delta})
+                            for name, value in parser.feed(delta).items():
+                                yield format_sse('field', {'name': name, 'value': value})
+                        result = parse_ai_response(parser.buffer)
+                except Exception as e:
+                    logger.warning(f"{api_provider} 流式调用失败: {e}，尝试下一个API")
+                    result = None
+                
+                if result and result.get('summary'):
+                    await store_cached_result(api_provider, prompt, result)
+                    seo_data = {**result, 'provider': api_provider, 'source': 'ai'}
+                    break
+                yield format_sse('progress', {'stage': 'retry', 'provider': api_provider})
+            
+            if not seo_data:
+                logger.warning("所有AI API调用失败，使用模拟数据")
+                seo_data = {**generate_mock_seo_content(title, content), 'provider': None, 'source': 'mock'}
+            
+            for name in ('summary', 'keywords', 'slug'):
+                yield format_sse('field', {'name': name, 'value': seo_data[name]})
+            
+            yield format_sse('progress', {'stage': 'saving'})
+            record = build_seo_record(title, seo_data, filename, provider, doc_data.get('stats'))
+            append_history([record])
+            await register_similar_article(record, content)
+            logger.info(f"SEO内容流式生成成功: {title}, 使用模型: {record['model']}")
+            yield format_sse('done', record)
+        except Exception as e:
+            logger.error(f"处理SEO流式请求失败: {e}")
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            yield format_sse('error', {'detail': detail})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # 关闭Nginx缓冲，保证事件实时到达
+        }
+    )
+
+@app.post("/api/seo/batch")
+async def process_seo_batch(files: List[UploadFile] = File(...), provider: str = Form(None),
+                            cache: Optional[str] = Query(None), pack: Optional[bool] = Query(None),
+                            reuse: bool = Query(True)):
+    """批量处理Word文档，按完成顺序以NDJSON（每行一个JSON）流式返回结果
+    
+    每个文档一行：成功时 {"index", "ok": true, ...SEO结果}，失败时 {"index", "filename", "ok": false, "detail"}；
+    最后一行为汇总 {"done": true, "total", "succeeded"}。
+    文档并发解析，AI调用最多同时进行 SEO_BATCH_CONCURRENCY 个，全部结束后一次性写入历史记录。
+    查询参数 pack=true 时将多篇短文章合并为一次AI调用（默认由 SEO_PACK_ENABLED 决定）。
+    cache 和 reuse 参数与 /api/seo/process 相同：与历史文章足够相似的文档直接复用之前的结果。
+    """
+    use_pack = SEO_PACK_ENABLED if pack is None else pack
+    use_reuse = reuse and cache != 'bypass'
+    if len(files) > SEO_BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"最多只能上传{SEO_BATCH_MAX_FILES}个文档")
+    
+    uploads = [(file.filename, await file.read()) for file in files]
+    logger.info(f"收到SEO批量处理请求: {len(uploads)} 个文档, 使用API: {provider or '默认'}")
+    
+    async def process_one(index: int, filename: str, data: bytes, semaphore: asyncio.Semaphore):
+        try:
+            doc_data = await read_uploaded_docx(filename, data)
+            seo_data = await find_similar_article(doc_data['title'], doc_data['content'], provider) if use_reuse else None
+            if seo_data is None:
+                async with semaphore:
+                    seo_data = await generate_seo_content(
+                        doc_data['title'], doc_data['content'], provider=provider, use_cache=(cache != 'bypass')
+                    )
+            record = build_seo_record(doc_data['title'], seo_data, filename, provider, doc_data.get('stats'))
+            await register_similar_article(record, doc_data['content'])
+            return index, record, None
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            logger.error(f"批量处理文档失败 {filename}: {detail}")
+            return index, None, detail
+    
+    async def process_individually():
+        semaphore = asyncio.Semaphore(SEO_BATCH_CONCURRENCY)
+        tasks = [
+            asyncio.create_task(process_one(index, filename, data, semaphore))
+            for index, (filename, data) in enumerate(uploads)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    async def process_packed():
+        parsed = await asyncio.gather(
+            *(read_uploaded_docx(filename, data) for filename, data in uploads), return_exceptions=True
+        )
+        docs, doc_indices = [], []
+        for index, doc_data in enumerate(parsed):
+            if isinstance(doc_data, Exception):
+                detail = doc_data.detail if isinstance(doc_data, HTTPException) else str(doc_data)
+                logger.error(f"批量处理文档失败 {uploads[index][0]}: {detail}")
+                yield index, None, detail
+                continue
+            # 与历史文章足够相似的文档直接复用，其余的合并调用AI
+            reused = await find_similar_article(doc_data['title'], doc_data['content'], provider) if use_reuse else None
+            if reused:
+                yield index, build_seo_record(
+                    doc_data['title'], reused, uploads[index][0], provider, doc_data.get('stats')
+                ), None
+            else:
+                docs.append(doc_data)
+                doc_indices.append(index)
+        async for position, seo_data in generate_seo_content_packed(docs, provider, use_cache=(cache != 'bypass')):
+            index = doc_indices[position]
+            record = build_seo_record(
+                docs[position]['title'], seo_data, uploads[index][0], provider, docs[position].get('stats')
+            )
+            await register_similar_article(record, docs[position]['content'])
+            yield index, record, None
+    
+    async def result_lines():
+        records = []
+        results = process_packed() if use_pack else process_individually()
+        try:
+            async for index, record, error in results:
+                if record:
+                    records.append(record)
+                    line = {'index': index, 'ok': True, **record}
+                else:
+                    line = {'index': index, 'filename': uploads[index][0], 'ok': False, 'detail': error}
+                yield json.dumps(line, ensure_ascii=False) + '\n'
+        finally:
+            await results.aclose()
+            # 全部结束后一次性写入历史记录
+            if records:
+                append_history(records)
+        logger.info(f"SEO批量处理完成: {len(records)}/{len(uploads)} 成功")
+        yield json.dumps({'done': True, 'total': len(uploads), 'succeeded': len(records)}) + '\n'
+    
+    async def body():
+        async for line in iter_with_keepalive(result_lines(), SSE_KEEPALIVE_SECONDS):
+            # 等待期间输出空行作为心跳，避免代理超时断开
+            yield line if line is not None else '\n'
+    
+    return StreamingResponse(
+        body(),
+        media_type='application/x-ndjson',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+async def run_seo_jobs(jobs: List[dict]) -> list:
+    """任务队列worker执行的一组SEO任务（同一批次、允许合并的任务会被一起领取）
+    
+    返回与任务顺序一致的结果，文档读取失败的任务对应位置为异常。
+    与历史文章足够相似的文档直接复用之前的结果（提交时 cache=bypass 的任务不复用）
+    """
+    parsed = await asyncio.gather(
+        *(read_uploaded_docx(job['filename'], job['data']) for job in jobs), return_exceptions=True
+    )
+    results = list(parsed)
+    valid = [i for i, doc_data in enumerate(parsed) if not isinstance(doc_data, Exception)]
+    pending = []
+    for i in valid:
+        reused = None
+        if jobs[i]['use_cache']:
+            reused = await find_similar_article(parsed[i]['title'], parsed[i]['content'], jobs[i]['provider'])
+        if reused:
+            results[i] = reused
+        else:
+            pending.append(i)
+    if pending:
+        first = jobs[pending[0]]
+        if len(pending) > 1:
+            generated = generate_seo_content_packed(
+                [parsed[i] for i in pending], first['provider'], use_cache=bool(first['use_cache'])
+            )
+            async for position, seo_data in generated:
+                results[pending[position]] = seo_data
+        else:
+            results[pending[0]] = await generate_seo_content(
+                parsed[pending[0]]['title'], parsed[pending[0]]['content'],
+                provider=first['provider'], use_cache=bool(first['use_cache'])
+            )
+    
+    records = []
+    for i in valid:
+        record = build_seo_record(
+            parsed[i]['title'], results[i], jobs[i]['filename'], jobs[i]['provider'], parsed[i].get('stats')
+        )
+        await register_similar_article(record, parsed[i]['content'])
+        results[i] = record
+        records.append(record)
+        logger.info(f"SEO任务完成: {jobs[i]['id']} ({record['title']}), 使用模型: {record['model']}")
+    if records:
+        append_history(records)
+    return results
+
+@app.post("/api/seo/jobs", status_code=202)
+async def submit_seo_jobs(files: List[UploadFile] = File(...), provider: str = Form(None),
+                          cache: Optional[str] = Query(None), pack: Optional[bool] = Query(None)):
+    """提交SEO处理任务，立即返回批次ID和任务ID，结果通过任务查询接口获取
+    
+    查询参数 pack=true 时同一批次的短文章合并为一次AI调用（默认由 SEO_PACK_ENABLED 决定）
+    """
+    if len(files) > SEO_BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"最多只能上传{SEO_BATCH_MAX_FILES}个文档")
+    uploads = [(file.filename, await file.read()) for file in files]
+    submitted = await job_queue.submit(uploads, provider or None, use_cache=(cache != 'bypass'),
+                                 pack=SEO_PACK_ENABLED if pack is None else pack)
+    logger.info(f"已提交SEO任务: 批次 {submitted['batch_id']}, {len(uploads)} 个文档, 使用API: {provider or '默认'}")
+    return submitted
+
+@app.get("/api/seo/jobs/{job_id}")
+async def get_seo_job(job_id: str, wait: float = Query(0, ge=0)):
+    """查询任务状态和结果；wait>0 时长轮询，任务结束或超时后返回"""
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在或已过期")
+    if wait > 0 and job['status'] not in FINISHED_STATUSES:
+        async def finished():
+            nonlocal job
+            job = await job_queue.get(job_id)
+            # 等待期间任务被清理时结束等待
+            return job is None or job['status'] in FINISHED_STATUSES
+        await job_queue.wait_for(finished, min(wait, JOB_LONG_POLL_MAX))
+        if job is None:
+            raise HTTPException(status_code=404, detail="任务不存在或已过期")
+    return job
+
+@app.get("/api/seo/batches/{batch_id}")
+async def get_seo_batch(batch_id: str, wait: float = Query(0, ge=0), finished: int = Query(-1)):
+    """查询批次进度和各任务结果
+    
+    wait>0 时长轮询：直到已结束的任务数与客户端传入的 finished 不同（有新进展）、批次全部结束或超时
+    """
+    jobs = await job_queue.get_batch(batch_id)
+    if not jobs:
+        raise HTTPException(status_code=404, detail="批次不存在或已过期")
+    
+    def finished_count():
+        return sum(1 for job in jobs if job['status'] in FINISHED_STATUSES)
+    
+    if wait > 0 and finished_count() == finished:
+        async def progressed():
+            nonlocal jobs
+            jobs = await job_queue.get_batch(batch_id)
+            return finished_count() != finished
+        await job_queue.wait_for(progressed, min(wait, JOB_LONG_POLL_MAX))
+    
+    counts = {}
+    for job in jobs:
+        counts[job['status']] = counts.get(job['status'], 0) + 1
+    return {
+        'batch_id': batch_id,
+        'total': len(jobs),
+        'finished': finished_count(),
+        'done': finished_count() == len(jobs),
+        'counts': counts,
+        'jobs': jobs
+    }
+
+@app.get("/api/seo/queue")
+async def get_seo_queue():
+    """查看任务队列中各状态的任务数"""
+    return await job_queue.stats()
+
+@app.get("/api/seo/near-duplicates")
+async def get_near_duplicates():
+    """查看相似文章索引的文章数、阈值，以及查找和复用次数"""
+    return {'enabled': NEAR_DUP_ENABLED, **near_dup_index.snapshot()}
+
+async def _await_once(awaitable):
+    """将单个awaitable包装为只产出一次结果的异步生成器"""
+    yield await awaitable
+
+@app.get("/api/providers/circuit")
+async def get_provider_circuit():
+    """查看各AI提供商的熔断器状态"""
+    return circuit_breakers.snapshot()
+
+@app.get("/api/providers/limits")
+async def get_provider_limits():
+    """查看各AI提供商的准入控制状态（在途数、排队数、限流暂停时间）"""
+    return rate_limiters.snapshot()
+
+@app.get("/api/providers/latency")
+async def get_provider_latency():
+    """查看各AI提供商最近的耗时分布，以及据此计算出的当前超时设置
+    
+    耗时按 (提供商, 模型) 统计，返回的键为 "提供商/模型"；censored 为其中超时（按超时时间计入）的调用数
+    """
+    return {
+        f"{api_provider}/{model}": {
+            'provider': api_provider,
+            'model': model,
+            **provider_latency.snapshot((api_provider, model)),
+            'timeout': describe_provider_timeout(api_provider),
+            'hedge_delay': round(get_hedge_delay(api_provider), 2)
+        }
+        for api_provider, model in PROVIDER_MODELS.items()
+    }
+
+@app.get("/api/providers/routing")
+async def get_provider_routing():
+    """查看智能路由（auto 模式）中各AI提供商的耗时、失败率、成本、评分和综合得分（越低越优先）"""
+    return provider_router.snapshot(list(DEFAULT_PROVIDER_ORDER))
+
+@app.get("/api/usage/summary")
+async def get_usage_summary(group_by: str = Query('provider,day,outcome'), days: int = Query(7, ge=1, le=365)):
+    """AI调用用量聚合：按提供商、模型、日期、结果中的任意维度分组（逗号分隔）"""
+    try:
+        columns = [c.strip() for c in group_by.split(',') if c.strip()]
         return {
-            'title': title,
-            'summary': seo_data['summary'],
-            'keywords': seo_data['keywords'],
-            'slug': seo_data['slug'],
-            'model': used_model
+            'days': days,
+            'group_by': columns,
+            'rows': await asyncio.to_thread(usage_store.summary, columns, days)
         }
     except Exception as e:
-        logger.error(f"处理SEO请求失败: {e}")
+        logger.error(f"读取AI调用用量失败: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        # 清理上传的文件（可选）
-        if os.path.exists(file_path):
-            os.remove(file_path)
+
+@app.get("/api/usage/prompt-cache")
+async def get_prompt_cache_usage(days: int = Query(7, ge=1, le=365)):
+    """各提供商的提示词前缀缓存命中情况：命中的输入Token占比、命中与未命中调用的平均耗时、按价格估算节省的费用"""
+    try:
+        rows = await asyncio.to_thread(usage_store.prompt_cache_summary, days)
+    except Exception as e:
+        logger.error(f"读取AI调用用量失败: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    for row in rows:
+        prompt_price, _, cached_price = provider_price(row['provider'])
+        row['saved_cost'] = round(row['cached_tokens'] * (prompt_price - cached_price) / 1_000_000, 4)
+    return {'days': days, 'prefix_layout': PROMPT_PREFIX_CACHE, 'rows': rows}
 
 @app.post("/api/image/convert")
 async def convert_images(files: List[UploadFile] = File(...)):
@@ -1763,7 +2972,10 @@ async def delete_history():
             # 重新创建空的CSV文件（带标题行，包含AI模型字段）
             with open(HISTORY_CSV, 'w', encoding='utf-8-sig', newline='') as f:
                 writer = csv.writer(f)
-                writer.writerow(['时间', '标题', '摘要', '关键词', 'slug', '文章附加', 'AI模型'])
+                writer.writerow(HISTORY_HEADER)
+            keyword_engine.refresh()
+            slug_index.refresh()
+            near_dup_index.clear()
             
             return {'message': '历史记录已删除'}
         else:
@@ -1774,29 +2986,34 @@ async def delete_history():
 
 @app.post("/api/seo/rate")
 async def rate_seo_result(data: dict):
-    """评分SEO生成结果，用于改进模型"""
+    """评分SEO生成结果，用于改进模型
+    
+    provider 和 source 取自被评分的结果（而不是请求时选择的提供商）；
+    只有由提供商实际生成的结果（见 RATED_SOURCES）计入智能路由的评分
+    """
     try:
-        provider = data.get('provider', '')
+        provider = data.get('provider') or ''
+        source = data.get('source') or ''
         title = data.get('title', '')
         summary = data.get('summary', '')
         keywords = data.get('keywords', '')
         slug = data.get('slug', '')
         rating = data.get('rating', 0)
         
-        if not provider or not title or rating < 1 or rating > 5:
+        if not title or rating < 1 or rating > 5:
             raise HTTPException(status_code=400, detail="无效的评分数据")
         
         # 记录评分到日志（包含完整信息，可用于后续分析）
-        logger.info(f"收到评分 - 模型: {provider}, 标题: {title}, 评分: {rating}分, 摘要: {summary[:50]}..., 关键词: {keywords}, Slug: {slug}")
+        logger.info(f"收到评分 - 模型: {provider or '-'}, 来源: {source or '-'}, 标题: {title}, 评分: {rating}分, 摘要: {summary[:50]}..., 关键词: {keywords}, Slug: {slug}")
         
         # 可以将评分保存到文件，用于后续分析和模型改进
-        rating_file = 'history/ratings.csv'
+        rating_file = RATINGS_CSV
         rating_exists = Path(rating_file).exists()
         
         with open(rating_file, 'a', encoding='utf-8-sig', newline='') as f:
             writer = csv.writer(f)
             if not rating_exists:
-                writer.writerow(['时间', '模型', '标题', '摘要', '关键词', 'Slug', '评分'])
+                writer.writerow(RATINGS_HEADER)
             writer.writerow([
                 datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
                 provider,
@@ -1804,10 +3021,15 @@ async def rate_seo_result(data: dict):
                 summary,
                 keywords,
                 slug,
-                rating
+                rating,
+                RESULT_SOURCE_LABELS.get(source, source)
             ])
         
         logger.info(f"评分已保存到: {rating_file}")
+        if source in RATED_SOURCES and provider in PROVIDER_MODELS:
+            provider_router.add_rating(provider, rating)
+        else:
+            logger.info(f"评分不计入智能路由 - 结果来源: {source or '未知'}")
         
         return {'message': f'评分已记录：{rating}分，将用于改进模型生成效果', 'rating': rating}
     except Exception as e:
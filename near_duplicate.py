@@ -0,0 +1,197 @@
+"""
+相似文章检测
+对每篇处理过的文章（压缩后的内容）计算MinHash签名，保存在 history/ 下的SQLite文件中，
+启动时加载到内存并建立LSH分桶索引；上传的文章与历史文章足够相似（轻微改动后重新发布）时，
+直接复用之前生成的摘要、关键词和slug，无需再次调用AI
+
+签名使用单次排列MinHash（one permutation hashing）：每个片段只计算一次哈希并分配到一个桶，
+各桶取最小值，空桶从右侧相邻的桶借值，纯Python下每篇文章不到1毫秒
+
+SQLite使用一个长连接；登记文章时写库在线程中执行，内存索引只在事件循环中修改
+"""
+
+import os
+import re
+import time
+import zlib
+import asyncio
+import itertools
+import sqlite3
+import logging
+import threading
+from array import array
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 相似检测配置 - 从环境变量读取，如果没有则使用默认值
+NEAR_DUP_ENABLED = os.getenv('NEAR_DUP_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+NEAR_DUP_DB = os.getenv('NEAR_DUP_DB', 'history/near_duplicates.sqlite3')
+NEAR_DUP_THRESHOLD = float(os.getenv('NEAR_DUP_THRESHOLD', '0.85'))  # 估计的Jaccard相似度阈值
+NEAR_DUP_MAX_ENTRIES = int(os.getenv('NEAR_DUP_MAX_ENTRIES', '50000'))  # 超出时删除最早的记录
+
+SIGNATURE_SIZE = 128
+# LSH：16个分桶带，每带8个值；相似度约0.7以上的文章才会成为候选
+LSH_BANDS = 16
+LSH_ROWS = SIGNATURE_SIZE // LSH_BANDS
+SHINGLE_SIZE = 4
+# 少于该数量的片段不做相似检测（内容太短，容易误判）
+MIN_SHINGLES = 50
+
+_EMPTY = 0xFFFFFFFF
+_NON_TEXT_PATTERN = re.compile(r'[\s\W_]+')
+
+
+def minhash_signature(text: str) -> Optional[array]:
+    """计算文本的MinHash签名（字符4-gram片段，忽略空白和标点），内容太短时返回None"""
+    text = _NON_TEXT_PATTERN.sub('', text.lower())
+    if len(text) - SHINGLE_SIZE + 1 < MIN_SHINGLES:
+        return None
+    signature = array('I', [_EMPTY]) * SIGNATURE_SIZE
+    for i in range(len(text) - SHINGLE_SIZE + 1):
+        value = zlib.crc32(text[i:i + SHINGLE_SIZE].encode('utf-8'))
+        slot = value % SIGNATURE_SIZE
+        value //= SIGNATURE_SIZE
+        if value < signature[slot]:
+            signature[slot] = value
+    # 空桶借用右侧（循环）第一个非空桶的值，并按距离偏移以区分来源
+    for slot in range(SIGNATURE_SIZE):
+        if signature[slot] == _EMPTY:
+            for distance in range(1, SIGNATURE_SIZE):
+                value = signature[(slot + distance) % SIGNATURE_SIZE]
+                if value != _EMPTY:
+                    signature[slot] = (value + distance * 0x9E3779B1) & 0x7FFFFFFF
+                    break
+    return signature
+
+
+def similarity(a: array, b: array) -> float:
+    """由签名估计两篇文章的Jaccard相似度"""
+    return sum(x == y for x, y in zip(a, b)) / SIGNATURE_SIZE
+
+
+class NearDuplicateIndex:
+    """历史文章的MinHash签名与LSH索引"""
+
+    def __init__(self, db_path: str = NEAR_DUP_DB, threshold: float = NEAR_DUP_THRESHOLD):
+        self.db_path = db_path
+        self.threshold = threshold
+        self.entries: Dict[int, tuple] = {}  # id -> (签名, 结果)
+        self.buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(LSH_BANDS)]
+        self.hits = 0
+        self.lookups = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=5, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        with self._lock, self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS articles ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, created_at REAL, title TEXT, signature BLOB, '
+                'summary TEXT, keywords TEXT, slug TEXT, provider TEXT)'
+            )
+
+    def load(self):
+        """加载全部签名并建立索引"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT id, title, signature, summary, keywords, slug, provider FROM articles ORDER BY id'
+            ).fetchall()
+        for article_id, title, blob, summary, keywords, slug, provider in rows:
+            signature = array('I')
+            signature.frombytes(blob)
+            self._index(article_id, signature, {
+                'title': title, 'summary': summary, 'keywords': keywords, 'slug': slug, 'provider': provider
+            })
+        logger.info(f"相似文章索引已加载 - 文章数: {len(self.entries)}")
+
+    def _index(self, article_id: int, signature: array, result: dict):
+        self.entries[article_id] = (signature, result)
+        for band, buckets in enumerate(self.buckets):
+            key = signature[band * LSH_ROWS:(band + 1) * LSH_ROWS].tobytes()
+            buckets.setdefault(key, []).append(article_id)
+
+    def _unindex(self, article_id: int):
+        signature, _ = self.entries.pop(article_id)
+        for band, buckets in enumerate(self.buckets):
+            key = signature[band * LSH_ROWS:(band + 1) * LSH_ROWS].tobytes()
+            ids = buckets.get(key)
+            if ids and article_id in ids:
+                ids.remove(article_id)
+                if not ids:
+                    del buckets[key]
+
+    def _best_match(self, signature: array, provider: Optional[str] = None) -> Optional[tuple]:
+        """LSH候选中相似度不低于阈值的最相似文章，返回 (id, 相似度)；指定 provider 时只考虑该提供商生成的文章"""
+        candidates = set()
+        for band, buckets in enumerate(self.buckets):
+            candidates.update(buckets.get(signature[band * LSH_ROWS:(band + 1) * LSH_ROWS].tobytes(), ()))
+        best, best_score = None, self.threshold
+        for article_id in candidates:
+            if provider and self.entries[article_id][1]['provider'] != provider:
+                continue
+            score = similarity(signature, self.entries[article_id][0])
+            if score >= best_score:
+                best, best_score = article_id, score
+        return (best, best_score) if best is not None else None
+
+    def lookup(self, signature: array, provider: Optional[str] = None) -> Optional[dict]:
+        """查找相似度不低于阈值的最相似历史文章，返回其结果（附 similarity），没有时返回None
+
+        provider 不为空时只复用该提供商生成的结果
+        """
+        self.lookups += 1
+        match = self._best_match(signature, provider)
+        if match is None:
+            return None
+        self.hits += 1
+        article_id, score = match
+        return {**self.entries[article_id][1], 'similarity': round(score, 3)}
+
+    def _insert(self, title: str, signature: array, stored: dict, removed: List[int]) -> int:
+        """写入一篇文章并删除 removed 中的旧记录，返回新记录的id（在线程中执行）"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                'INSERT INTO articles (created_at, title, signature, summary, keywords, slug, provider) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (time.time(), title, signature.tobytes(), stored['summary'], stored['keywords'],
+                 stored['slug'], stored['provider'])
+            )
+            if removed:
+                self._conn.execute(f"DELETE FROM articles WHERE id IN ({','.join('?' * len(removed))})", removed)
+            return cursor.lastrowid
+
+    async def add(self, signature: array, title: str, result: dict):
+        """登记一篇文章的签名和生成结果；与同一提供商生成的已有文章几乎相同（相似度为1）时不重复登记"""
+        match = self._best_match(signature, result.get('provider'))
+        if match and match[1] >= 1.0:
+            return
+        stored = {key: result.get(key) or '' for key in ('summary', 'keywords', 'slug', 'provider')}
+        # entries 按id（写入顺序）排列，开头的即最早的记录
+        removed = list(itertools.islice(self.entries, max(0, len(self.entries) - NEAR_DUP_MAX_ENTRIES + 1)))
+        try:
+            article_id = await asyncio.to_thread(self._insert, title, signature, stored, removed)
+        except sqlite3.Error as e:
+            logger.warning(f"写入相似文章索引失败: {e}")
+            return
+        for old_id in removed:
+            if old_id in self.entries:
+                self._unindex(old_id)
+        self._index(article_id, signature, {'title': title, **stored})
+
+    def clear(self):
+        """删除全部签名（历史记录被删除时调用）"""
+        try:
+            with self._lock, self._conn:
+                self._conn.execute('DELETE FROM articles')
+        except sqlite3.Error as e:
+            logger.warning(f"清空相似文章索引失败: {e}")
+        self.entries = {}
+        self.buckets = [{} for _ in range(LSH_BANDS)]
+
+    def snapshot(self) -> dict:
+        return {
+            'articles': len(self.entries),
+            'threshold': self.threshold,
+            'lookups': self.lookups,
+            'hits': self.hits
+        }
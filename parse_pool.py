@@ -0,0 +1,143 @@
+"""
+Word文档解析进程池
+文档解析是CPU密集的同步操作，放在线程中仍会因GIL拖慢事件循环，一篇大文档就会让其他请求变慢；
+解析改为在有界进程池中执行：每个工作进程限制虚拟内存（RLIMIT_AS，超出时抛出MemoryError），
+每篇文档限制CPU时间（RLIMIT_CPU，超出时收到SIGXCPU），超出限制的文档直接失败，不影响其他请求。
+工作进程意外退出时重建进程池，此时正在该进程池中排队的文档也会失败
+"""
+
+import os
+import math
+import signal
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # Windows 不支持资源限制，只使用进程隔离
+    resource = None
+
+from docx_reader import parse_document, DocumentLimitError
+
+logger = logging.getLogger(__name__)
+
+# 解析进程池配置 - 从环境变量读取，如果没有则使用默认值
+DOCX_PARSE_WORKERS = int(os.getenv('DOCX_PARSE_WORKERS', '2'))  # 为0时在线程中解析，不使用进程池
+DOCX_PARSE_MAX_QUEUE = int(os.getenv('DOCX_PARSE_MAX_QUEUE', '32'))  # 允许排队等待的文档数
+DOCX_PARSE_CPU_SECONDS = int(os.getenv('DOCX_PARSE_CPU_SECONDS', '10'))  # 每篇文档的CPU时间上限
+DOCX_PARSE_MEMORY_MB = int(os.getenv('DOCX_PARSE_MEMORY_MB', '1024'))  # 每个工作进程的虚拟内存上限
+
+MB = 1024 * 1024
+
+_executor: Optional[ProcessPoolExecutor] = None
+_pending = 0
+
+
+class ParsePoolBusy(Exception):
+    """解析排队已满，调用方应直接返回错误"""
+
+
+def _on_cpu_limit(signum, frame):
+    raise DocumentLimitError(f"解析CPU时间超过 {DOCX_PARSE_CPU_SECONDS} 秒")
+
+
+def _soft_limit(value: int, hard: int) -> int:
+    return value if hard == resource.RLIM_INFINITY else min(value, hard)
+
+
+def _init_worker():
+    """工作进程初始化：设置内存上限，CPU时间超限信号转为异常"""
+    if resource is None:
+        return
+    if DOCX_PARSE_MEMORY_MB > 0:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        resource.setrlimit(resource.RLIMIT_AS, (_soft_limit(DOCX_PARSE_MEMORY_MB * MB, hard), hard))
+    signal.signal(signal.SIGXCPU, _on_cpu_limit)
+
+
+def _parse_in_worker(data: bytes, fast: bool) -> dict:
+    """在工作进程中解析一篇文档；CPU时间上限按本进程已用时间加上每篇文档的额度设置"""
+    cpu_limited = resource is not None and DOCX_PARSE_CPU_SECONDS > 0
+    if cpu_limited:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        limit = math.ceil(usage.ru_utime + usage.ru_stime) + DOCX_PARSE_CPU_SECONDS
+        resource.setrlimit(resource.RLIMIT_CPU, (_soft_limit(limit, hard), hard))
+    try:
+        return parse_document(data, fast)
+    except DocumentLimitError:
+        raise
+    except MemoryError:
+        raise DocumentLimitError(f"解析内存超过 {DOCX_PARSE_MEMORY_MB} MB") from None
+    except Exception as e:
+        # 解析库的异常类型不一定能在进程间传递，只保留错误信息
+        raise ValueError(str(e)) from None
+    finally:
+        if cpu_limited:
+            resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+
+
+def init_parse_pool():
+    """创建解析进程池（应用启动时调用），并预先启动工作进程"""
+    global _executor
+    if DOCX_PARSE_WORKERS <= 0 or _executor is not None:
+        return
+    # 使用spawn：工作进程不继承事件循环、线程和连接等状态
+    _executor = ProcessPoolExecutor(
+        max_workers=DOCX_PARSE_WORKERS,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker
+    )
+    for _ in range(DOCX_PARSE_WORKERS):
+        _executor.submit(os.getpid)
+    logger.info(
+        f"文档解析进程池已启动 - 进程数: {DOCX_PARSE_WORKERS}, 最大排队: {DOCX_PARSE_MAX_QUEUE}, "
+        f"CPU时间上限: {DOCX_PARSE_CPU_SECONDS}秒, 内存上限: {DOCX_PARSE_MEMORY_MB}MB"
+    )
+
+
+async def parse_docx(data: bytes, fast: bool = True) -> dict:
+    """在进程池中解析Word文档，返回标题和内容（未启用进程池时在线程中解析）
+
+    超出大小、CPU时间或内存限制时抛出 DocumentLimitError，排队已满时抛出 ParsePoolBusy，
+    文档无法解析时抛出 ValueError 等异常
+    """
+    global _pending
+    executor = _executor
+    if executor is None:
+        return await asyncio.to_thread(parse_document, data, fast)
+    if _pending >= DOCX_PARSE_WORKERS + DOCX_PARSE_MAX_QUEUE:
+        raise ParsePoolBusy(f"文档解析排队已满（{_pending}）")
+
+    _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, partial(_parse_in_worker, data, fast))
+    except BrokenProcessPool:
+        _restart(executor)
+        raise DocumentLimitError("解析进程意外退出（文档可能超出资源限制）") from None
+    finally:
+        _pending -= 1
+
+
+def _restart(broken: ProcessPoolExecutor):
+    global _executor
+    if _executor is broken:
+        logger.warning("文档解析进程意外退出，重建进程池")
+        broken.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+        init_parse_pool()
+
+
+def shutdown_parse_pool():
+    """应用关闭时释放进程池"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        logger.info("文档解析进程池已关闭")
+    _executor = None
@@ -0,0 +1,56 @@
+"""
+提示词布局
+默认模板把标题和文章内容放在前面、任务要求和输出格式放在后面，每次请求的开头都不同，
+无法命中提供商的提示词前缀缓存（DeepSeek等对缓存命中的输入Token按更低价格计费，首字延迟也更短）。
+开启 PROMPT_PREFIX_CACHE 后，固定不变的说明、任务要求和输出格式排在前面，文章放在最后
+"""
+
+import os
+from typing import Optional
+
+# 布局配置 - 从环境变量读取，如果没有则使用默认值
+PROMPT_PREFIX_CACHE = os.getenv('PROMPT_PREFIX_CACHE', 'false').lower() in ('1', 'true', 'yes')
+
+# 提示词模板中的分段标记（用户自定义的提示词缺少这些标记时保持原有布局）
+ARTICLE_MARKER = '【文章标题】'
+RULES_MARKER = '【任务要求】'
+FORMAT_MARKER = '【输出格式】'
+# 模板结尾的引导语，调整布局后放在文章之后
+CLOSING_LINE = '请开始生成：'
+
+
+def split_template(template: str) -> Optional[tuple]:
+    """将单篇提示词模板拆分为 (开头说明, 文章部分, 任务要求, 输出格式)，模板不符合格式时返回None"""
+    try:
+        article = template.index(ARTICLE_MARKER)
+        rules = template.index(RULES_MARKER)
+        output_format = template.index(FORMAT_MARKER)
+    except ValueError:
+        return None
+    if not article < rules < output_format:
+        return None
+    return (
+        template[:article].strip(),
+        template[article:rules].strip(),
+        template[rules:output_format].strip(),
+        template[output_format:].strip()
+    )
+
+
+def static_first(head: str, rules: str, output_format: str, articles: str) -> str:
+    """固定部分在前、文章在后的提示词，引导语放在最后"""
+    if output_format.endswith(CLOSING_LINE):
+        output_format = output_format[:-len(CLOSING_LINE)].rstrip()
+    return f"{head}\n\n{rules}\n\n{output_format}\n\n{articles}\n\n{CLOSING_LINE}"
+
+
+def format_prompt(template: str, title: str, content: str) -> str:
+    """用标题和内容填充提示词模板；开启 PROMPT_PREFIX_CACHE 且模板包含分段标记时调整为固定部分在前"""
+    if PROMPT_PREFIX_CACHE:
+        parts = split_template(template)
+        if parts is not None:
+            head, article, rules, output_format = (
+                part.format(title=title, content=content) for part in parts
+            )
+            return static_first(head, rules, output_format, article)
+    return template.format(title=title, content=content)
@@ -0,0 +1,188 @@
+"""
+AI提供商智能路由（auto 模式）
+综合最近的调用耗时、失败率、每次调用的成本和编辑的评分为各提供商打分，
+每个请求优先发给当前得分最好的提供商，其余按得分排序作为备选；
+按一定比例随机探索其他提供商，使各项统计保持更新
+"""
+
+import os
+import csv
+import random
+import logging
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from provider_stats import LatencyTracker
+from circuit_breaker import CircuitBreakerRegistry, STATE_OPEN
+
+logger = logging.getLogger(__name__)
+
+# 路由配置 - 从环境变量读取，如果没有则使用默认值
+ROUTER_EXPLORE_RATE = float(os.getenv('ROUTER_EXPLORE_RATE', '0.1'))
+ROUTER_WEIGHT_LATENCY = float(os.getenv('ROUTER_WEIGHT_LATENCY', '1'))
+ROUTER_WEIGHT_ERRORS = float(os.getenv('ROUTER_WEIGHT_ERRORS', '2'))
+ROUTER_WEIGHT_COST = float(os.getenv('ROUTER_WEIGHT_COST', '0.5'))
+ROUTER_WEIGHT_RATING = float(os.getenv('ROUTER_WEIGHT_RATING', '1'))
+
+# 评分的先验（贝叶斯平滑）：没有评分或评分很少时向该均值靠拢
+RATING_PRIOR = 4.0
+RATING_PRIOR_WEIGHT = 5
+
+# 各提供商的价格（元/百万Token，输入,输出,缓存命中的输入），
+# 可通过 ROUTER_PRICE_{PROVIDER}="输入,输出[,缓存命中的输入]" 覆盖
+DEFAULT_PRICES = {
+    'qwen': (0.3, 0.6, 0.12),
+    'deepseek': (2.0, 3.0, 0.2),
+    'doubao': (0.8, 2.0, 0.16)
+}
+# 没有用量记录时假定的每次调用Token数（输入, 输出, 其中缓存命中的输入）
+DEFAULT_CALL_TOKENS = (800.0, 150.0, 0.0)
+# 每次调用Token数的指数滑动平均系数
+TOKENS_EWMA_ALPHA = 0.1
+
+
+def provider_price(provider: str) -> tuple:
+    """提供商的价格（元/百万Token），返回 (输入, 输出, 缓存命中的输入)"""
+    value = os.getenv(f'ROUTER_PRICE_{provider.upper()}')
+    if value:
+        try:
+            prices = [float(v) for v in value.split(',')]
+            if len(prices) in (2, 3):
+                # 未指定缓存命中价格时按输入价格计算（即不考虑缓存）
+                return prices[0], prices[1], prices[2] if len(prices) == 3 else prices[0]
+        except ValueError:
+            pass
+        logger.warning(f"ROUTER_PRICE_{provider.upper()} 格式错误，应为 \"输入,输出[,缓存命中的输入]\"")
+    return DEFAULT_PRICES.get(provider, (1.0, 2.0, 1.0))
+
+
+class ProviderRouter:
+    """按综合得分为提供商排序（得分越低越好）"""
+
+    def __init__(self, latency: LatencyTracker, breakers: CircuitBreakerRegistry,
+                 is_available: Callable[[str], bool] = lambda provider: True,
+                 models: Optional[Dict[str, str]] = None):
+        self.latency = latency
+        self.models = models or {}  # provider -> 当前使用的模型（耗时按 (提供商, 模型) 统计）
+        self.breakers = breakers
+        self.is_available = is_available
+        self.ratings: Dict[str, List[float]] = {}  # provider -> [评分总和, 评分次数]
+        self.call_tokens: Dict[str, List[float]] = {}  # provider -> [输入Token, 输出Token, 缓存命中Token] 的滑动平均
+        self.routed: Dict[str, int] = {}
+        self.explored = 0
+
+    def load_ratings(self, path: str, aliases: Optional[Dict[str, str]] = None, sources: Optional[set] = None):
+        """从评分记录CSV中读取历史评分（"模型"列可以是提供商名称或显示名称）
+
+        sources 为计入评分的“结果来源”列取值，该列为空（旧版记录）的评分全部计入
+        """
+        if not Path(path).exists():
+            return
+        aliases = aliases or {}
+        try:
+            with open(path, encoding='utf-8-sig', newline='') as f:
+                for row in csv.DictReader(f):
+                    if sources is not None and row.get('结果来源') and row['结果来源'] not in sources:
+                        continue
+                    provider = aliases.get(row.get('模型', ''), row.get('模型', ''))
+                    try:
+                        self.add_rating(provider, float(row.get('评分', '')))
+                    except ValueError:
+                        continue
+        except (OSError, csv.Error) as e:
+            logger.warning(f"读取评分记录失败: {e}")
+            return
+        logger.info(f"已加载评分记录: { {p: int(n) for p, (_, n) in self.ratings.items()} }")
+
+    def add_rating(self, provider: str, rating: float):
+        if not provider or not 1 <= rating <= 5:
+            return
+        total = self.ratings.setdefault(provider, [0.0, 0])
+        total[0] += rating
+        total[1] += 1
+
+    def record_usage(self, provider: str, usage: dict):
+        """记录一次成功调用的Token用量，用于估算每次调用的成本"""
+        sample = [usage.get(key) or 0 for key in ('prompt_tokens', 'completion_tokens', 'cached_tokens')]
+        if not sample[0] and not sample[1]:
+            return
+        tokens = self.call_tokens.get(provider)
+        if tokens is None:
+            self.call_tokens[provider] = [float(v) for v in sample]
+            return
+        for i, value in enumerate(sample):
+            tokens[i] += TOKENS_EWMA_ALPHA * (value - tokens[i])
+
+    def average_rating(self, provider: str) -> float:
+        total, count = self.ratings.get(provider, (0.0, 0))
+        return (total + RATING_PRIOR * RATING_PRIOR_WEIGHT) / (count + RATING_PRIOR_WEIGHT)
+
+    def cost_per_call(self, provider: str) -> float:
+        """估算的每次调用成本（元），缓存命中的输入Token按缓存价格计算"""
+        prompt_tokens, completion_tokens, cached_tokens = self.call_tokens.get(provider, DEFAULT_CALL_TOKENS)
+        prompt_price, completion_price, cached_price = provider_price(provider)
+        return ((prompt_tokens - cached_tokens) * prompt_price + cached_tokens * cached_price
+                + completion_tokens * completion_price) / 1_000_000
+
+    def scores(self, providers: List[str]) -> Dict[str, dict]:
+        """各提供商的指标和得分；耗时和成本按可用提供商中的最优值归一化"""
+        metrics = {}
+        for provider in providers:
+            metrics[provider] = {
+                'available': self.is_available(provider) and self.breakers.get(provider).state != STATE_OPEN,
+                'p50_latency': self.latency.percentile((provider, self.models.get(provider, '')), 0.5),
+                'failure_rate': self.breakers.get(provider).failure_rate(),
+                'cost_per_call': self.cost_per_call(provider),
+                'rating': self.average_rating(provider),
+                'ratings': int(self.ratings.get(provider, (0, 0))[1])
+            }
+
+        # 只与可用的提供商比较，避免未配置的提供商拉低基准
+        candidates = [m for m in metrics.values() if m['available']] or list(metrics.values())
+        latencies = [m['p50_latency'] for m in candidates if m['p50_latency']]
+        best_latency = min(latencies) if latencies else None
+        best_cost = min((m['cost_per_call'] for m in candidates), default=0)
+        for m in metrics.values():
+            # 没有耗时样本的提供商按最优值计算，保证它会被尝试
+            latency_ratio = m['p50_latency'] / best_latency if m['p50_latency'] and best_latency else 1.0
+            cost_ratio = m['cost_per_call'] / best_cost if best_cost > 0 else 1.0
+            m['score'] = round(
+                ROUTER_WEIGHT_LATENCY * latency_ratio
+                + ROUTER_WEIGHT_ERRORS * m['failure_rate']
+                + ROUTER_WEIGHT_COST * cost_ratio
+                + ROUTER_WEIGHT_RATING * (5 - m['rating']) / 4,
+                4
+            )
+            if m['p50_latency']:
+                m['p50_latency'] = round(m['p50_latency'], 3)
+            m['cost_per_call'] = round(m['cost_per_call'], 6)
+            m['rating'] = round(m['rating'], 2)
+        return metrics
+
+    def rank(self, providers: List[str]) -> List[str]:
+        """按得分排序，不可用（未配置或熔断中）的提供商排在最后；按 ROUTER_EXPLORE_RATE 随机把其他可用提供商排到第一位"""
+        metrics = self.scores(providers)
+        ranked = sorted(providers, key=lambda p: (not metrics[p]['available'], metrics[p]['score']))
+        available = [p for p in ranked if metrics[p]['available']]
+        if len(available) > 1 and random.random() < ROUTER_EXPLORE_RATE:
+            explore = random.choice(available[1:])
+            ranked.remove(explore)
+            ranked.insert(0, explore)
+            self.explored += 1
+        if ranked:
+            self.routed[ranked[0]] = self.routed.get(ranked[0], 0) + 1
+        return ranked
+
+    def snapshot(self, providers: List[str]) -> dict:
+        return {
+            'explore_rate': ROUTER_EXPLORE_RATE,
+            'weights': {
+                'latency': ROUTER_WEIGHT_LATENCY,
+                'errors': ROUTER_WEIGHT_ERRORS,
+                'cost': ROUTER_WEIGHT_COST,
+                'rating': ROUTER_WEIGHT_RATING
+            },
+            'routed': dict(self.routed),
+            'explored': self.explored,
+            'providers': self.scores(providers)
+        }
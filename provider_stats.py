@@ -0,0 +1,98 @@
+"""
+AI提供商运行统计
+记录各提供商（按模型区分）最近的调用耗时（用于对冲延迟和自适应超时），并提供对冲请求（hedged request）的预算控制
+"""
+
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, List, Optional
+
+# 每个提供商保留的最近耗时样本数
+LATENCY_WINDOW = 200
+
+# 耗时直方图的桶上限（秒），最后一个桶为 +Inf
+LATENCY_BUCKETS = (0.5, 1, 2, 3, 5, 8, 13, 20, 30, 45, 60)
+
+
+class LatencyTracker:
+    """按 (提供商, 模型) 记录最近调用的耗时（秒）
+
+    超时的调用记为删失样本（censored）：真实耗时未知，只知道不短于超时时间，按超时时间计入分布。
+    只统计成功调用会低估尾部耗时，自适应超时会因此越调越短；分位数落在删失样本上时为真实值的下界
+    """
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._samples: Dict[tuple, deque] = {}  # (提供商, 模型) -> (耗时, 是否删失)
+
+    def record(self, key: tuple, seconds: float, censored: bool = False):
+        samples = self._samples.get(key)
+        if samples is None:
+            samples = self._samples[key] = deque(maxlen=self.window)
+        samples.append((seconds, censored))
+
+    def keys(self) -> List[tuple]:
+        return list(self._samples)
+
+    def count(self, key: tuple) -> int:
+        return len(self._samples.get(key, ()))
+
+    def censored(self, key: tuple) -> int:
+        """最近样本中超时（删失）的调用数"""
+        return sum(1 for _, censored in self._samples.get(key, ()) if censored)
+
+    def percentile(self, key: tuple, q: float) -> Optional[float]:
+        """返回耗时的q分位数（0~1），没有样本时返回None"""
+        samples = self._samples.get(key)
+        if not samples:
+            return None
+        ordered = sorted(seconds for seconds, _ in samples)
+        index = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[index]
+
+    def histogram(self, key: tuple) -> List[dict]:
+        """最近样本的耗时分布，每个桶为 {"le": 上限, "count": 落在上一个桶与该上限之间的样本数}"""
+        counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        for seconds, _ in self._samples.get(key, ()):
+            counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        bounds = list(LATENCY_BUCKETS) + ['+Inf']
+        return [{'le': bound, 'count': count} for bound, count in zip(bounds, counts)]
+
+    def snapshot(self, key: tuple) -> dict:
+        """样本数、超时数、常用分位数和直方图（用于接口展示）"""
+        def rounded(q):
+            value = self.percentile(key, q)
+            return round(value, 3) if value is not None else None
+        return {
+            'samples': self.count(key),
+            'censored': self.censored(key),
+            'p50': rounded(0.5),
+            'p90': rounded(0.9),
+            'p99': rounded(0.99),
+            'histogram': self.histogram(key)
+        }
+
+
+class HedgeBudget:
+    """对冲预算：每个请求存入 ratio 个令牌，每次对冲消耗1个令牌
+
+    长期来看被对冲的请求比例不会超过 ratio，同时允许小幅突发
+    """
+
+    def __init__(self, ratio: float, burst: float = 10.0):
+        self.ratio = ratio
+        self.capacity = max(1.0, burst)
+        self.tokens = 1.0
+        self.requests = 0
+        self.hedged = 0
+
+    def deposit(self):
+        self.requests += 1
+        self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def try_withdraw(self) -> bool:
+        if self.ratio <= 0 or self.tokens < 1:
+            return False
+        self.tokens -= 1
+        self.hedged += 1
+        return True
@@ -0,0 +1,173 @@
+"""
+AI提供商准入控制
+每个提供商独立限制：最大在途调用数、按请求数（RPM）和估算Token数（TPM）计量的令牌桶，
+按到达顺序公平排队；收到429时按 Retry-After（或指数退避）暂停该提供商的准入
+"""
+
+import os
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 默认配置 - 可按提供商覆盖，如 RATE_LIMIT_DOUBAO_RPM=120；0 表示不限制（默认不限制，按提供商的配额开启）
+RATE_LIMIT_CONCURRENCY = int(os.getenv('RATE_LIMIT_CONCURRENCY', '0'))
+RATE_LIMIT_RPM = float(os.getenv('RATE_LIMIT_RPM', '0'))
+RATE_LIMIT_TPM = float(os.getenv('RATE_LIMIT_TPM', '0'))
+RATE_LIMIT_MAX_WAIT = float(os.getenv('RATE_LIMIT_MAX_WAIT', '30'))  # 排队等待上限（秒）
+RATE_LIMIT_MAX_RETRIES = int(os.getenv('RATE_LIMIT_MAX_RETRIES', '2'))  # 429后的重试次数
+RATE_LIMIT_BACKOFF_BASE = float(os.getenv('RATE_LIMIT_BACKOFF_BASE', '1'))
+RATE_LIMIT_BACKOFF_MAX = float(os.getenv('RATE_LIMIT_BACKOFF_MAX', '30'))
+
+
+class RateLimitedError(Exception):
+    """提供商返回429（请求过于频繁）"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionTimeout(Exception):
+    """排队等待超过 RATE_LIMIT_MAX_WAIT"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 响应头（秒数或HTTP日期），无法解析时返回None"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _env(provider: str, key: str, default: float) -> float:
+    return float(os.getenv(f'RATE_LIMIT_{provider.upper()}_{key}', default))
+
+
+class TokenBucket:
+    """令牌桶：容量为每分钟配额，按秒匀速补充；rate_per_minute<=0 表示不限制"""
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = rate_per_minute
+        self.tokens = rate_per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.capacity / 60)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """还需等待多少秒才能取出 amount 个令牌"""
+        if self.capacity <= 0:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) * 60 / self.capacity
+
+    def take(self, amount: float):
+        if self.capacity > 0:
+            self.tokens -= min(amount, self.capacity)
+
+
+class ProviderLimiter:
+    """单个提供商的准入控制（max_concurrency<=0 表示不限制在途调用数）"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.max_concurrency = int(_env(name, 'CONCURRENCY', RATE_LIMIT_CONCURRENCY))
+        self.requests = TokenBucket(_env(name, 'RPM', RATE_LIMIT_RPM))
+        self.tokens = TokenBucket(_env(name, 'TPM', RATE_LIMIT_TPM))
+        self.in_flight = 0
+        self.waiting = 0
+        self.blocked_until = 0.0
+        self.rate_limited = 0
+        self._queue_lock = asyncio.Lock()  # asyncio.Lock 按到达顺序唤醒，保证排队公平
+        self._slot_released = asyncio.Event()
+
+    async def _wait_for_admission(self, estimated_tokens: int):
+        async with self._queue_lock:
+            while True:
+                now = time.monotonic()
+                delay = max(
+                    self.blocked_until - now,
+                    self.requests.wait_time(1),
+                    self.tokens.wait_time(estimated_tokens)
+                )
+                if delay <= 0 and (self.max_concurrency <= 0 or self.in_flight < self.max_concurrency):
+                    break
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    self._slot_released.clear()
+                    await self._slot_released.wait()
+            self.requests.take(1)
+            self.tokens.take(estimated_tokens)
+            self.in_flight += 1
+
+    @asynccontextmanager
+    async def admit(self, estimated_tokens: int = 0):
+        """排队获取调用名额，等待超过 RATE_LIMIT_MAX_WAIT 时抛出 AdmissionTimeout"""
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._wait_for_admission(estimated_tokens), timeout=RATE_LIMIT_MAX_WAIT)
+        except asyncio.TimeoutError:
+            raise AdmissionTimeout(f"{self.name} 排队等待超过 {RATE_LIMIT_MAX_WAIT:.0f}秒")
+        finally:
+            self.waiting -= 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._slot_released.set()
+
+    def backoff(self, retry_after: Optional[float], attempt: int) -> float:
+        """收到429后暂停准入，优先使用 Retry-After，否则指数退避；返回暂停秒数"""
+        if retry_after is None:
+            retry_after = RATE_LIMIT_BACKOFF_BASE * (2 ** attempt)
+        delay = min(retry_after, RATE_LIMIT_BACKOFF_MAX)
+        self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+        self.rate_limited += 1
+        logger.warning(f"{self.name} 触发限流(429)，暂停 {delay:.1f}秒后重试")
+        return delay
+
+    def snapshot(self) -> dict:
+        return {
+            'max_concurrency': self.max_concurrency,
+            'in_flight': self.in_flight,
+            'waiting': self.waiting,
+            'rpm': self.requests.capacity,
+            'tpm': self.tokens.capacity,
+            'blocked_for_seconds': round(max(0.0, self.blocked_until - time.monotonic()), 1),
+            'rate_limited': self.rate_limited
+        }
+
+
+class RateLimiterRegistry:
+    """按提供商名称管理准入控制"""
+
+    def __init__(self):
+        self._limiters: Dict[str, ProviderLimiter] = {}
+
+    def get(self, name: str) -> ProviderLimiter:
+        limiter = self._limiters.get(name)
+        if limiter is None:
+            limiter = self._limiters[name] = ProviderLimiter(name)
+        return limiter
+
+    def snapshot(self) -> dict:
+        return {name: limiter.snapshot() for name, limiter in self._limiters.items()}
+
@@ -0,0 +1,162 @@
+"""
+AI生成结果缓存
+按（提供商、提示词哈希、模型、温度）缓存SEO生成结果：
+进程内LRU作为一级缓存，history/ 下的SQLite文件作为持久化的二级缓存，
+重启后仍然有效，并可被多个worker进程共享。
+内存LRU同步查询；SQLite使用一个长连接，异步接口（aget/aset）在线程中读写磁盘，不阻塞事件循环
+"""
+
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# 缓存配置 - 从环境变量读取，如果没有则使用默认值
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+LLM_CACHE_DB = os.getenv('LLM_CACHE_DB', 'history/llm_cache.sqlite3')
+LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', str(7 * 24 * 3600)))  # 默认7天
+LLM_CACHE_MEMORY_SIZE = int(os.getenv('LLM_CACHE_MEMORY_SIZE', '512'))
+LLM_CACHE_DISK_SIZE = int(os.getenv('LLM_CACHE_DISK_SIZE', '20000'))
+
+# 每写入多少次执行一次磁盘清理
+_PRUNE_EVERY = 100
+
+
+def hash_text(text: str) -> str:
+    """计算文本的SHA-256"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def make_cache_key(provider: str, prompt: str, model: str, temperature: float) -> str:
+    """生成缓存键：提供商 + 提示词哈希 + 模型 + 温度"""
+    return hash_text(f"{provider}|{model}|{temperature}|{hash_text(prompt)}")
+
+
+class LLMResultCache:
+    """两级缓存：内存LRU + SQLite持久化"""
+
+    def __init__(self, db_path: str = LLM_CACHE_DB, ttl: int = LLM_CACHE_TTL,
+                 memory_size: int = LLM_CACHE_MEMORY_SIZE, disk_size: int = LLM_CACHE_DISK_SIZE):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self._memory = OrderedDict()  # key -> (expires_at, value)
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=5, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._init_db()
+
+    def _init_db(self):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS llm_cache ('
+                'key TEXT PRIMARY KEY, provider TEXT, model TEXT, value TEXT, '
+                'created_at REAL, expires_at REAL)'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_llm_cache_created ON llm_cache(created_at)')
+
+    def _remember(self, key: str, expires_at: float, value: dict):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get_memory(self, key: str) -> Optional[dict]:
+        """只查内存缓存，过期返回None"""
+        item = self._memory.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at > time.time():
+            self._memory.move_to_end(key)
+            return dict(value)
+        del self._memory[key]
+        return None
+
+    def _read_disk(self, key: str) -> Optional[tuple]:
+        """读取磁盘缓存，返回 (expires_at, value)，未命中或过期返回None"""
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    'SELECT value, expires_at FROM llm_cache WHERE key = ?', (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"读取AI结果缓存失败: {e}")
+            return None
+        if not row or row[1] <= time.time():
+            return None
+        return row[1], json.loads(row[0])
+
+    def _write_disk(self, key: str, provider: str, model: str, value: dict, now: float, expires_at: float):
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO llm_cache (key, provider, model, value, created_at, expires_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (key, provider, model, json.dumps(value, ensure_ascii=False), now, expires_at)
+                )
+            self._writes += 1
+            if self._writes % _PRUNE_EVERY == 0:
+                self.prune()
+        except sqlite3.Error as e:
+            logger.warning(f"写入AI结果缓存失败: {e}")
+
+    def get(self, key: str) -> Optional[dict]:
+        """读取缓存，先查内存再查磁盘，过期返回None"""
+        value = self.get_memory(key)
+        if value is not None:
+            return value
+        row = self._read_disk(key)
+        if row is None:
+            return None
+        self._remember(key, *row)
+        return dict(row[1])
+
+    async def aget(self, key: str) -> Optional[dict]:
+        """同 get，内存未命中时在线程中查询磁盘"""
+        value = self.get_memory(key)
+        if value is not None:
+            return value
+        row = await asyncio.to_thread(self._read_disk, key)
+        if row is None:
+            return None
+        self._remember(key, *row)
+        return dict(row[1])
+
+    def set(self, key: str, provider: str, model: str, value: dict):
+        """写入缓存（内存和磁盘同时写入）"""
+        now = time.time()
+        self._remember(key, now + self.ttl, value)
+        self._write_disk(key, provider, model, value, now, now + self.ttl)
+
+    async def aset(self, key: str, provider: str, model: str, value: dict):
+        """同 set，磁盘写入在线程中执行"""
+        now = time.time()
+        self._remember(key, now + self.ttl, value)
+        await asyncio.to_thread(self._write_disk, key, provider, model, value, now, now + self.ttl)
+
+    def prune(self):
+        """清理过期条目，并将磁盘缓存裁剪到 disk_size 条以内（先淘汰最旧的）"""
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM llm_cache WHERE expires_at <= ?', (time.time(),))
+            self._conn.execute(
+                'DELETE FROM llm_cache WHERE key IN ('
+                'SELECT key FROM llm_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)',
+                (self.disk_size,)
+            )
+
+    def clear(self):
+        """清空全部缓存"""
+        self._memory.clear()
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM llm_cache')
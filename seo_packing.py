@@ -0,0 +1,101 @@
+"""
+多篇文章合并生成
+批量处理时，将多篇短文章放入同一个提示词，一次调用返回按文章编号排列的JSON数组，
+再拆分回每篇文章的结果；提示词中固定的任务要求只需发送一次，可显著减少调用次数和Token用量
+"""
+
+import os
+import re
+from typing import Dict, List, Optional
+
+from content_condense import estimate_tokens
+from prompt_layout import PROMPT_PREFIX_CACHE, CLOSING_LINE, split_template, static_first
+from ai_response import strip_wrappers, loads_tolerant, find_fields, normalize_fields
+
+# 合并配置 - 从环境变量读取，如果没有则使用默认值
+SEO_PACK_ENABLED = os.getenv('SEO_PACK_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+SEO_PACK_MAX_DOCS = int(os.getenv('SEO_PACK_MAX_DOCS', '6'))  # 每次调用最多合并的文章数
+SEO_PACK_MAX_TOKENS = int(os.getenv('SEO_PACK_MAX_TOKENS', '3000'))  # 每次调用的文章内容Token上限
+SEO_PACK_DOC_TOKENS = int(os.getenv('SEO_PACK_DOC_TOKENS', '600'))  # 超过该值的文章单独生成
+
+JSON_OBJECT_PATTERN = re.compile(r'\{[^{}]*\}', re.DOTALL)
+
+PACKED_OUTPUT_FORMAT = """【输出格式】
+请严格按照以下JSON数组格式返回，每篇文章一个对象，id与文章编号一致，不要添加任何其他文字说明：
+[
+    {{"id": 1, "summary": "第1篇文章的摘要", "keywords": "关键词1,关键词2,关键词3", "slug": "article-slug-format"}},
+    ...
+    {{"id": {count}, "summary": "第{count}篇文章的摘要", "keywords": "关键词1,关键词2", "slug": "another-article-slug"}}
+]
+
+""" + CLOSING_LINE
+
+
+def plan_packs(docs: List[dict], provider: str = None) -> List[List[int]]:
+    """将文章分组，返回每组的文章序号；长文章单独成组
+
+    docs 中每项需包含 title、content（已压缩的内容）
+    """
+    packs = []
+    current, current_tokens = [], 0
+    for index, doc in enumerate(docs):
+        tokens = estimate_tokens(doc['title'] + doc['content'], provider)
+        if tokens > SEO_PACK_DOC_TOKENS:
+            packs.append([index])
+            continue
+        if current and (len(current) >= SEO_PACK_MAX_DOCS or current_tokens + tokens > SEO_PACK_MAX_TOKENS):
+            packs.append(current)
+            current, current_tokens = [], 0
+        current.append(index)
+        current_tokens += tokens
+    if current:
+        packs.append(current)
+    return packs
+
+
+def build_packed_prompt(template: str, docs: List[dict]) -> Optional[str]:
+    """生成多篇文章的提示词，文章编号从1开始；模板不符合格式时返回None"""
+    parts = split_template(template)
+    if parts is None:
+        return None
+    head, _, rules, _ = parts
+    articles = '\n\n'.join(
+        f"【文章 {number}】\n标题：{doc['title']}\n内容：\n{doc['content']}"
+        for number, doc in enumerate(docs, 1)
+    )
+    if PROMPT_PREFIX_CACHE:
+        # 固定部分在前，文章在后（见 prompt_layout）
+        return static_first(
+            f"{head}\n每次会提供若干篇相互独立的文章，请分别为每篇文章生成SEO信息。",
+            f"{rules}\n每篇文章单独处理，不要混用其他文章的内容。",
+            PACKED_OUTPUT_FORMAT.format(count='N'),
+            f"下面共有{len(docs)}篇文章：\n\n{articles}"
+        )
+    return (
+        f"{head}\n下面共有{len(docs)}篇相互独立的文章，请分别为每篇文章生成SEO信息。\n\n"
+        f"{articles}\n\n"
+        f"{rules}\n每篇文章单独处理，不要混用其他文章的内容。\n\n"
+        f"{PACKED_OUTPUT_FORMAT.format(count=len(docs))}"
+    )
+
+
+def parse_packed_response(result_text: str, count: int) -> Dict[int, dict]:
+    """解析合并生成的返回结果，返回 {文章编号: 结果}；缺失或无法解析的文章不包含在结果中"""
+    text = strip_wrappers(result_text)
+    items = loads_tolerant(text, '[')
+    if not isinstance(items, list):
+        # 整体无法解析时逐个解析对象，只丢弃格式有误的那一篇
+        items = [loads_tolerant(match.group()) for match in JSON_OBJECT_PATTERN.finditer(text)]
+
+    results = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        try:
+            number = int(item.get('id'))
+        except (TypeError, ValueError):
+            continue
+        fields = normalize_fields(find_fields(item) or {})
+        if 1 <= number <= count and fields['summary'] and number not in results:
+            results[number] = fields
+    return results
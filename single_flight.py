@@ -0,0 +1,49 @@
+"""
+相同请求合并（single-flight）
+同一个键同时只执行一次：执行期间到达的相同请求等待并共享同一个结果，
+而不是各自发起一次重复的AI调用
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """按键合并并发执行的协程"""
+
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, factory: Callable[[], Awaitable]):
+        """执行 factory() 并返回结果；相同 key 的调用仍在进行时直接等待它的结果
+
+        调用在独立的任务中执行，某个等待者被取消不会取消共享的调用
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(factory())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+            self.executed += 1
+        else:
+            self.coalesced += 1
+            logger.info(f"合并相同的进行中请求，共享同一次调用结果 - 累计合并: {self.coalesced}")
+        return await asyncio.shield(task)
+
+    def _done(self, key: str, task: asyncio.Task):
+        self._in_flight.pop(key, None)
+        if not task.cancelled():
+            # 所有等待者都已取消时，避免出现"异常未被获取"的警告
+            task.exception()
+
+    def snapshot(self) -> dict:
+        return {
+            'in_flight': len(self._in_flight),
+            'executed': self.executed,
+            'coalesced': self.coalesced
+        }
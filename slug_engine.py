@@ -0,0 +1,147 @@
+"""
+本地slug生成与去重
+中文按内置拼音表（data/pinyin.txt）转写，英文单词和数字保留，去掉虚词和英文停用词，
+按连字符拼接并整理为30-50个字符；历史记录中已使用的slug保存在内存索引中，
+与其他文章重复时按 -2、-3... 的顺序追加后缀
+"""
+
+import os
+import re
+import hashlib
+import logging
+from typing import Dict, List, Optional
+
+from history_reader import read_appended_rows, has_changed
+
+logger = logging.getLogger(__name__)
+
+PINYIN_TABLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'pinyin.txt')
+
+SLUG_MIN_CHARS = 30
+SLUG_MAX_CHARS = 50
+
+TOKEN_PATTERN = re.compile(r'[a-zA-Z]+|\d+|[一-鿿]+')
+SLUG_INVALID_PATTERN = re.compile(r'[^a-z0-9]+')
+
+# 不参与转写的虚词，以及英文停用词
+STOP_CHARS = set('的了和与及或之在是把被对等着')
+STOP_WORDS = {'a', 'an', 'the', 'of', 'and', 'or', 'to', 'in', 'on', 'for', 'with', 'at', 'by', 'from', 'is', 'are'}
+
+_chars: Dict[str, str] = {}
+_phrases: Dict[str, List[str]] = {}
+
+
+def _load_table():
+    """加载拼音表（首次使用时加载一次）"""
+    if _chars:
+        return
+    with open(PINYIN_TABLE, encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('#') or not line.strip():
+                continue
+            head, *rest = line.split()
+            if head.startswith('@'):
+                _phrases[head[1:]] = rest
+            else:
+                for ch in rest[0]:
+                    _chars[ch] = head
+
+
+def transliterate(text: str) -> List[str]:
+    """将文本转为slug用的词：每个汉字一个拼音音节（常见多音字词语按词语读音），英文小写，数字保留"""
+    _load_table()
+    words = []
+    for token in TOKEN_PATTERN.findall(text):
+        if token.isascii():
+            token = token.lower()
+            if token not in STOP_WORDS:
+                words.append(token)
+            continue
+        i = 0
+        while i < len(token):
+            phrase = _phrases.get(token[i:i + 2])
+            if phrase:
+                words.extend(phrase)
+                i += 2
+                continue
+            ch = token[i]
+            if ch not in STOP_CHARS and ch in _chars:
+                words.append(_chars[ch])
+            i += 1
+    return words
+
+
+def shape(words: List[str], extra: Optional[List[str]] = None) -> str:
+    """拼接为slug：超过50个字符时在词边界截断，不足30个字符时依次用 extra 中的词补充"""
+    slug = ''
+    for word in words:
+        candidate = f"{slug}-{word}" if slug else word
+        if len(candidate) > SLUG_MAX_CHARS:
+            slug = slug or word[:SLUG_MAX_CHARS]
+            break
+        slug = candidate
+    for word in extra or []:
+        if len(slug) >= SLUG_MIN_CHARS:
+            break
+        if word in slug:
+            continue
+        candidate = f"{slug}-{word}" if slug else word
+        if len(candidate) > SLUG_MAX_CHARS:
+            break
+        slug = candidate
+    return slug
+
+
+def make_slug(title: str, keywords: str = '') -> str:
+    """根据标题生成slug；标题较短时用关键词补足长度"""
+    extra = ['-'.join(transliterate(k)) for k in keywords.split(',') if k.strip()]
+    slug = shape(transliterate(title), [w for w in extra if w])
+    return slug or 'article-' + hashlib.md5(title.encode('utf-8')).hexdigest()[:8]
+
+
+class SlugIndex:
+    """历史记录中已使用的slug（slug -> 标题摘要），用于O(1)检查重复"""
+
+    def __init__(self, history_csv: str):
+        self.history_csv = history_csv
+        self.offset = 0
+        self.slugs: Dict[str, str] = {}
+
+    @staticmethod
+    def _owner(title: str) -> str:
+        return hashlib.md5(title.strip().encode('utf-8')).hexdigest()[:12]
+
+    def refresh(self):
+        """读取历史记录中新追加的slug；历史记录被清空或替换时重新构建"""
+        rows, offset = read_appended_rows(self.history_csv, self.offset)
+        if rows is None:
+            self.slugs = {}
+            rows, offset = read_appended_rows(self.history_csv, 0)
+        for row in rows:
+            if len(row) >= 5 and row[4]:
+                self.slugs.setdefault(row[4], self._owner(row[1]))
+        if offset != self.offset:
+            self.offset = offset
+            logger.info(f"slug索引已更新 - 共 {len(self.slugs)} 个")
+
+    def unique(self, slug: str, title: str) -> str:
+        """返回不与其他文章重复的slug（不登记）；同一标题再次生成时沿用原slug"""
+        if has_changed(self.history_csv, self.offset):
+            self.refresh()
+        owner = self._owner(title)
+        if self.slugs.get(slug, owner) == owner:
+            return slug
+        number = 2
+        while True:
+            suffix = f"-{number}"
+            candidate = slug[:SLUG_MAX_CHARS - len(suffix)].rstrip('-') + suffix
+            if self.slugs.get(candidate, owner) == owner:
+                return candidate
+            number += 1
+
+    def claim(self, slug: str, title: str) -> str:
+        """返回不重复的slug并登记"""
+        slug = SLUG_INVALID_PATTERN.sub('-', slug.lower()).strip('-') or make_slug(title)
+        slug = self.unique(slug, title)
+        self.slugs[slug] = self._owner(title)
+        return slug
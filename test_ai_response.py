@@ -0,0 +1,67 @@
+"""
+AI返回结果解析测试（ai_response、seo_packing）
+"""
+
+from ai_response import parse_ai_response, strip_wrapper_quotes
+from seo_packing import parse_packed_response
+
+
+def test_valid_json_keeps_quotes_in_summary():
+    text = '{"summary": "“双碳”目标推动能源转型，新能源汽车产业快速发展。", "keywords": "双碳,新能源", "slug": "dual-carbon"}'
+    result = parse_ai_response(text)
+    assert result == {
+        'summary': '“双碳”目标推动能源转型，新能源汽车产业快速发展。',
+        'keywords': '双碳,新能源',
+        'slug': 'dual-carbon'
+    }
+
+
+def test_valid_json_keeps_quotes_at_summary_end():
+    text = '{"summary": "多地出台政策支持\\"人工智能+\\"", "keywords": "人工智能", "slug": "ai-plus"}'
+    assert parse_ai_response(text)['summary'] == '多地出台政策支持"人工智能+"'
+
+
+def test_code_fence_and_list_keywords():
+    text = '```json\n{"summary": "人工智能正在改变医疗行业。", "keywords": ["AI", "医疗"], "slug": "AI Medical"}\n```'
+    result = parse_ai_response(text)
+    assert result['keywords'] == 'AI,医疗'
+    assert result['slug'] == 'ai-medical'
+
+
+def test_field_lines_strip_balanced_wrapper_quotes_only():
+    text = '摘要：“人工智能发展迅速，医疗影像诊断效率大幅提升。”\n关键词：人工智能,医疗\nslug: ai-medical'
+    assert parse_ai_response(text)['summary'] == '人工智能发展迅速，医疗影像诊断效率大幅提升。'
+
+
+def test_strip_wrapper_quotes():
+    assert strip_wrapper_quotes('“人工智能发展”') == '人工智能发展'
+    assert strip_wrapper_quotes('"“双碳”目标"') == '“双碳”目标'
+    # 开头和结尾的引号不是同一对时保留
+    assert strip_wrapper_quotes('“双碳”与“稳增长”') == '“双碳”与“稳增长”'
+    assert strip_wrapper_quotes('"未闭合') == '"未闭合'
+
+
+def test_unparseable_text_returns_empty_fields():
+    assert parse_ai_response('抱歉，我无法完成这个请求')['summary'] == ''
+
+
+def test_packed_response():
+    text = (
+        '[{"id": 1, "summary": "第一篇文章的摘要。", "keywords": "甲,乙", "slug": "first"},'
+        ' {"id": 2, "summary": "第二篇文章的摘要。", "keywords": "丙", "slug": "second"}]'
+    )
+    results = parse_packed_response(text, 2)
+    assert sorted(results) == [1, 2]
+    assert results[2] == {'summary': '第二篇文章的摘要。', 'keywords': '丙', 'slug': 'second'}
+
+
+def test_packed_response_skips_broken_and_out_of_range_items():
+    text = (
+        '```json\n[{"id": 1, "summary": "第一篇文章的摘要。", "keywords": "甲", "slug": "first"},\n'
+        '{"id": 2, "summary": },\n'
+        '{"id": 5, "summary": "编号超出范围。", "keywords": "丁", "slug": "fifth"},\n'
+        '{"id": 3, "summary": "第三篇文章的摘要。", "keywords": "丙", "slug": "third"}]\n```'
+    )
+    results = parse_packed_response(text, 3)
+    assert sorted(results) == [1, 3]
+    assert results[3]['slug'] == 'third'
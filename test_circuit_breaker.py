@@ -0,0 +1,153 @@
+"""
+AI提供商熔断器测试（circuit_breaker）
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+import circuit_breaker
+from circuit_breaker import (
+    CircuitBreaker, CircuitBreakerRegistry, STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(circuit_breaker, 'time', SimpleNamespace(monotonic=clock))
+    monkeypatch.setattr(circuit_breaker, 'CB_WINDOW', 10)
+    monkeypatch.setattr(circuit_breaker, 'CB_MIN_CALLS', 5)
+    monkeypatch.setattr(circuit_breaker, 'CB_FAILURE_RATE', 0.5)
+    monkeypatch.setattr(circuit_breaker, 'CB_CONSECUTIVE_TIMEOUTS', 3)
+    monkeypatch.setattr(circuit_breaker, 'CB_OPEN_SECONDS', 30.0)
+    monkeypatch.setattr(circuit_breaker, 'CB_HALF_OPEN_CALLS', 1)
+    return clock
+
+
+def open_breaker(breaker: CircuitBreaker):
+    for _ in range(3):
+        breaker.record_failure(timeout=True)
+    assert breaker.state == STATE_OPEN
+
+
+def test_failure_rate_needs_min_calls(clock):
+    breaker = CircuitBreaker('test')
+    for _ in range(4):
+        breaker.record_failure()
+    # 失败率100%，但样本数不足 CB_MIN_CALLS
+    assert breaker.state == STATE_CLOSED
+    breaker.record_failure()
+    assert breaker.state == STATE_OPEN
+
+
+def test_failure_rate_over_window(clock):
+    breaker = CircuitBreaker('test')
+    for _ in range(6):
+        breaker.record_success()
+    for _ in range(4):
+        breaker.record_failure()
+    assert breaker.failure_rate() == 0.4 and breaker.state == STATE_CLOSED
+    # 窗口只保留最近10次：最早的成功被挤出后失败率达到50%
+    breaker.record_failure()
+    assert breaker.failure_rate() == 0.5
+    assert breaker.state == STATE_OPEN
+
+
+def test_consecutive_timeouts_trip(clock, monkeypatch):
+    monkeypatch.setattr(circuit_breaker, 'CB_WINDOW', 50)
+    breaker = CircuitBreaker('test')
+    for _ in range(10):
+        breaker.record_success()
+    breaker.record_failure(timeout=True)
+    breaker.record_failure(timeout=True)
+    # 非超时的失败和成功都会重新计数
+    breaker.record_failure()
+    breaker.record_failure(timeout=True)
+    breaker.record_success()
+    breaker.record_failure(timeout=True)
+    breaker.record_failure(timeout=True)
+    assert breaker.state == STATE_CLOSED
+    breaker.record_failure(timeout=True)
+    assert breaker.state == STATE_OPEN
+    assert breaker.failure_rate() < 0.5
+
+
+def test_open_duration_expiry(clock):
+    breaker = CircuitBreaker('test')
+    open_breaker(breaker)
+    assert not breaker.allow_request()
+    clock.now += 29.9
+    assert not breaker.allow_request()
+    assert breaker.snapshot()['retry_in_seconds'] == pytest.approx(0.1)
+    assert breaker.snapshot()['skipped'] == 2
+    clock.now += 0.1
+    assert breaker.allow_request()
+    assert breaker.state == STATE_HALF_OPEN
+
+
+def test_single_half_open_probe(clock):
+    breaker = CircuitBreaker('test')
+    open_breaker(breaker)
+    clock.now += 30
+    assert breaker.allow_request()
+    # 探测请求返回前不放行其他请求
+    assert not breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == STATE_CLOSED
+    assert breaker.allow_request() and breaker.allow_request()
+    assert breaker.failure_rate() == 0.0
+
+
+def test_failed_probe_reopens(clock):
+    breaker = CircuitBreaker('test')
+    open_breaker(breaker)
+    clock.now += 30
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == STATE_OPEN
+    # 重新计时
+    clock.now += 29
+    assert not breaker.allow_request()
+    clock.now += 1
+    assert breaker.allow_request()
+
+
+def test_release_returns_the_probe_slot(clock):
+    breaker = CircuitBreaker('test')
+    open_breaker(breaker)
+    clock.now += 30
+    assert breaker.allow_request()
+    # 探测请求被取消（如对冲请求中的落后者），名额归还且不计入统计
+    breaker.release()
+    assert breaker.state == STATE_HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.release()
+    breaker.release()
+    assert breaker.half_open_in_flight == 0
+
+
+def test_release_when_closed_is_noop(clock):
+    breaker = CircuitBreaker('test')
+    assert breaker.allow_request()
+    breaker.release()
+    assert breaker.state == STATE_CLOSED and len(breaker.outcomes) == 0
+
+
+def test_registry(clock):
+    registry = CircuitBreakerRegistry()
+    assert registry.get('a') is registry.get('a')
+    open_breaker(registry.get('b'))
+    snapshot = registry.snapshot()
+    assert snapshot['a']['state'] == STATE_CLOSED
+    assert snapshot['b']['state'] == STATE_OPEN and snapshot['b']['consecutive_timeouts'] == 3
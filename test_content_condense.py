@@ -0,0 +1,65 @@
+"""
+文章内容压缩测试（content_condense）
+"""
+
+from content_condense import condense_content, estimate_tokens, fit_sentence, summarize
+
+ARTICLE = '\n'.join([
+    '新能源汽车产业进入规模化发展阶段。' + '各地陆续出台配套政策，充电基础设施建设明显提速。' * 3,
+    '电池技术',
+    '动力电池能量密度持续提升，成本不断下降。' + '固态电池的研发进展受到行业广泛关注。' * 4,
+    '海外市场',
+    '出口规模快速增长，自主品牌的国际竞争力增强。' + '企业加快在海外建设生产基地和销售网络。' * 4,
+])
+
+
+def test_short_content_is_returned_without_empty_lines():
+    assert condense_content('标题', '第一段。\n\n第二段。', 1000) == '第一段。\n第二段。'
+
+
+def test_condensed_content_fits_budget():
+    for budget in (40, 80, 150):
+        condensed = condense_content('新能源汽车产业发展', ARTICLE, budget, 'deepseek')
+        assert condensed
+        assert estimate_tokens(condensed, 'deepseek') <= budget
+
+
+def test_condense_keeps_lead_sentence_and_headings():
+    condensed = condense_content('新能源汽车产业发展', ARTICLE, 120)
+    lines = condensed.split('\n')
+    assert lines[0].startswith('新能源汽车产业进入规模化发展阶段。')
+    assert '电池技术' in lines and '海外市场' in lines
+
+
+def test_unpunctuated_content_is_cut_to_budget():
+    condensed = condense_content('标题', '没有标点的超长段落' * 50, 30)
+    assert len(condensed) == 30
+
+
+def test_fit_sentence_cuts_at_clause_boundary():
+    sentence = '本文介绍了新能源汽车产业的最新进展，包括电池技术的突破，以及海外市场的快速扩张和自主品牌竞争力的提升。'
+    fitted = fit_sentence(sentence, 40)
+    assert fitted == '介绍了新能源汽车产业的最新进展，包括电池技术的突破。'
+    assert len(fitted) <= 40
+
+
+def test_fit_sentence_returns_empty_when_no_clause_fits():
+    assert fit_sentence('没有任何分句标点的一个很长很长很长很长很长很长的句子。', 20) == ''
+
+
+def test_summary_respects_max_chars():
+    for max_chars in (30, 68, 120):
+        summary = summarize('新能源汽车产业发展', ARTICLE, max_chars)
+        assert 0 < len(summary) <= max_chars
+
+
+def test_summary_truncates_best_sentence_when_nothing_fits():
+    content = '人工智能技术在医疗影像诊断领域的应用不断深入并且已经在全国数百家医院的放射科实现规模化部署和常态化运行。'
+    summary = summarize('医疗人工智能', content, 30)
+    assert len(summary) == 30
+    assert summary == content[:29] + '…'
+
+
+def test_summary_uses_title_only_without_content():
+    assert summarize('人工智能在医疗影像中的应用', '', 68) == '人工智能在医疗影像中的应用'
+    assert summarize('标题', '只有一行小标题', 68) == '只有一行小标题'
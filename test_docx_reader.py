@@ -0,0 +1,85 @@
+"""
+Word文档读取测试（docx_reader），与python-docx的读取结果对照
+"""
+
+import io
+
+from docx import Document
+from docx.enum.text import WD_BREAK
+
+from docx_reader import parse_document, read_docx_paragraphs
+
+
+def make_document(table: bool = True) -> bytes:
+    doc = Document()
+    doc.add_heading('新能源汽车产业观察', 0)
+    doc.add_paragraph('新能源汽车产业进入规模化发展阶段，充电基础设施建设明显提速。')
+    doc.add_paragraph('')
+    doc.add_heading('电池技术', 1)
+    paragraph = doc.add_paragraph('动力电池能量密度持续提升')
+    paragraph.add_run('，成本不断下降。').bold = True
+    paragraph = doc.add_paragraph('第一行')
+    run = paragraph.add_run()
+    run.add_break()
+    run.add_text('第二行\t带制表符')
+    run.add_break(WD_BREAK.PAGE)
+    run.add_text('分页之后 & <特殊字符>')
+    if table:
+        cells = doc.add_table(rows=2, cols=2)
+        cells.cell(0, 0).text = '表格中的文字'
+        cells.cell(1, 1).text = 'Table text'
+    doc.add_heading('海外市场', 2)
+    doc.add_paragraph('出口规模快速增长，自主品牌的国际竞争力增强。', style='List Bullet')
+    doc.add_paragraph('The Quick Brown Fox 2024 report.')
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def test_paragraphs_match_python_docx():
+    data = make_document()
+    expected = [(para.text, para.style.name) for para in Document(io.BytesIO(data)).paragraphs]
+    paragraphs, stats = read_docx_paragraphs(data)
+    assert paragraphs == expected
+
+
+def test_parse_document_matches_python_docx():
+    data = make_document()
+    fast = parse_document(data, fast=True, budget=0)
+    slow = parse_document(data, fast=False)
+    assert fast == slow
+    assert fast['title'] == '新能源汽车产业观察'
+    assert '表格中的文字' not in fast['content']
+
+
+def test_stats():
+    _, stats = read_docx_paragraphs(make_document())
+    assert stats['tables'] == 1
+    # 文档标题（Title样式）不计为标题
+    assert stats['headings'] == 2
+    assert stats['images'] == 0
+    assert not stats['truncated']
+    # 表格中的文字计入字数：6个汉字和2个英文单词
+    _, without_table = read_docx_paragraphs(make_document(table=False))
+    assert stats['words'] - without_table['words'] == 8
+    assert without_table['tables'] == 0
+
+
+def test_budget_keeps_headings_and_stops_early():
+    doc = Document()
+    doc.add_heading('标题', 0)
+    for section in range(20):
+        doc.add_heading(f'第{section}节', 1)
+        for _ in range(5):
+            doc.add_paragraph('这是一段用于测试字符预算的正文内容，长度大约为四十个字符左右。')
+    buffer = io.BytesIO()
+    doc.save(buffer)
+
+    paragraphs, stats = read_docx_paragraphs(buffer.getvalue(), budget=800)
+    assert stats['truncated']
+    assert sum(len(text) for text, _ in paragraphs) < 800 + 50
+    full, _ = read_docx_paragraphs(buffer.getvalue())
+    assert paragraphs[:5] == full[:5]
+    # 超过一半预算后只保留小标题和其后的第一段
+    tail = paragraphs[len(paragraphs) // 2:]
+    assert any(style == 'Heading 1' for _, style in tail)
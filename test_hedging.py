@@ -0,0 +1,162 @@
+"""
+对冲请求测试（main.generate_hedged、provider_stats.HedgeBudget）
+"""
+
+import asyncio
+
+import pytest
+
+from circuit_breaker import CircuitBreakerRegistry
+from provider_stats import HedgeBudget, LatencyTracker
+from rate_limiter import RateLimiterRegistry
+
+PROVIDERS = ['doubao', 'deepseek', 'qwen']
+
+
+def result(slug: str, summary: str = '摘要') -> dict:
+    return {'summary': summary, 'keywords': '甲,乙', 'slug': slug}
+
+
+@pytest.fixture
+def hedging(app_main, monkeypatch):
+    """独立的熔断器、准入控制和耗时统计，对冲延迟固定为0.05秒，预算充足"""
+    monkeypatch.setattr(app_main, 'circuit_breakers', CircuitBreakerRegistry())
+    monkeypatch.setattr(app_main, 'rate_limiters', RateLimiterRegistry())
+    monkeypatch.setattr(app_main, 'provider_latency', LatencyTracker())
+    monkeypatch.setattr(app_main, 'hedge_budget', HedgeBudget(1.0))
+    monkeypatch.setattr(app_main, 'get_hedge_delay', lambda api_provider: 0.05)
+    return app_main
+
+
+def stub_providers(app_main, monkeypatch, behaviours: dict):
+    """提供商按 behaviours[提供商] = (耗时, 结果或异常) 返回，记录调用和被取消的提供商"""
+    calls, cancelled = [], []
+
+    async def dispatch(api_provider, title, content, prompt, parse=None, timeout=None):
+        calls.append(api_provider)
+        delay, outcome = behaviours[api_provider]
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(api_provider)
+            raise
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(app_main, 'dispatch_provider', dispatch)
+    return calls, cancelled
+
+
+def run_hedged(app_main, providers=PROVIDERS):
+    return asyncio.run(app_main.generate_hedged(list(providers), '标题', '正文', '提示词'))
+
+
+def test_budget_limits_hedge_ratio():
+    budget = HedgeBudget(0.5, burst=2)
+    budget.deposit()
+    assert budget.try_withdraw()
+    # 令牌不足1个时不能对冲
+    assert not budget.try_withdraw()
+    budget.deposit()
+    budget.deposit()
+    assert budget.try_withdraw() and not budget.try_withdraw()
+    # 令牌最多积累到 burst 个
+    for _ in range(20):
+        budget.deposit()
+    assert budget.tokens == 2
+    assert (budget.requests, budget.hedged) == (23, 2)
+
+
+def test_budget_disabled():
+    budget = HedgeBudget(0)
+    budget.deposit()
+    assert not budget.try_withdraw()
+
+
+def test_fast_hedge_wins_and_loser_is_cancelled(hedging, monkeypatch):
+    calls, cancelled = stub_providers(hedging, monkeypatch, {
+        'doubao': (1.0, result('slow')),
+        'deepseek': (0.01, result('fast')),
+        'qwen': (0.01, result('unused'))
+    })
+    released = []
+    loser = hedging.circuit_breakers.get('doubao')
+    monkeypatch.setattr(loser, 'release', lambda: released.append('doubao'))
+
+    assert run_hedged(hedging) == ('deepseek', result('fast'))
+    assert calls == ['doubao', 'deepseek']
+    assert cancelled == ['doubao'] and released == ['doubao']
+    # 被取消的调用不计入熔断统计
+    assert len(loser.outcomes) == 0
+    assert hedging.hedge_budget.hedged == 1
+
+
+def test_cancelled_half_open_probe_is_returned(hedging, monkeypatch):
+    stub_providers(hedging, monkeypatch, {
+        'doubao': (1.0, result('slow')),
+        'deepseek': (0.01, result('fast')),
+        'qwen': (0.01, result('unused'))
+    })
+    loser = hedging.circuit_breakers.get('doubao')
+    for _ in range(3):
+        loser.record_failure(timeout=True)
+    loser.opened_at -= 3600
+
+    assert run_hedged(hedging)[0] == 'deepseek'
+    # 半开状态的探测名额已归还，下一个请求可以继续探测
+    assert loser.half_open_in_flight == 0
+    assert loser.allow_request()
+
+
+def test_first_non_empty_result_wins(hedging, monkeypatch):
+    calls, cancelled = stub_providers(hedging, monkeypatch, {
+        'doubao': (0.2, result('slow')),
+        'deepseek': (0.01, result('empty', summary='')),
+        'qwen': (1.0, result('slowest'))
+    })
+    assert run_hedged(hedging) == ('doubao', result('slow'))
+    # 空结果不被采用，对冲延迟后继续启动下一个提供商；最终采用第一个有效结果
+    assert calls == PROVIDERS
+    assert cancelled == ['qwen']
+
+
+def test_no_hedge_when_budget_is_exhausted(hedging, monkeypatch):
+    monkeypatch.setattr(hedging, 'hedge_budget', HedgeBudget(0))
+    calls, _ = stub_providers(hedging, monkeypatch, {
+        'doubao': (0.2, result('slow')),
+        'deepseek': (0.01, result('fast')),
+        'qwen': (0.01, result('unused'))
+    })
+    assert run_hedged(hedging) == ('doubao', result('slow'))
+    assert calls == ['doubao']
+    assert hedging.hedge_budget.hedged == 0
+
+
+def test_failures_fall_back_in_order(hedging, monkeypatch):
+    calls, cancelled = stub_providers(hedging, monkeypatch, {
+        'doubao': (0.01, RuntimeError('HTTP 500')),
+        'deepseek': (0.01, RuntimeError('HTTP 500')),
+        'qwen': (0.01, result('last'))
+    })
+    assert run_hedged(hedging) == ('qwen', result('last'))
+    # 失败时不等待对冲延迟，按顺序立即尝试下一个，不消耗对冲预算
+    assert calls == PROVIDERS and cancelled == []
+    assert hedging.hedge_budget.hedged == 0
+    assert hedging.circuit_breakers.get('doubao').outcomes.count(False) == 1
+
+
+def test_mock_result_when_every_provider_fails(hedging, monkeypatch):
+    monkeypatch.setattr(hedging, 'AI_HEDGE_ENABLED', True)
+    calls, _ = stub_providers(hedging, monkeypatch, {
+        'doubao': (0.1, RuntimeError('HTTP 500')),
+        'deepseek': (0.01, RuntimeError('HTTP 500')),
+        'qwen': (0.01, None)
+    })
+    assert run_hedged(hedging) == (None, None)
+    assert calls == PROVIDERS
+
+    calls.clear()
+    seo_data = asyncio.run(hedging.generate_uncached('标题', '正文内容', '提示词', list(PROVIDERS)))
+    assert calls == PROVIDERS
+    assert seo_data['source'] == 'mock' and seo_data['provider'] is None
@@ -0,0 +1,193 @@
+"""
+SEO任务队列测试（job_queue）
+"""
+
+import asyncio
+import sqlite3
+import time
+
+import job_queue
+from job_queue import (
+    JobQueue, STATUS_FAILED, STATUS_QUEUED, STATUS_RUNNING, STATUS_SUCCEEDED
+)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def set_running(db_path, job_id, heartbeat_at, attempts=1, worker_id='other-worker'):
+    """模拟其他进程正在（或曾经）执行的任务"""
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            'UPDATE seo_jobs SET status = ?, started_at = ?, heartbeat_at = ?, attempts = ?, worker_id = ? WHERE id = ?',
+            (STATUS_RUNNING, heartbeat_at, heartbeat_at, attempts, worker_id, job_id)
+        )
+
+
+def test_claim_in_submit_order(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'))
+    first = run(queue.submit([('a.docx', b'1'), ('b.docx', b'2')], 'deepseek'))
+    second = run(queue.submit([('c.docx', b'3')], None))
+
+    claimed = [run(queue.claim(5)) for _ in range(4)]
+    assert [[job['filename'] for job in jobs] for jobs in claimed] == [['a.docx'], ['b.docx'], ['c.docx'], []]
+    assert claimed[0][0]['data'] == b'1' and claimed[0][0]['attempts'] == 1
+    assert run(queue.get(first['jobs'][0]['id']))['status'] == STATUS_RUNNING
+    assert run(queue.get_batch(second['batch_id']))[0]['status'] == STATUS_RUNNING
+
+
+def test_claim_groups_packed_jobs_of_one_batch(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'))
+    packed = run(queue.submit([(f'{i}.docx', b'x') for i in range(5)], None, pack=True))
+    run(queue.submit([('other.docx', b'x')], None, pack=True))
+
+    jobs = run(queue.claim(3))
+    assert len(jobs) == 3
+    assert {job['batch_id'] for job in jobs} == {packed['batch_id']}
+    assert jobs[0]['filename'] == '0.docx'
+    # 同批次剩余的两个任务一起领取，不混入其他批次
+    rest = run(queue.claim(3))
+    assert sorted(job['filename'] for job in rest) == ['3.docx', '4.docx']
+    assert [job['filename'] for job in run(queue.claim(3))] == ['other.docx']
+
+
+def test_unpacked_jobs_are_claimed_one_by_one(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'))
+    run(queue.submit([('a.docx', b'x'), ('b.docx', b'x')], None, pack=False))
+    assert len(run(queue.claim(5))) == 1
+
+
+def test_complete_and_fail(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'))
+    submitted = run(queue.submit([('a.docx', b'x'), ('b.docx', b'x')], None))
+    first, second = (job['id'] for job in submitted['jobs'])
+    run(queue.claim())
+    run(queue.claim())
+    run(queue.complete(first, {'summary': '摘要'}))
+    run(queue.fail(second, '读取失败'))
+
+    assert run(queue.get(first))['result'] == {'summary': '摘要'}
+    assert run(queue.get(second))['error'] == '读取失败'
+    assert run(queue.stats()) == {STATUS_QUEUED: 0, STATUS_RUNNING: 0, STATUS_SUCCEEDED: 1, STATUS_FAILED: 1}
+
+
+def test_requeue_only_stale_jobs(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, 'JOB_LEASE_SECONDS', 60)
+    db_path = str(tmp_path / 'jobs.sqlite3')
+    queue = JobQueue(db_path)
+    live, stale, exhausted = (job['id'] for job in run(queue.submit([('a', b''), ('b', b''), ('c', b'')], None))['jobs'])
+    now = time.time()
+    set_running(db_path, live, now - 10)
+    set_running(db_path, stale, now - 120)
+    set_running(db_path, exhausted, now - 120, attempts=job_queue.JOB_MAX_ATTEMPTS)
+
+    assert run(queue.requeue_stale()) == (1, 1)
+    assert run(queue.get(live))['status'] == STATUS_RUNNING
+    assert run(queue.get(stale))['status'] == STATUS_QUEUED
+    assert run(queue.get(exhausted))['status'] == STATUS_FAILED
+
+
+def test_heartbeat_keeps_own_jobs_alive(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, 'JOB_LEASE_SECONDS', 60)
+    db_path = str(tmp_path / 'jobs.sqlite3')
+    queue = JobQueue(db_path)
+    job_id = run(queue.submit([('a', b'')], None))['jobs'][0]['id']
+    run(queue.claim())
+    set_running(db_path, job_id, time.time() - 120, worker_id=queue.worker_id)
+
+    run(queue.heartbeat())
+    assert run(queue.requeue_stale()) == (0, 0)
+    assert run(queue.get(job_id))['status'] == STATUS_RUNNING
+
+
+def test_recover_after_restart(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, 'JOB_LEASE_SECONDS', 60)
+    db_path = str(tmp_path / 'jobs.sqlite3')
+    old = JobQueue(db_path)
+    interrupted, finished = (job['id'] for job in run(old.submit([('a', b''), ('b', b'')], None))['jobs'])
+    run(old.claim())
+    run(old.claim())
+    run(old.complete(finished, {'summary': '摘要'}))
+    # 进程崩溃：心跳不再更新，已结束的任务超过保留时间
+    set_running(db_path, interrupted, time.time() - 120, worker_id=old.worker_id)
+    with sqlite3.connect(db_path) as conn:
+        conn.execute('UPDATE seo_jobs SET finished_at = 1 WHERE id = ?', (finished,))
+
+    restarted = JobQueue(db_path)
+    run(restarted.recover())
+    assert run(restarted.get(interrupted))['status'] == STATUS_QUEUED
+    assert run(restarted.get(finished)) is None
+    assert run(restarted.claim())[0]['id'] == interrupted
+
+
+def test_release_on_stop(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'))
+    job_id = run(queue.submit([('a', b'')], None))['jobs'][0]['id']
+    run(queue.claim())
+    run(queue.release())
+    job = run(queue.get(job_id))
+    assert job['status'] == STATUS_QUEUED and job['attempts'] == 0
+
+
+def test_wait_for_times_out(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'))
+    checks = []
+
+    async def never():
+        checks.append(time.monotonic())
+        return False
+
+    start = time.monotonic()
+    assert run(queue.wait_for(never, 0.2)) is False
+    assert 0.2 <= time.monotonic() - start < 1.0
+    assert len(checks) >= 2
+
+
+def test_wait_for_wakes_on_change(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'))
+
+    async def scenario():
+        submitted = await queue.submit([('a', b'')], None)
+        job_id = submitted['jobs'][0]['id']
+
+        async def finished():
+            return (await queue.get(job_id))['status'] == STATUS_SUCCEEDED
+
+        async def worker():
+            await asyncio.sleep(0.05)
+            await queue.claim()
+            await queue.complete(job_id, {'summary': '摘要'})
+
+        start = time.monotonic()
+        task = asyncio.create_task(worker())
+        result = await queue.wait_for(finished, 5)
+        await task
+        return result, time.monotonic() - start
+
+    result, elapsed = run(scenario())
+    assert result is True
+    assert elapsed < 0.5
+
+
+def test_workers_process_jobs(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'))
+
+    async def handler(jobs):
+        return [{'summary': job['filename']} if job['filename'] != 'bad' else ValueError('无法解析') for job in jobs]
+
+    async def scenario():
+        submitted = await queue.submit([('good', b''), ('bad', b'')], None)
+        await queue.start(handler, workers=2)
+        ids = [job['id'] for job in submitted['jobs']]
+
+        async def all_finished():
+            return all(job['status'] in (STATUS_SUCCEEDED, STATUS_FAILED) for job in await queue.get_batch(submitted['batch_id']))
+
+        await queue.wait_for(all_finished, 5)
+        await queue.stop()
+        return [await queue.get(job_id) for job_id in ids]
+
+    good, bad = run(scenario())
+    assert good['status'] == STATUS_SUCCEEDED and good['result'] == {'summary': 'good'}
+    assert bad['status'] == STATUS_FAILED and bad['error'] == '无法解析'
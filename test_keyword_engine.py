@@ -0,0 +1,65 @@
+"""
+本地关键词提取测试（keyword_engine）
+"""
+
+import csv
+
+from keyword_engine import KeywordEngine, cjk_runs, overlaps
+
+HEADER = ['时间', '标题', '摘要', '关键词', 'slug', '文章附加', 'AI模型', '结果来源']
+
+TITLE = '新能源汽车产业加速发展'
+CONTENT = (
+    '新能源汽车产业持续发展，新能源汽车产业链不断完善。能源汽车产业政策支持新能源汽车销量增长。'
+    '新能源汽车产业规模扩大，电池技术进步。电池技术带动新能源汽车。5G网络覆盖推动车联网应用，5G网络建设加快。'
+)
+
+
+def make_engine(tmp_path, rows=()) -> KeywordEngine:
+    history = tmp_path / 'history.csv'
+    with open(history, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+    engine = KeywordEngine(str(history), str(tmp_path / 'keyword_index.json.gz'))
+    engine.load()
+    return engine
+
+
+def test_cjk_runs_split_on_function_words():
+    assert cjk_runs('人工智能的发展与AI应用') == ['人工智能', '发展', '应用']
+
+
+def test_overlaps():
+    assert overlaps('新能源汽车', '能源汽车产业')
+    assert overlaps('能源汽车产业', '新能源汽车')
+    assert overlaps('数据安全', '安全')
+    assert not overlaps('人工智能', '智慧城市')
+    # 英文词只判断互相包含
+    assert not overlaps('data', 'tablet')
+
+
+def test_extracted_keywords_do_not_overlap(tmp_path):
+    keywords = make_engine(tmp_path).extract(TITLE, CONTENT, 6)
+    assert keywords[0] == '新能源汽车'
+    assert '电池技术' in keywords
+    for i, a in enumerate(keywords):
+        for b in keywords[i + 1:]:
+            assert not overlaps(a, b), (a, b)
+
+
+def test_lexicon_terms_from_history(tmp_path):
+    engine = make_engine(tmp_path, [
+        ['2025-01-01', '车联网发展', '摘要', '5G网络,车联网', 'slug', 'a.docx', 'DeepSeek', 'AI生成'],
+    ])
+    keywords = engine.extract(TITLE, CONTENT, 6)
+    assert '5G网络' in keywords
+
+
+def test_index_round_trip(tmp_path):
+    rows = [['2025-01-01', '车联网发展', '车联网应用加快落地', '5G网络,车联网', 'slug', 'a.docx', 'DeepSeek', 'AI生成']]
+    engine = make_engine(tmp_path, rows)
+    engine.save()
+    reloaded = make_engine(tmp_path, rows)
+    assert reloaded.docs == engine.docs == 1
+    assert reloaded.lexicon == {'5G网络', '车联网'}
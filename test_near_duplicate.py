@@ -0,0 +1,70 @@
+"""
+相似文章检测测试（near_duplicate）
+"""
+
+import asyncio
+import random
+
+from near_duplicate import NearDuplicateIndex, minhash_signature, similarity
+
+
+def make_text(seed: int, chars: int = 600) -> str:
+    """随机汉字组成的文章，每30字一个句号"""
+    rng = random.Random(seed)
+    text = ''.join(chr(rng.randint(0x4E00, 0x62FF)) for _ in range(chars))
+    return '。'.join(text[i:i + 30] for i in range(0, chars, 30))
+
+
+def test_short_text_has_no_signature():
+    assert minhash_signature('太短的文章') is None
+
+
+def test_identical_text_ignores_whitespace_and_punctuation():
+    text = make_text(1)
+    assert similarity(minhash_signature(text), minhash_signature(text.replace('。', '， '))) == 1.0
+
+
+def test_similarity_of_edited_and_unrelated_text():
+    text = make_text(1)
+    edited = text[:len(text) // 2] + '今年市场规模继续扩大。' + text[len(text) // 2:]
+    original = minhash_signature(text)
+    assert similarity(original, minhash_signature(edited)) >= 0.85
+    assert similarity(original, minhash_signature(make_text(2))) < 0.5
+
+
+def test_index_lookup_and_persistence(tmp_path):
+    db_path = str(tmp_path / 'near.sqlite3')
+    result = {'summary': '摘要', 'keywords': '甲,乙', 'slug': 'first', 'provider': 'deepseek'}
+    index = NearDuplicateIndex(db_path, threshold=0.85)
+    text = make_text(1)
+    asyncio.run(index.add(minhash_signature(text), '第一篇', result))
+    # 与已有文章完全相同时不重复登记
+    asyncio.run(index.add(minhash_signature(text), '第一篇（转载）', result))
+    assert index.snapshot()['articles'] == 1
+
+    reloaded = NearDuplicateIndex(db_path, threshold=0.85)
+    reloaded.load()
+    match = reloaded.lookup(minhash_signature(text + '今年市场规模继续扩大。'))
+    assert match['slug'] == 'first' and match['title'] == '第一篇'
+    assert match['similarity'] >= 0.85
+    assert reloaded.lookup(minhash_signature(make_text(2))) is None
+
+
+def test_clear(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / 'near.sqlite3'))
+    asyncio.run(index.add(minhash_signature(make_text(1)), '第一篇', {'summary': '摘要'}))
+    index.clear()
+    assert index.lookup(minhash_signature(make_text(1))) is None
+
+
+def test_lookup_by_provider(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / 'near.sqlite3'), threshold=0.85)
+    signature = minhash_signature(make_text(1))
+    asyncio.run(index.add(signature, '第一篇', {'summary': '摘要', 'slug': 'first', 'provider': 'deepseek'}))
+    assert index.lookup(signature, 'qwen') is None
+    assert index.lookup(signature, 'deepseek')['slug'] == 'first'
+    assert index.lookup(signature)['slug'] == 'first'
+    # 其他提供商生成的相同文章单独登记
+    asyncio.run(index.add(signature, '第一篇', {'summary': '摘要', 'slug': 'second', 'provider': 'qwen'}))
+    assert index.snapshot()['articles'] == 2
+    assert index.lookup(signature, 'qwen')['slug'] == 'second'
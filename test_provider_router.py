@@ -0,0 +1,79 @@
+"""
+智能路由评分测试（provider_router、/api/seo/rate）
+"""
+
+import asyncio
+import csv
+
+import pytest
+
+from circuit_breaker import CircuitBreakerRegistry
+from provider_router import ProviderRouter
+from provider_stats import LatencyTracker
+
+
+def make_router() -> ProviderRouter:
+    return ProviderRouter(LatencyTracker(), CircuitBreakerRegistry())
+
+
+def test_load_ratings_skips_results_not_generated_by_the_provider(tmp_path):
+    path = tmp_path / 'ratings.csv'
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['时间', '模型', '标题', '摘要', '关键词', 'Slug', '评分', '结果来源'])
+        writer.writerow(['2025-01-01', 'deepseek', '标题', '', '', '', '5', 'AI生成'])
+        writer.writerow(['2025-01-01', 'DeepSeek', '标题', '', '', '', '3', '缓存命中'])
+        writer.writerow(['2025-01-01', 'deepseek', '标题', '', '', '', '1', '相似文章复用'])
+        writer.writerow(['2025-01-01', 'qwen', '标题', '', '', '', '1', '模拟数据'])
+        # 旧版记录没有结果来源
+        writer.writerow(['2025-01-01', 'qwen', '标题', '', '', '', '2'])
+    router = make_router()
+    router.load_ratings(str(path), {'DeepSeek': 'deepseek'}, {'AI生成', '缓存命中'})
+    assert router.ratings == {'deepseek': [8.0, 2], 'qwen': [2.0, 1]}
+
+
+@pytest.fixture
+def rating(app_main, monkeypatch, tmp_path):
+    router = make_router()
+    monkeypatch.setattr(app_main, 'provider_router', router)
+    monkeypatch.setattr(app_main, 'RATINGS_CSV', str(tmp_path / 'ratings.csv'))
+
+    def rate(**data):
+        data = {'title': '标题', 'summary': '摘要', 'keywords': '甲', 'slug': 'slug', 'rating': 4, **data}
+        return asyncio.run(app_main.rate_seo_result(data))
+
+    return rate, router, tmp_path / 'ratings.csv'
+
+
+def test_rating_is_credited_to_the_generating_provider(rating):
+    rate, router, _ = rating
+    rate(provider='deepseek', source='ai')
+    rate(provider='deepseek', source='cache', rating=2)
+    assert router.ratings == {'deepseek': [6.0, 2]}
+
+
+def test_rating_of_mock_or_reused_result_is_not_credited(rating):
+    rate, router, path = rating
+    rate(provider='', source='mock')
+    rate(provider='deepseek', source='reused')
+    rate(provider='', source='local')
+    # 旧版前端没有传结果来源
+    rate(provider='deepseek')
+    assert router.ratings == {}
+    # 评分仍写入评分记录
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [row['结果来源'] for row in rows] == ['模拟数据', '相似文章复用', '本地生成', '']
+    assert rows[1]['模型'] == 'deepseek'
+
+
+def test_old_ratings_header_is_upgraded(app_main, tmp_path):
+    path = tmp_path / 'ratings.csv'
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(app_main.RATINGS_HEADER[:-1])
+        writer.writerow(['2025-01-01', 'qwen', '标题', '', '', '', '2'])
+    app_main.upgrade_csv_header(str(path), app_main.RATINGS_HEADER)
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows == [app_main.RATINGS_HEADER, ['2025-01-01', 'qwen', '标题', '', '', '', '2']]
@@ -0,0 +1,39 @@
+"""
+AI提供商运行统计测试（provider_stats）
+"""
+
+from provider_stats import LatencyTracker
+
+DEEPSEEK = ('deepseek', 'deepseek-chat')
+
+
+def test_samples_are_kept_per_provider_and_model():
+    tracker = LatencyTracker()
+    tracker.record(DEEPSEEK, 1.0)
+    tracker.record(('deepseek', 'deepseek-reasoner'), 9.0)
+    assert tracker.count(DEEPSEEK) == 1
+    assert tracker.percentile(DEEPSEEK, 0.99) == 1.0
+    assert tracker.percentile(('qwen', 'qwen-turbo'), 0.5) is None
+    assert sorted(tracker.keys()) == [DEEPSEEK, ('deepseek', 'deepseek-reasoner')]
+
+
+def test_window_keeps_recent_samples():
+    tracker = LatencyTracker(window=3)
+    for seconds in (10.0, 1.0, 2.0, 3.0):
+        tracker.record(DEEPSEEK, seconds)
+    assert tracker.count(DEEPSEEK) == 3
+    assert tracker.percentile(DEEPSEEK, 0.99) == 3.0
+
+
+def test_timeouts_count_as_censored_samples_at_the_timeout():
+    tracker = LatencyTracker()
+    for _ in range(8):
+        tracker.record(DEEPSEEK, 1.0)
+    tracker.record(DEEPSEEK, 20.0, censored=True)
+    tracker.record(DEEPSEEK, 20.0, censored=True)
+    # 只统计成功调用时p90为1秒，计入超时后尾部反映真实情况
+    assert tracker.percentile(DEEPSEEK, 0.5) == 1.0
+    assert tracker.percentile(DEEPSEEK, 0.9) == 20.0
+    snapshot = tracker.snapshot(DEEPSEEK)
+    assert snapshot['samples'] == 10 and snapshot['censored'] == 2
+    assert {bucket['le']: bucket['count'] for bucket in snapshot['histogram']}[20] == 2
@@ -0,0 +1,163 @@
+"""
+AI提供商准入控制测试（rate_limiter）
+"""
+
+import asyncio
+import time
+from email.utils import formatdate
+from types import SimpleNamespace
+
+import pytest
+
+import rate_limiter
+from rate_limiter import ProviderLimiter, TokenBucket, parse_retry_after
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, 'time', SimpleNamespace(monotonic=clock, time=time.time))
+    return clock
+
+
+def test_token_bucket_refills_over_time(clock):
+    bucket = TokenBucket(60)
+    assert bucket.wait_time(1) == 0
+    bucket.take(60)
+    assert bucket.wait_time(1) == pytest.approx(1.0)
+    clock.now += 0.5
+    assert bucket.wait_time(1) == pytest.approx(0.5)
+    clock.now += 0.5
+    assert bucket.wait_time(1) == 0
+    # 补充不超过容量
+    clock.now += 3600
+    assert bucket.wait_time(60) == 0
+    assert bucket.tokens == 60
+
+
+def test_token_bucket_clamps_large_amounts(clock):
+    bucket = TokenBucket(100)
+    bucket.take(30)
+    # 超过容量的请求按容量计算，不会永远等待
+    assert bucket.wait_time(1000) == pytest.approx(30 * 60 / 100)
+
+
+def test_token_bucket_without_limit():
+    bucket = TokenBucket(0)
+    bucket.take(10 ** 6)
+    assert bucket.wait_time(10 ** 6) == 0
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('5') == 5.0
+    assert parse_retry_after(' 1.5 ') == 1.5
+    assert parse_retry_after('-3') == 0.0
+    assert 55 <= parse_retry_after(formatdate(time.time() + 60, usegmt=True)) <= 60
+    assert parse_retry_after(formatdate(time.time() - 60, usegmt=True)) == 0.0
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('') is None
+
+
+def test_backoff_is_exponential_and_capped(clock, monkeypatch):
+    monkeypatch.setattr(rate_limiter, 'RATE_LIMIT_BACKOFF_BASE', 1.0)
+    monkeypatch.setattr(rate_limiter, 'RATE_LIMIT_BACKOFF_MAX', 30.0)
+    limiter = ProviderLimiter('test')
+    assert [limiter.backoff(None, attempt) for attempt in range(3)] == [1.0, 2.0, 4.0]
+    assert limiter.backoff(None, 10) == 30.0
+    # 优先使用 Retry-After，同样受上限约束
+    assert limiter.backoff(7.0, 0) == 7.0
+    assert limiter.backoff(120.0, 0) == 30.0
+    assert limiter.blocked_until == clock.now + 30.0
+    assert limiter.snapshot()['rate_limited'] == 6
+
+
+def test_no_limits_by_default(monkeypatch):
+    for key in ('CONCURRENCY', 'RPM', 'TPM'):
+        monkeypatch.delenv(f'RATE_LIMIT_TEST_{key}', raising=False)
+    limiter = ProviderLimiter('test')
+    assert (limiter.max_concurrency, limiter.requests.capacity, limiter.tokens.capacity) == (0, 0, 0)
+
+    async def scenario():
+        entered = asyncio.Event()
+        release = asyncio.Event()
+
+        async def call():
+            async with limiter.admit(10000):
+                if limiter.in_flight == 50:
+                    entered.set()
+                await release.wait()
+
+        tasks = [asyncio.create_task(call()) for _ in range(50)]
+        await asyncio.wait_for(entered.wait(), timeout=1)
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    assert limiter.in_flight == 0
+
+
+def test_provider_env_enables_limits(monkeypatch):
+    monkeypatch.setenv('RATE_LIMIT_TEST_CONCURRENCY', '2')
+    monkeypatch.setenv('RATE_LIMIT_TEST_RPM', '120')
+    snapshot = ProviderLimiter('test').snapshot()
+    assert snapshot['max_concurrency'] == 2 and snapshot['rpm'] == 120
+
+
+def test_waiters_are_admitted_in_arrival_order(monkeypatch):
+    monkeypatch.setenv('RATE_LIMIT_TEST_CONCURRENCY', '1')
+    limiter = ProviderLimiter('test')
+    admitted = []
+
+    async def call(index: int):
+        async with limiter.admit():
+            admitted.append(index)
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        tasks = []
+        for index in range(6):
+            tasks.append(asyncio.create_task(call(index)))
+            # 让每个调用在下一个到达之前开始排队
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    assert admitted == list(range(6))
+    assert limiter.in_flight == 0 and limiter.waiting == 0
+
+
+def test_admission_waits_for_rpm_tokens(monkeypatch):
+    monkeypatch.setenv('RATE_LIMIT_TEST_RPM', '600')  # 每0.1秒补充一个
+    limiter = ProviderLimiter('test')
+    limiter.requests.take(600)
+
+    async def scenario():
+        start = time.monotonic()
+        async with limiter.admit():
+            pass
+        return time.monotonic() - start
+
+    assert 0.05 <= asyncio.run(scenario()) < 0.5
+
+
+def test_admission_timeout(monkeypatch):
+    monkeypatch.setattr(rate_limiter, 'RATE_LIMIT_MAX_WAIT', 0.1)
+    limiter = ProviderLimiter('test')
+    limiter.backoff(10.0, 0)
+
+    async def scenario():
+        async with limiter.admit():
+            pass
+
+    with pytest.raises(rate_limiter.AdmissionTimeout):
+        asyncio.run(scenario())
+    assert limiter.waiting == 0 and limiter.in_flight == 0
@@ -0,0 +1,64 @@
+"""
+AI结果缓存测试（seo_cache）
+"""
+
+import asyncio
+import time
+
+from seo_cache import LLMResultCache, make_cache_key
+
+RESULT = {'summary': '摘要', 'keywords': '甲,乙', 'slug': 'first'}
+
+
+def test_cache_key_depends_on_every_part():
+    key = make_cache_key('deepseek', '提示词', 'deepseek-chat', 0.7)
+    assert key == make_cache_key('deepseek', '提示词', 'deepseek-chat', 0.7)
+    assert key != make_cache_key('qwen', '提示词', 'deepseek-chat', 0.7)
+    assert key != make_cache_key('deepseek', '提示词2', 'deepseek-chat', 0.7)
+    assert key != make_cache_key('deepseek', '提示词', 'deepseek-reasoner', 0.7)
+    assert key != make_cache_key('deepseek', '提示词', 'deepseek-chat', 0.3)
+
+
+def test_memory_and_disk_tiers(tmp_path):
+    db_path = str(tmp_path / 'cache.sqlite3')
+    cache = LLMResultCache(db_path)
+    asyncio.run(cache.aset('key', 'deepseek', 'deepseek-chat', RESULT))
+    assert cache.get_memory('key') == RESULT
+
+    # 新实例（如重启后）内存为空，从磁盘读取后放入内存
+    reloaded = LLMResultCache(db_path)
+    assert reloaded.get_memory('key') is None
+    assert asyncio.run(reloaded.aget('key')) == RESULT
+    assert reloaded.get_memory('key') == RESULT
+    assert asyncio.run(reloaded.aget('missing')) is None
+
+
+def test_returned_value_is_a_copy(tmp_path):
+    cache = LLMResultCache(str(tmp_path / 'cache.sqlite3'))
+    cache.set('key', 'deepseek', 'deepseek-chat', RESULT)
+    cache.get('key')['summary'] = '修改'
+    assert cache.get('key') == RESULT
+
+
+def test_expired_entries_are_not_returned(tmp_path):
+    cache = LLMResultCache(str(tmp_path / 'cache.sqlite3'), ttl=-1)
+    cache.set('key', 'deepseek', 'deepseek-chat', RESULT)
+    assert cache.get('key') is None
+
+
+def test_memory_lru_and_disk_prune(tmp_path):
+    cache = LLMResultCache(str(tmp_path / 'cache.sqlite3'), memory_size=2, disk_size=3)
+    for index in range(5):
+        cache.set(f'key{index}', 'deepseek', 'deepseek-chat', {**RESULT, 'slug': f'slug{index}'})
+        time.sleep(0.001)
+    assert cache.get_memory('key0') is None and cache.get_memory('key4') is not None
+    cache.prune()
+    assert cache.get('key0') is None
+    assert cache.get('key2')['slug'] == 'slug2'
+
+
+def test_clear(tmp_path):
+    cache = LLMResultCache(str(tmp_path / 'cache.sqlite3'))
+    cache.set('key', 'deepseek', 'deepseek-chat', RESULT)
+    cache.clear()
+    assert cache.get('key') is None
@@ -0,0 +1,121 @@
+"""
+多篇文章合并生成测试（seo_packing、/api/seo/batch 的合并模式）
+"""
+
+import io
+import json
+import asyncio
+
+import pytest
+from fastapi import UploadFile
+
+from circuit_breaker import CircuitBreakerRegistry
+from rate_limiter import RateLimiterRegistry
+from seo_packing import parse_packed_response
+
+
+def packed(*items) -> str:
+    return json.dumps(list(items), ensure_ascii=False)
+
+
+def item(number, summary='摘要', slug='slug') -> dict:
+    return {'id': number, 'summary': summary, 'keywords': '甲,乙', 'slug': slug}
+
+
+def test_parse_packed_response():
+    results = parse_packed_response(packed(item(1, '第一篇'), item(2, '第二篇')), 2)
+    assert sorted(results) == [1, 2]
+    assert results[1]['summary'] == '第一篇' and results[2]['keywords'] == '甲,乙'
+
+
+def test_out_of_range_ids_are_dropped():
+    results = parse_packed_response(packed(item(0), item(4), item(-1), item(3, '第三篇')), 3)
+    assert list(results) == [3]
+
+
+def test_duplicate_ids_keep_the_first():
+    results = parse_packed_response(packed(item(1, '第一次'), item(1, '第二次'), item('2', '编号为字符串')), 2)
+    assert results[1]['summary'] == '第一次'
+    assert results[2]['summary'] == '编号为字符串'
+
+
+def test_missing_and_invalid_entries_are_left_out():
+    text = packed(item(1), {'id': 2, 'summary': ''}, {'id': 'x', 'summary': '摘要'}, {'summary': '没有编号'}, 'text')
+    assert list(parse_packed_response(text, 4)) == [1]
+
+
+def test_malformed_array_keeps_the_valid_objects():
+    text = '```json\n[{"id": 1, "summary": "第一篇", "keywords": "甲", "slug": "a"},\n{"id": 2, "summary": },\n' \
+           '{"id": 3, "summary": "第三篇", "keywords": "乙", "slug": "c"}]\n```'
+    results = parse_packed_response(text, 3)
+    assert sorted(results) == [1, 3]
+    assert results[3]['slug'] == 'c'
+
+
+@pytest.fixture
+def batch(app_main, monkeypatch):
+    """独立的熔断器和准入控制；上传的“文档”内容为标题，跳过Word解析"""
+    monkeypatch.setattr(app_main, 'circuit_breakers', CircuitBreakerRegistry())
+    monkeypatch.setattr(app_main, 'rate_limiters', RateLimiterRegistry())
+    monkeypatch.setattr(app_main, 'AI_HEDGE_ENABLED', False)
+
+    async def read_uploaded_docx(filename, data):
+        title = data.decode('utf-8')
+        return {'title': title, 'content': f'{title}的正文内容。', 'stats': {}}
+
+    monkeypatch.setattr(app_main, 'read_uploaded_docx', read_uploaded_docx)
+    return app_main
+
+
+def run_batch(app_main, titles, **params) -> list:
+    files = [UploadFile(io.BytesIO(title.encode('utf-8')), filename=f'{i}.docx') for i, title in enumerate(titles)]
+
+    async def scenario():
+        response = await app_main.process_seo_batch(files, **params)
+        return [line async for line in response.body_iterator if line.strip()]
+
+    return [json.loads(line) for line in asyncio.run(scenario())]
+
+
+def test_batch_pack_retries_missing_docs_one_at_a_time(batch, monkeypatch):
+    titles = ['合并测试甲', '合并测试乙', '合并测试丙']
+    calls = []
+
+    async def dispatch(api_provider, title, content, prompt, parse=None, timeout=None):
+        if parse is not None:
+            calls.append('packed')
+            # 第2篇缺失，另有超出范围和重复的编号
+            return parse(packed(item(1, '合并摘要1', 'pack-1'), item(7), item(3, '合并摘要3', 'pack-3'),
+                                item(3, '重复', 'dup')))
+        calls.append(title)
+        return {'summary': f'单独摘要-{title}', 'keywords': '甲,乙', 'slug': 'single'}
+
+    monkeypatch.setattr(batch, 'dispatch_provider', dispatch)
+    lines = run_batch(batch, titles, provider='deepseek', cache='bypass', pack=True, reuse=False)
+
+    assert lines[-1] == {'done': True, 'total': 3, 'succeeded': 3}
+    records = {line['index']: line for line in lines[:-1]}
+    assert all(record['ok'] and record['source'] == 'ai' for record in records.values())
+    assert records[0]['summary'] == '合并摘要1' and records[2]['summary'] == '合并摘要3'
+    assert records[1]['summary'] == '单独摘要-合并测试乙'
+    # 一次合并调用，缺失的文章单独重试一次
+    assert calls == ['packed', '合并测试乙']
+
+
+def test_batch_pack_falls_back_when_packed_call_fails(batch, monkeypatch):
+    titles = ['合并失败甲', '合并失败乙']
+    calls = []
+
+    async def dispatch(api_provider, title, content, prompt, parse=None, timeout=None):
+        if parse is not None:
+            calls.append('packed')
+            raise RuntimeError('HTTP 500')
+        calls.append(title)
+        return {'summary': f'单独摘要-{title}', 'keywords': '甲,乙', 'slug': 'single'}
+
+    monkeypatch.setattr(batch, 'dispatch_provider', dispatch)
+    lines = run_batch(batch, titles, provider='deepseek', cache='bypass', pack=True, reuse=False)
+
+    assert lines[-1]['succeeded'] == 2
+    assert calls[0] == 'packed' and sorted(calls[1:]) == sorted(titles)
+    assert {line['summary'] for line in lines[:-1]} == {f'单独摘要-{title}' for title in titles}
@@ -0,0 +1,109 @@
+"""
+相同请求合并测试（single_flight）
+"""
+
+import asyncio
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {'summary': '摘要'}
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do('key', work) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert flight.snapshot() == {'in_flight': 0, 'executed': 1, 'coalesced': 4}
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+
+    async def scenario():
+        return await asyncio.gather(flight.do('a', lambda: asyncio.sleep(0, 'a')),
+                                    flight.do('b', lambda: asyncio.sleep(0, 'b')))
+
+    assert asyncio.run(scenario()) == ['a', 'b']
+    assert flight.snapshot()['executed'] == 2
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_call():
+    flight = SingleFlight()
+    finished = []
+
+    async def work():
+        await asyncio.sleep(0.05)
+        finished.append(1)
+        return 'result'
+
+    async def scenario():
+        first = asyncio.create_task(flight.do('key', work))
+        second = asyncio.create_task(flight.do('key', work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        result = await second
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return result
+
+    assert asyncio.run(scenario()) == 'result'
+    assert finished == [1]
+
+
+def test_key_is_removed_after_success_and_exception():
+    flight = SingleFlight()
+    calls = []
+
+    async def fail():
+        calls.append('fail')
+        raise RuntimeError('调用失败')
+
+    async def succeed():
+        calls.append('succeed')
+        return 'ok'
+
+    async def scenario():
+        results = await asyncio.gather(flight.do('key', fail), flight.do('key', fail), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert flight.snapshot()['in_flight'] == 0
+        # 失败后相同的键重新执行
+        assert await flight.do('key', succeed) == 'ok'
+        assert flight.snapshot()['in_flight'] == 0
+        assert await flight.do('key', succeed) == 'ok'
+
+    asyncio.run(scenario())
+    assert calls == ['fail', 'succeed', 'succeed']
+
+
+def test_auto_requests_coalesce_regardless_of_provider_order(app_main, monkeypatch):
+    """auto 模式下每次的提供商排序不同，相同的请求仍然合并为一次调用"""
+    orders = iter([['deepseek', 'qwen', 'doubao'], ['qwen', 'doubao', 'deepseek']])
+    monkeypatch.setattr(app_main.provider_router, 'rank', lambda providers: next(orders))
+    calls = []
+
+    async def generate_uncached(title, content, prompt, providers):
+        calls.append(providers)
+        await asyncio.sleep(0.05)
+        return {'summary': '摘要', 'keywords': '甲,乙', 'slug': 'slug', 'provider': providers[0], 'source': 'ai'}
+
+    monkeypatch.setattr(app_main, 'generate_uncached', generate_uncached)
+
+    async def scenario():
+        return await asyncio.gather(*(
+            app_main.generate_seo_content('标题', '正文内容', provider='auto', use_cache=False) for _ in range(2)
+        ))
+
+    first, second = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert first == second and first is not second
@@ -0,0 +1,68 @@
+"""
+slug生成测试（slug_engine）
+"""
+
+import csv
+
+from slug_engine import SLUG_MAX_CHARS, SlugIndex, make_slug
+
+HEADER = ['时间', '标题', '摘要', '关键词', 'slug', '文章附加', 'AI模型', '结果来源']
+
+
+def write_history(path, rows):
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+
+
+def test_make_slug_transliterates_title():
+    assert make_slug('人工智能在医疗影像中的应用') == 'ren-gong-zhi-neng-yi-liao-ying-xiang-zhong-ying'
+
+
+def test_make_slug_pads_short_title_with_keywords():
+    assert make_slug('AI 与 大数据', '数字经济,云计算') == 'ai-da-shu-ju-shu-zi-jing-ji-yun-ji-suan'
+
+
+def test_make_slug_shape():
+    slug = make_slug('2024年新能源汽车产业发展报告：电池技术突破与海外市场扩张的机遇和挑战')
+    assert len(slug) <= SLUG_MAX_CHARS
+    assert slug == slug.lower() and '--' not in slug and not slug.endswith('-')
+
+
+def test_make_slug_without_usable_characters():
+    assert make_slug('！！！').startswith('article-')
+
+
+def test_unique_appends_suffix_for_other_titles(tmp_path):
+    history = tmp_path / 'history.csv'
+    write_history(history, [
+        ['2025-01-01', '第一篇', '摘要', '关键词', 'ai-news', 'a.docx', 'DeepSeek', 'AI生成'],
+        ['2025-01-02', '第二篇', '摘要', '关键词', 'ai-news-2', 'b.docx', 'DeepSeek', 'AI生成'],
+    ])
+    index = SlugIndex(str(history))
+    index.refresh()
+    assert index.unique('ai-news', '第三篇') == 'ai-news-3'
+    # 同一标题再次生成时沿用原slug
+    assert index.unique('ai-news', '第一篇') == 'ai-news'
+    assert index.unique('new-slug', '第三篇') == 'new-slug'
+
+
+def test_claim_registers_slug(tmp_path):
+    history = tmp_path / 'history.csv'
+    write_history(history, [])
+    index = SlugIndex(str(history))
+    index.refresh()
+    assert index.claim('AI News', '第一篇') == 'ai-news'
+    assert index.claim('ai-news', '第二篇') == 'ai-news-2'
+    assert index.unique('ai-news', '第三篇') == 'ai-news-3'
+
+
+def test_suffix_keeps_max_length(tmp_path):
+    history = tmp_path / 'history.csv'
+    slug = 'a' * SLUG_MAX_CHARS
+    write_history(history, [['2025-01-01', '第一篇', '摘要', '关键词', slug, 'a.docx', 'DeepSeek', 'AI生成']])
+    index = SlugIndex(str(history))
+    index.refresh()
+    unique = index.unique(slug, '第二篇')
+    assert unique.endswith('-2') and len(unique) == SLUG_MAX_CHARS
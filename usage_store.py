@@ -0,0 +1,177 @@
+"""
+AI调用用量记录
+每次AI调用（以及缓存命中）追加一条记录：提供商、模型、输入/输出/缓存命中Token数、
+提示词长度、耗时、结果和是否命中缓存，存储在 history/ 下的SQLite文件中，并提供聚合查询。
+记录只放入内存队列，由后台线程批量写入，不在事件循环中做磁盘I/O
+"""
+
+import os
+import time
+import queue
+import sqlite3
+import logging
+import threading
+import contextvars
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+USAGE_DB = os.getenv('USAGE_DB', 'history/llm_usage.sqlite3')
+
+# 调用结果
+OUTCOME_SUCCESS = 'success'
+OUTCOME_EMPTY = 'empty'  # 调用完成但没有得到有效结果
+OUTCOME_ERROR = 'error'
+OUTCOME_TIMEOUT = 'timeout'
+OUTCOME_RATE_LIMITED = 'rate_limited'
+OUTCOME_CACHE_HIT = 'cache_hit'
+
+GROUP_COLUMNS = ('provider', 'model', 'day', 'outcome')
+
+# 后台线程每次最多合并写入的记录数
+WRITE_BATCH_SIZE = 200
+
+# 当前调用的用量（由各提供商的生成函数填写，由调用方读取）
+_current_usage = contextvars.ContextVar('current_usage', default=None)
+
+
+def start_usage_scope() -> dict:
+    """开始记录一次调用的用量，返回供生成函数填写的字典"""
+    usage = {}
+    _current_usage.set(usage)
+    return usage
+
+
+def report_usage(prompt_tokens: int = 0, completion_tokens: int = 0, cached_tokens: int = 0):
+    """由提供商的生成函数调用，报告接口返回的Token用量"""
+    usage = _current_usage.get()
+    if usage is not None:
+        usage.update({
+            'prompt_tokens': prompt_tokens or 0,
+            'completion_tokens': completion_tokens or 0,
+            'cached_tokens': cached_tokens or 0
+        })
+
+
+def parse_openai_usage(usage: dict) -> dict:
+    """从OpenAI兼容接口的usage字段中提取Token数（兼容DeepSeek的缓存命中字段）"""
+    details = usage.get('prompt_tokens_details') or {}
+    return {
+        'prompt_tokens': usage.get('prompt_tokens', 0),
+        'completion_tokens': usage.get('completion_tokens', 0),
+        'cached_tokens': usage.get('prompt_cache_hit_tokens', details.get('cached_tokens', 0)) or 0
+    }
+
+
+class UsageStore:
+    """只追加的用量记录表（一个长连接；写入由后台线程批量提交，查询在调用方线程中执行）"""
+
+    def __init__(self, db_path: str = USAGE_DB):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, timeout=5, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS llm_usage ('
+                'ts REAL, day TEXT, provider TEXT, model TEXT, '
+                'prompt_tokens INTEGER, completion_tokens INTEGER, cached_tokens INTEGER, '
+                'prompt_chars INTEGER, latency_ms INTEGER, outcome TEXT, cache_hit INTEGER)'
+            )
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_llm_usage_day ON llm_usage(day)')
+        self.pending: queue.SimpleQueue = queue.SimpleQueue()
+        self.writer = threading.Thread(target=self._write_loop, name='usage-writer', daemon=True)
+        self.writer.start()
+
+    def record(self, provider: str, model: str, outcome: str, latency: float = 0.0,
+               prompt_chars: int = 0, usage: Optional[dict] = None, cache_hit: bool = False):
+        """追加一条调用记录（放入写入队列，立即返回）"""
+        usage = usage or {}
+        now = time.time()
+        self.pending.put((
+            now, datetime.fromtimestamp(now).strftime('%Y-%m-%d'), provider, model,
+            usage.get('prompt_tokens', 0), usage.get('completion_tokens', 0),
+            usage.get('cached_tokens', 0), prompt_chars, int(latency * 1000),
+            outcome, int(cache_hit)
+        ))
+
+    def _write_loop(self):
+        """后台线程：等待新记录，把已排队的记录合并为一个事务写入；收到None时写完剩余记录后退出"""
+        stopping = False
+        while not stopping:
+            rows = [self.pending.get()]
+            while len(rows) < WRITE_BATCH_SIZE:
+                try:
+                    rows.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            if None in rows:
+                stopping = True
+                rows = [row for row in rows if row is not None]
+            if not rows:
+                continue
+            try:
+                with self.lock, self.conn:
+                    self.conn.executemany('INSERT INTO llm_usage VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            except sqlite3.Error as e:
+                logger.warning(f"写入AI调用用量失败（{len(rows)} 条）: {e}")
+
+    def close(self):
+        """写完队列中的记录后关闭连接（应用关闭时调用）"""
+        self.pending.put(None)
+        self.writer.join(timeout=5)
+        with self.lock:
+            self.conn.close()
+
+    def _query(self, sql: str, params: tuple) -> List[sqlite3.Row]:
+        with self.lock:
+            cursor = self.conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            return cursor.execute(sql, params).fetchall()
+
+    def summary(self, group_by: List[str], days: int = 7) -> List[dict]:
+        """按指定维度聚合最近 days 天的用量"""
+        columns = [c for c in group_by if c in GROUP_COLUMNS] or ['provider']
+        since = (datetime.now() - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+        select = ', '.join(columns)
+        rows = self._query(
+            f'SELECT {select}, COUNT(*) AS calls, SUM(cache_hit) AS cache_hits, '
+            'SUM(prompt_tokens) AS prompt_tokens, SUM(completion_tokens) AS completion_tokens, '
+            'SUM(cached_tokens) AS cached_tokens, AVG(prompt_chars) AS avg_prompt_chars, '
+            'AVG(CASE WHEN cache_hit = 0 THEN latency_ms END) AS avg_latency_ms, '
+            'MAX(latency_ms) AS max_latency_ms '
+            f'FROM llm_usage WHERE day >= ? GROUP BY {select} ORDER BY {select}',
+            (since,)
+        )
+        result = []
+        for row in rows:
+            item = dict(row)
+            for key in ('avg_prompt_chars', 'avg_latency_ms'):
+                if item[key] is not None:
+                    item[key] = round(item[key], 1)
+            result.append(item)
+        return result
+
+    def prompt_cache_summary(self, days: int = 7) -> List[dict]:
+        """按提供商统计最近 days 天成功调用的提示词前缀缓存命中情况，
+        对比命中与未命中缓存的调用的平均耗时"""
+        since = (datetime.now() - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+        rows = self._query(
+            'SELECT provider, COUNT(*) AS calls, SUM(cached_tokens > 0) AS calls_with_hits, '
+            'SUM(prompt_tokens) AS prompt_tokens, SUM(cached_tokens) AS cached_tokens, '
+            'AVG(CASE WHEN cached_tokens > 0 THEN latency_ms END) AS avg_latency_hit_ms, '
+            'AVG(CASE WHEN cached_tokens = 0 THEN latency_ms END) AS avg_latency_miss_ms '
+            'FROM llm_usage WHERE day >= ? AND outcome = ? AND prompt_tokens > 0 '
+            'GROUP BY provider ORDER BY provider',
+            (since, OUTCOME_SUCCESS)
+        )
+        result = []
+        for row in rows:
+            item = dict(row)
+            item['hit_ratio'] = round(item['cached_tokens'] / item['prompt_tokens'], 4) if item['prompt_tokens'] else 0.0
+            for key in ('avg_latency_hit_ms', 'avg_latency_miss_ms'):
+                if item[key] is not None:
+                    item[key] = round(item[key], 1)
+            result.append(item)
+        return result